@@ -3,7 +3,9 @@ import time
 import json
 from typing import Tuple, Dict, Any
 from update_telemery import update_telemetry
-from backend.graph import generate_graph
+from backend.answer_cache import get_answer_cache
+from backend.registry import get_graph
+from backend.streaming import stream_events
 
 
 def display_ui() -> str:
@@ -48,7 +50,7 @@ def process_query(
     answer_box: st.delta_generator.DeltaGenerator,
     status_box: st.delta_generator.DeltaGenerator,
     debug_container: st.delta_generator.DeltaGenerator
-) -> Tuple[str, Dict[str, Any], str]:
+) -> Tuple[str, Dict[str, Any], str, Dict[str, Any]]:
     """
     Processes the user's query by streaming chunks from the backend
     graph and updating UI components.
@@ -62,24 +64,43 @@ def process_query(
         debug info.
 
     Returns:
-        Tuple[str, dict, str]: The final answer text, usage metadata,
-        and status string.
+        Tuple[str, dict, str, dict]: The final answer text, usage
+        metadata, status string and per-node metrics.
     """
     answer_text = ''
     usage_metadata = {}
+    metrics = {}
     status = "No status available"
     debug_data = []  # collect all raw_results for debug info
+    citation_report = []
 
     with st.spinner("🔄 Reading web, downloading and response"):
-        for chunk in graph.stream({"question": query}, stream_mode='values'):
+        for event in stream_events(graph, query,
+                                   get_answer_cache()):
+            if event["event"] == "token":
+                answer_text += event["data"]
+                answer_box.markdown(f"### ✅ Answer\n{answer_text}")
+                continue
+
+            if event["event"] == "done":
+                metrics["stream"] = event["data"]
+                continue
+
+            chunk = event["data"]
             if chunk.get('answer'):
                 answer_text = chunk['answer'].content
                 answer_box.markdown(f"### ✅ Answer\n{answer_text}")
                 usage_metadata = chunk['answer'].usage_metadata
+                if not chunk.get('status'):
+                    status_box.info("🔎 Verifying citations...")
 
             if chunk.get('status'):
                 status = chunk['status']
-                
+                citation_report = chunk.get('citation_report', [])
+                status_box.empty()
+
+            if chunk.get('metrics'):
+                metrics.update(chunk['metrics'])
 
             if chunk.get('raw_results') and not debug_data:
                 debug_data.append(chunk['raw_results'])
@@ -88,8 +109,11 @@ def process_query(
         st.markdown("#### Raw Search Results (JSON)")
         for i, data in enumerate(debug_data, 1):
             st.json(data)
+        if citation_report:
+            st.markdown("#### Citation Checks")
+            st.json(citation_report)
 
-    return answer_text, usage_metadata, status
+    return answer_text, usage_metadata, status, metrics
 
 
 def main() -> None:
@@ -100,11 +124,11 @@ def main() -> None:
     query = display_ui()
     if query:
         start = time.time()
-        graph = generate_graph()
+        graph = get_graph()
         answer_box, status_box, debug_section = init_placeholders()
 
         try:
-            answer_text, usage_metadata, status = process_query(
+            answer_text, usage_metadata, status, metrics = process_query(
                 query, graph, answer_box, status_box, debug_section)
         except Exception as e:
             st.error(f"❌ An error occurred: {e}")
@@ -114,7 +138,7 @@ def main() -> None:
         st.markdown(status)
 
         try:
-            update_telemetry(start, usage_metadata)
+            update_telemetry(start, usage_metadata, metrics)
         except Exception as e:
             st.warning(f"⚠️ Could not update telemetry: {e}")
 
@@ -0,0 +1,150 @@
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import xxhash
+from .disk_cache import DiskCache
+from .instrumentation import CACHE_LOOKUPS
+from .page_cache import PageCache, get_page_cache
+from .search import normalize_query
+from .settings import get_settings
+
+
+@dataclass
+class CachedAnswer:
+    """
+    A previously generated answer and what it was built from.
+
+    Attributes:
+        question (str): The question as first asked.
+        answer (str): The answer text.
+        usage_metadata (Dict[str, int]): Token usage of the original run.
+        status (str): The citation verification status.
+        citation_report (List[dict]): Per-citation verification scores.
+        sources (List[dict]): The numbered sources shown to the LLM.
+        fingerprints (Dict[str, str]): Content hash of each source page
+            when the answer was generated.
+    """
+    question: str
+    answer: str
+    usage_metadata: Dict[str, int] = field(default_factory=dict)
+    status: Optional[str] = None
+    citation_report: List[dict] = field(default_factory=list)
+    sources: List[dict] = field(default_factory=list)
+    fingerprints: Dict[str, str] = field(default_factory=dict)
+
+
+class AnswerCache:
+    """
+    A shared cache of final answers keyed by normalized question.
+
+    Entries expire after a TTL and the store is size-bounded with LRU
+    eviction. When `check_sources` is on, each entry remembers the
+    content hash of its source pages and is dropped as soon as the
+    page cache holds a different version of any of them.
+    """
+
+    def __init__(self, store: DiskCache, ttl: float,
+                 pages: Optional[PageCache] = None,
+                 check_sources: bool = True) -> None:
+        """
+        Args:
+            store (DiskCache): The backing store.
+            ttl (float): Seconds an answer is reused.
+            pages (PageCache, optional): Where current page versions
+                are looked up.
+            check_sources (bool): Invalidate on changed sources.
+        """
+        self.store = store
+        self.ttl = ttl
+        self.pages = pages
+        self.check_sources = check_sources and pages is not None
+
+    @staticmethod
+    def _key(question: str) -> str:
+        return "answer:" + xxhash.xxh3_128_hexdigest(
+            normalize_query(question))
+
+    def _fingerprints(self, sources: List[dict]) -> Dict[str, str]:
+        """
+        Return the current content hash of each cached source page.
+        """
+        fingerprints = {}
+        for source in sources:
+            digest = (self.pages.content_hash(source["url"])
+                      if self.pages else None)
+            if digest is not None:
+                fingerprints[source["url"]] = digest
+        return fingerprints
+
+    def get(self, question: str) -> Optional[CachedAnswer]:
+        """
+        Look up a fresh answer to a question.
+
+        Args:
+            question (str): The user's question.
+
+        Returns:
+            Optional[CachedAnswer]: The answer, or None on a miss, when
+            expired, or when one of its sources has changed.
+        """
+        key = self._key(question)
+        entry = self.store.get(key)
+        if entry is None or not entry.fresh:
+            CACHE_LOOKUPS.inc(cache="answer", result="miss")
+            return None
+        cached = CachedAnswer(**json.loads(entry.value))
+        if self.check_sources:
+            current = self._fingerprints(cached.sources)
+            if any(current.get(url, digest) != digest
+                   for url, digest in cached.fingerprints.items()):
+                self.store.delete(key)
+                CACHE_LOOKUPS.inc(cache="answer", result="invalidated")
+                return None
+        CACHE_LOOKUPS.inc(cache="answer", result="hit")
+        return cached
+
+    def put(self, question: str, state: Dict[str, Any]) -> None:
+        """
+        Store the final state of a graph run. Answers whose citations
+        failed verification are not cached.
+
+        Args:
+            question (str): The user's question.
+            state (Dict[str, Any]): The final graph state.
+        """
+        answer = state.get("answer")
+        if answer is None or state.get("status") == "FAIL":
+            return
+        sources = state.get("sources", [])
+        cached = CachedAnswer(
+            question=question,
+            answer=answer.content,
+            usage_metadata=dict(answer.usage_metadata or {}),
+            status=state.get("status"),
+            citation_report=state.get("citation_report", []),
+            sources=sources,
+            fingerprints=self._fingerprints(sources),
+        )
+        self.store.put(self._key(question),
+                       json.dumps(asdict(cached)).encode("utf-8"),
+                       self.ttl)
+
+
+@lru_cache(maxsize=None)
+def get_answer_cache() -> Optional[AnswerCache]:
+    """
+    Return the process-wide answer cache, or None if it is disabled
+    with `ASK_WEB_ANSWER_CACHE=0`.
+
+    Returns:
+        Optional[AnswerCache]: The shared cache.
+    """
+    settings = get_settings()
+    if not settings.answer_cache_enabled:
+        return None
+    store = DiskCache(os.path.join(settings.cache_dir, "answers.sqlite3"),
+                      settings.answer_cache_max_bytes)
+    return AnswerCache(store, settings.answer_cache_ttl, get_page_cache(),
+                       settings.answer_cache_check_sources)
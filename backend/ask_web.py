@@ -1,5 +1,7 @@
-from typing import Optional
-from graph import generate_graph
+from typing import Any, AsyncIterator, Dict, Iterator
+from .answer_cache import get_answer_cache
+from .registry import get_graph
+from .streaming import astream_events, stream_events
 from dotenv import load_dotenv
 import os
 from rich.console import Console
@@ -8,11 +10,66 @@ from rich.console import Console
 load_dotenv()
 
 os.environ['USER_AGENT'] = os.getenv(
-    'USER_AGENT')
+    'USER_AGENT', 'ask-the-web')
 
 console = Console()
 
 
+def stream_the_web(query: str) -> Iterator[Dict[str, Any]]:
+    """
+    Ask a question and yield the answer as it is generated.
+
+    Yields `token` events with pieces of answer text as soon as the
+    LLM produces them, `values` events with the graph state after each
+    step, and a final `done` event with the time to first token and
+    total latency. Repeated questions are answered from the shared
+    answer cache. See `backend.streaming.stream_events`.
+
+    Args:
+        query (str): The question to be answered.
+
+    Yields:
+        Dict[str, Any]: The stream events.
+    """
+    yield from stream_events(get_graph(), query, get_answer_cache())
+
+
+async def astream_the_web(query: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async version of `stream_the_web`. The graph runs with `astream`,
+    so one event loop can serve many questions at once.
+
+    Args:
+        query (str): The question to be answered.
+
+    Yields:
+        Dict[str, Any]: The stream events.
+    """
+    async for event in astream_events(get_graph(), query,
+                                      get_answer_cache()):
+        yield event
+
+
+def final_answer(state: Dict[str, Any],
+                 result: tuple[str, dict, str]) -> tuple[str, dict, str]:
+    """
+    Fold one `values` state into the (answer, usage, status) result.
+
+    Args:
+        state (Dict[str, Any]): The graph state after a step.
+        result (tuple[str, dict, str]): The result so far.
+
+    Returns:
+        tuple[str, dict, str]: The updated result.
+    """
+    content, usage_metadata, status = result
+    answer = state.get('answer')
+    if answer and hasattr(answer, 'content'):
+        content = answer.content
+        usage_metadata = answer.usage_metadata
+    return content, usage_metadata, state.get('status', status)
+
+
 def ask_the_web(query: str) -> tuple[str, dict, str]:
     """
     Ask a question to the graph-based QA system and
@@ -22,15 +79,29 @@ def ask_the_web(query: str) -> tuple[str, dict, str]:
         query (str): The question to be answered.
 
     Returns:
+        tuple[str, dict, str]: The answer text, usage metadata and
+        citation status.
+    """
+    result = ("", {}, None)
+    for event in stream_the_web(query):
+        if event["event"] == "values":
+            result = final_answer(event["data"], result)
+    return result
 
+
+async def ask_the_web_async(query: str) -> tuple[str, dict, str]:
     """
-    graph = generate_graph()
-    content = ""
-    usage_metadata = {}
-    for chunk in graph.stream({"question": query}, stream_mode='values'):
-        answer = chunk.get('answer')
-        if answer and hasattr(answer, 'content'):
-            content = answer.content
-            usage_metadata = answer.usage_metadata
+    Async version of `ask_the_web`.
+
+    Args:
+        query (str): The question to be answered.
 
-    return content, usage_metadata, chunk.get('status')
+    Returns:
+        tuple[str, dict, str]: The answer text, usage metadata and
+        citation status.
+    """
+    result = ("", {}, None)
+    async for event in astream_the_web(query):
+        if event["event"] == "values":
+            result = final_answer(event["data"], result)
+    return result
@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .answer_cache import AnswerCache, get_answer_cache
+from .fetcher import close_fetcher
+from .instrumentation import record_trace
+from .load_scrape_website import scrape_counters
+from .page_cache import get_page_cache
+from .parse_pool import close_parse_pool
+from .registry import get_graph
+from .search import get_search_service, normalize_query
+from .streaming import answer_payload, cached_state
+
+
+@dataclass
+class BatchStats:
+    """
+    Counters and timings for one batch run.
+
+    Attributes:
+        questions (int): Questions read from the input.
+        skipped (int): Questions already answered in the output.
+        unique (int): Distinct normalized questions left to answer.
+        answered (int): Output rows written without error.
+        failed (int): Output rows written with an error.
+        cache_hits (int): Questions served from the answer cache.
+        stage_seconds (Dict[str, float]): Summed time per graph node.
+        stage_runs (Dict[str, int]): Times each graph node ran.
+        elapsed (float): Wall-clock seconds of the batch.
+    """
+    questions: int = 0
+    skipped: int = 0
+    unique: int = 0
+    answered: int = 0
+    failed: int = 0
+    cache_hits: int = 0
+    stage_seconds: Dict[str, float] = field(
+        default_factory=lambda: defaultdict(float))
+    stage_runs: Dict[str, int] = field(
+        default_factory=lambda: defaultdict(int))
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        """
+        Render the throughput and per-stage timing report.
+        """
+        rate = self.answered / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"questions: {self.questions}  skipped: {self.skipped}  "
+            f"unique: {self.unique}  answered: {self.answered}  "
+            f"failed: {self.failed}  answer cache hits: {self.cache_hits}",
+            f"elapsed: {self.elapsed:.1f}s  throughput: "
+            f"{rate:.2f} questions/s",
+        ]
+        for stage, seconds in self.stage_seconds.items():
+            runs = self.stage_runs[stage]
+            lines.append(f"  {stage:<18} total {seconds:8.2f}s  "
+                         f"mean {seconds / runs:6.2f}s  ({runs} runs)")
+        return "\n".join(lines)
+
+
+def read_questions(path: str) -> List[Tuple[str, str]]:
+    """
+    Read `{"question": ..., "id": ...}` lines from a JSONL file.
+
+    Lines without an `id` are identified by their line number; blank
+    lines are ignored.
+
+    Args:
+        path (str): The input JSONL file.
+
+    Returns:
+        List[Tuple[str, str]]: The (id, question) pairs in file order.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            questions.append((str(row.get("id", number)), row["question"]))
+    return questions
+
+
+def resume_output(path: str) -> Set[str]:
+    """
+    Prepare an output file for a rerun, so an interrupted batch can
+    resume where it stopped and every id keeps a single row.
+
+    Rows recording an error, and a last line cut short by an
+    interrupted run, are removed from the file: their questions are
+    answered again and appended afresh.
+
+    Args:
+        path (str): The output JSONL file.
+
+    Returns:
+        Set[str]: The ids already answered without error, to skip.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    kept = []
+    dropped = False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                dropped = True
+                continue
+            if row.get("error") or str(row["id"]) in done:
+                dropped = True
+                continue
+            done.add(str(row["id"]))
+            if not line.endswith("\n"):
+                line += "\n"
+                dropped = True
+            kept.append(line)
+    if dropped:
+        partial = path + ".partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(partial, path)
+    return done
+
+
+async def answer_question(
+        graph: Any, question: str,
+        cache: Optional[AnswerCache]) -> Tuple[Dict[str, Any],
+                                               Dict[str, float]]:
+    """
+    Run one question through the graph, timing each node. The answer
+    cache and the trace file are used from worker threads, so other
+    questions of the batch keep running meanwhile.
+
+    Args:
+        graph (Any): The compiled graph.
+        question (str): The question.
+        cache (AnswerCache, optional): The shared answer cache.
+
+    Returns:
+        Tuple[dict, Dict[str, float]]: The final state and the seconds
+        spent in each node (none on an answer cache hit).
+    """
+    start = time.perf_counter()
+    cached = (await asyncio.to_thread(cache.get, question)
+              if cache is not None else None)
+    if cached is not None:
+        state = cached_state(cached)
+        await asyncio.to_thread(record_trace, question, state, {
+            "cached": True, "latency": time.perf_counter() - start})
+        return state, {}
+    state: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    last = start
+    async for mode, chunk in graph.astream(
+            {"question": question}, stream_mode=["updates", "values"]):
+        if mode == "values":
+            state = chunk
+            continue
+        now = time.perf_counter()
+        for node in chunk:
+            timings[node] = now - last
+        last = now
+    if cache is not None:
+        await asyncio.to_thread(cache.put, question, state)
+    await asyncio.to_thread(record_trace, question, state, {
+        "cached": False, "latency": time.perf_counter() - start})
+    return state, timings
+
+
+async def run_batch(input_path: str, output_path: str,
+                    concurrency: int = 8, graph: Any = None,
+                    cache: Optional[AnswerCache] = None) -> BatchStats:
+    """
+    Answer every question of a JSONL file with bounded concurrency.
+
+    Questions with the same normalized text are answered once. All
+    questions share one graph, one search service and one event loop,
+    so identical searches and concurrent downloads of the same page
+    are merged across the batch, and the page cache serves pages that
+    earlier questions already fetched. Results are appended to the
+    output as each question finishes; rerunning the same command
+    skips the ids already answered and retries the failed ones,
+    replacing their rows.
+
+    Args:
+        input_path (str): JSONL with a `question` (and optional `id`)
+            per line.
+        output_path (str): JSONL the answers are appended to.
+        concurrency (int): Questions answered at once.
+        graph (Any, optional): The compiled graph; the shared one by
+            default.
+        cache (AnswerCache, optional): The answer cache; the shared one
+            by default.
+
+    Returns:
+        BatchStats: Counters and per-stage timings.
+    """
+    graph = graph if graph is not None else get_graph()
+    cache = cache if cache is not None else get_answer_cache()
+    stats = BatchStats()
+    start = time.perf_counter()
+
+    questions = read_questions(input_path)
+    done = resume_output(output_path)
+    stats.questions = len(questions)
+    groups: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    for row_id, question in questions:
+        if row_id in done:
+            stats.skipped += 1
+        else:
+            groups[normalize_query(question)].append((row_id, question))
+    stats.unique = len(groups)
+
+    slots = asyncio.Semaphore(concurrency)
+    with open(output_path, "a", encoding="utf-8") as output:
+        async def answer_group(rows: List[Tuple[str, str]]) -> None:
+            async with slots:
+                began = time.perf_counter()
+                error = None
+                try:
+                    state, timings = await answer_question(
+                        graph, rows[0][1], cache)
+                except Exception as e:
+                    print(f"Error answering {rows[0][1]!r}: {e}")
+                    state, timings, error = {}, {}, str(e)
+                elapsed = time.perf_counter() - began
+            if state.get("metrics", {}).get("answer_cache"):
+                stats.cache_hits += 1
+            for stage, seconds in timings.items():
+                stats.stage_seconds[stage] += seconds
+                stats.stage_runs[stage] += 1
+            payload = answer_payload(state)
+            for row_id, question in rows:
+                row = {"id": row_id, "question": question, **payload,
+                       "elapsed": elapsed, "error": error}
+                output.write(json.dumps(row, default=str) + "\n")
+                if error is None:
+                    stats.answered += 1
+                else:
+                    stats.failed += 1
+            output.flush()
+
+        try:
+            await asyncio.gather(*(answer_group(rows)
+                                   for rows in groups.values()))
+        finally:
+            await close_fetcher()
+            await asyncio.to_thread(close_parse_pool)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def main() -> None:
+    """
+    Run a batch: `python -m backend.batch questions.jsonl answers.jsonl`.
+    """
+    parser = argparse.ArgumentParser(
+        description="Answer a JSONL file of questions.")
+    parser.add_argument("input", help="JSONL with a 'question' per line")
+    parser.add_argument("output", help="JSONL answers are appended to")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="questions answered at once")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run_batch(args.input, args.output,
+                                  args.concurrency))
+    print(stats.summary())
+    print(f"search: {get_search_service().stats()}")
+    print(f"page downloads: {scrape_counters}")
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        print(f"page cache: {page_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from langchain.schema import Document
+
+
+class Source:
+    """
+    The text of one page and its metadata, shared by all of the
+    page's chunks.
+    """
+    __slots__ = ("text", "metadata")
+
+    def __init__(self, text: str,
+                 metadata: Optional[Dict[str, Any]] = None) -> None:
+        self.text = text
+        self.metadata = metadata if metadata is not None else {}
+
+    def _asdict(self) -> Dict[str, Any]:
+        # Lets LangGraph's checkpoint serializer rebuild the source.
+        return {"text": self.text, "metadata": self.metadata}
+
+    def __repr__(self) -> str:
+        return (f"Source({self.metadata.get('source', '')!r}, "
+                f"{len(self.text)} chars)")
+
+
+class Chunk:
+    """
+    A view of one chunk: a span of its source's text. It reads like a
+    `Document` (`page_content`, `metadata`), but the chunk text is only
+    sliced out of the source when `page_content` is read.
+    """
+    __slots__ = ("source", "start", "end")
+
+    def __init__(self, source: Source, start: int, end: int) -> None:
+        self.source = source
+        self.start = start
+        self.end = end
+
+    @property
+    def page_content(self) -> str:
+        return self.source.text[self.start:self.end]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.source.metadata
+
+    def to_document(self) -> Document:
+        """
+        Copy the chunk into a LangChain `Document`.
+        """
+        return Document(page_content=self.page_content,
+                        metadata=self.metadata)
+
+    def _asdict(self) -> Dict[str, Any]:
+        return {"source": self.source, "start": self.start,
+                "end": self.end}
+
+    def __repr__(self) -> str:
+        return (f"Chunk({self.metadata.get('source', '')!r}, "
+                f"{self.start}:{self.end})")
+
+
+class ChunkList(Sequence):
+    """
+    A compact, immutable list of chunks.
+
+    Each page's text is held once, in a `Source`, and every chunk is a
+    page number and a start/end offset into that text, kept in three
+    parallel arrays. Indexing returns `Chunk` views, so code written
+    for lists of `Document` objects works unchanged. Lists are joined
+    with `+`, which is how the graph's `context` reducer accumulates
+    them, and they round-trip through LangGraph checkpoints.
+    """
+    __slots__ = ("sources", "pages", "starts", "ends")
+
+    def __init__(self, sources: Iterable[Source] = (),
+                 pages: Iterable[int] = (), starts: Iterable[int] = (),
+                 ends: Iterable[int] = ()) -> None:
+        """
+        Args:
+            sources (Iterable[Source]): The pages' texts and metadata.
+            pages (Iterable[int]): The source index of each chunk.
+            starts (Iterable[int]): The start offset of each chunk.
+            ends (Iterable[int]): The end offset of each chunk.
+        """
+        self.sources = list(sources)
+        self.pages = array("I", pages)
+        self.starts = array("I", starts)
+        self.ends = array("I", ends)
+
+    @classmethod
+    def from_spans(cls, text: str, metadata: Dict[str, Any],
+                   spans: Iterable[Tuple[int, int]]) -> "ChunkList":
+        """
+        Build the chunks of one page from offsets into its text.
+
+        Args:
+            text (str): The page text.
+            metadata (Dict[str, Any]): The page metadata.
+            spans (Iterable[Tuple[int, int]]): Start and end offsets.
+
+        Returns:
+            ChunkList: The page's chunks.
+        """
+        spans = list(spans)
+        if not spans:
+            return cls()
+        return cls([Source(text, metadata)], [0] * len(spans),
+                   [start for start, _ in spans],
+                   [end for _, end in spans])
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[Any]) -> "ChunkList":
+        """
+        Build a list from chunk views or `Document` objects.
+
+        Views keep pointing at their existing sources; any other
+        document becomes a source of its own.
+
+        Args:
+            docs (Iterable): `Chunk` views or Document-like objects.
+
+        Returns:
+            ChunkList: The chunks, in order.
+        """
+        result = cls()
+        index: Dict[int, int] = {}
+        for doc in docs:
+            if isinstance(doc, Chunk):
+                source, start, end = doc.source, doc.start, doc.end
+            else:
+                source = Source(doc.page_content, doc.metadata)
+                start, end = 0, len(source.text)
+            page = index.get(id(source))
+            if page is None:
+                page = index[id(source)] = len(result.sources)
+                result.sources.append(source)
+            result.pages.append(page)
+            result.starts.append(start)
+            result.ends.append(end)
+        return result
+
+    @classmethod
+    def concat(cls, lists: Iterable[Iterable[Any]]) -> "ChunkList":
+        """
+        Join several lists of chunks into one.
+
+        Args:
+            lists (Iterable): `ChunkList`s, or sequences of chunk views
+                or documents.
+
+        Returns:
+            ChunkList: All the chunks, in order.
+        """
+        result = cls()
+        for chunks in lists:
+            if not isinstance(chunks, ChunkList):
+                chunks = cls.from_documents(chunks)
+            offset = len(result.sources)
+            result.sources.extend(chunks.sources)
+            if offset:
+                result.pages.extend(page + offset for page in chunks.pages)
+            else:
+                result.pages.extend(chunks.pages)
+            result.starts.extend(chunks.starts)
+            result.ends.extend(chunks.ends)
+        return result
+
+    def to_documents(self) -> List[Document]:
+        """
+        Copy every chunk into a LangChain `Document`.
+        """
+        return [chunk.to_document() for chunk in self]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        A JSON-ready form of the list, read back by `from_dict`.
+        """
+        return {"sources": [source._asdict() for source in self.sources],
+                "pages": self.pages.tolist(),
+                "starts": self.starts.tolist(),
+                "ends": self.ends.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChunkList":
+        """
+        Rebuild a list saved with `to_dict`.
+        """
+        return cls([Source(**source) for source in data["sources"]],
+                   data["pages"], data["starts"], data["ends"])
+
+    def _asdict(self) -> Dict[str, Any]:
+        # LangGraph's checkpoint serializer stores objects that have
+        # `_asdict` as the keyword arguments of their constructor.
+        return {"sources": self.sources, "pages": self.pages.tolist(),
+                "starts": self.starts.tolist(), "ends": self.ends.tolist()}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return ChunkList.from_documents(
+                self[i] for i in range(*index.indices(len(self))))
+        return Chunk(self.sources[self.pages[index]], self.starts[index],
+                     self.ends[index])
+
+    def __iter__(self) -> Iterator[Chunk]:
+        sources = self.sources
+        for page, start, end in zip(self.pages, self.starts, self.ends):
+            yield Chunk(sources[page], start, end)
+
+    def __add__(self, other: Iterable[Any]) -> "ChunkList":
+        return ChunkList.concat([self, other])
+
+    def __radd__(self, other: Iterable[Any]) -> "ChunkList":
+        return ChunkList.concat([other, self])
+
+    def __repr__(self) -> str:
+        return (f"ChunkList({len(self)} chunks from "
+                f"{len(self.sources)} pages)")
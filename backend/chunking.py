@@ -0,0 +1,124 @@
+from itertools import accumulate, chain, islice
+from typing import List, Sequence, Tuple
+
+Span = Tuple[int, int]
+
+SEPARATORS = ("\n\n", "\n", " ", "")
+
+
+def _pieces(text: str, start: int, end: int, separator: str) -> List[Span]:
+    """
+    Cut `text[start:end]` before every occurrence of `separator`, so
+    each piece after the first begins with the separator. Empty pieces
+    are dropped.
+    """
+    if not separator:
+        return [(i, i + 1) for i in range(start, end)]
+    parts = text[start:end].split(separator)
+    width = len(separator)
+    bounds = list(accumulate(
+        chain((start, len(parts[0])),
+              (len(part) + width for part in islice(parts, 1, None)))))
+    pieces = list(zip(bounds, islice(bounds, 1, None)))
+    if pieces[0][0] == pieces[0][1]:
+        del pieces[0]
+    return pieces
+
+
+def _strip(text: str, start: int, end: int) -> Span:
+    """
+    Narrow a span to exclude leading and trailing whitespace.
+    """
+    chunk = text[start:end]
+    stripped = chunk.strip()
+    if not stripped:
+        return start, start
+    start += len(chunk) - len(chunk.lstrip())
+    return start, start + len(stripped)
+
+
+def _merge(text: str, pieces: List[Span], chunk_size: int,
+           chunk_overlap: int, spans: List[Span]) -> None:
+    """
+    Group adjacent pieces into chunks of at most `chunk_size`
+    characters that overlap by up to `chunk_overlap`, appending the
+    stripped, non-empty chunks to `spans`.
+    """
+    first = 0
+    total = 0
+    for index, (start, end) in enumerate(pieces):
+        length = end - start
+        if total + length > chunk_size:
+            if index > first:
+                span = _strip(text, pieces[first][0], pieces[index - 1][1])
+                if span[1] > span[0]:
+                    spans.append(span)
+                while total > chunk_overlap or (
+                        total + length > chunk_size and total > 0):
+                    total -= pieces[first][1] - pieces[first][0]
+                    first += 1
+        total += length
+    if pieces:
+        span = _strip(text, pieces[first][0], pieces[-1][1])
+        if span[1] > span[0]:
+            spans.append(span)
+
+
+def _split(text: str, start: int, end: int, separators: Sequence[str],
+           chunk_size: int, chunk_overlap: int, spans: List[Span]) -> None:
+    """
+    Split `text[start:end]` on the first separator it contains and
+    recurse with the remaining separators into pieces still too long.
+    """
+    separator = separators[-1]
+    remaining: Sequence[str] = ()
+    for i, candidate in enumerate(separators):
+        if not candidate:
+            separator = candidate
+            break
+        if text.find(candidate, start, end) != -1:
+            separator = candidate
+            remaining = separators[i + 1:]
+            break
+
+    good: List[Span] = []
+    for piece in _pieces(text, start, end, separator):
+        if piece[1] - piece[0] < chunk_size:
+            good.append(piece)
+            continue
+        if good:
+            _merge(text, good, chunk_size, chunk_overlap, spans)
+            good = []
+        if remaining:
+            _split(text, piece[0], piece[1], remaining, chunk_size,
+                   chunk_overlap, spans)
+        else:
+            spans.append(piece)
+    if good:
+        _merge(text, good, chunk_size, chunk_overlap, spans)
+
+
+def split_offsets(text: str, chunk_size: int, chunk_overlap: int,
+                  separators: Sequence[str] = SEPARATORS) -> List[Span]:
+    """
+    Split a text into overlapping chunks, returned as offsets.
+
+    The chunks are the ones LangChain's `RecursiveCharacterTextSplitter`
+    returns with the same size, overlap and separators (and its default
+    `keep_separator=True`), but they are computed on `(start, end)`
+    offsets into `text` instead of by building and joining substrings,
+    so `text[start:end]` is each chunk.
+
+    Args:
+        text (str): The text to split.
+        chunk_size (int): The maximum chunk length in characters.
+        chunk_overlap (int): The maximum overlap between chunks.
+        separators (Sequence[str]): Separators to try, in order.
+
+    Returns:
+        List[Tuple[int, int]]: The start and end of each chunk.
+    """
+    spans: List[Span] = []
+    _split(text, 0, len(text), tuple(separators), chunk_size,
+           chunk_overlap, spans)
+    return spans
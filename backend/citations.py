@@ -0,0 +1,211 @@
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from .page_cache import normalize_url
+from .ranking import tokenize
+
+CITATION_PATTERN = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\]")
+SOURCES_HEADER = re.compile(
+    r"^\W*sources\W*$", re.IGNORECASE | re.MULTILINE)
+SOURCE_LINE = re.compile(r"^\W*\[(\d+)\]\s*(.*)$")
+URL_PATTERN = re.compile(r"https?://[^\s)>\]]+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class CitationCheck:
+    """
+    The verdict for one cited sentence and one source.
+
+    Attributes:
+        sentence (str): The sentence without citation markers.
+        number (int): The cited source number.
+        url (str): The URL of the cited source, if known.
+        score (float): Token and bigram overlap with the source, 0..1.
+        verdict (str): 'PASS', 'FAIL' or 'UNSURE'.
+    """
+    sentence: str
+    number: int
+    url: str = ""
+    score: float = 0.0
+    verdict: str = "FAIL"
+
+
+@dataclass
+class SourceIndex:
+    """
+    Token and bigram sets of all chunks scraped from one source.
+    """
+    unigrams: Set[str] = field(default_factory=set)
+    bigrams: Set[Tuple[str, str]] = field(default_factory=set)
+
+    def add(self, text: str) -> None:
+        tokens = tokenize(text)
+        self.unigrams.update(tokens)
+        self.bigrams.update(zip(tokens, tokens[1:]))
+
+
+def split_answer(answer: str) -> Tuple[str, Dict[int, str]]:
+    """
+    Split an answer into its body and the URLs of its Sources section.
+
+    Args:
+        answer (str): The generated answer.
+
+    Returns:
+        Tuple[str, Dict[int, str]]: The body text and a map from
+        source number to URL.
+    """
+    match = None
+    for match in SOURCES_HEADER.finditer(answer):
+        pass
+    if match is None:
+        return answer, {}
+    urls = {}
+    for line in answer[match.end():].splitlines():
+        source = SOURCE_LINE.match(line)
+        if source:
+            url = URL_PATTERN.search(source.group(2))
+            if url:
+                urls[int(source.group(1))] = url.group(0).rstrip(".,")
+    return answer[:match.start()], urls
+
+
+def cited_sentences(body: str) -> List[Tuple[str, List[int]]]:
+    """
+    Find the sentences that carry `[n]` citation markers.
+
+    Args:
+        body (str): The answer without its Sources section.
+
+    Returns:
+        List[Tuple[str, List[int]]]: Each cited sentence, stripped of
+        its markers, with the source numbers it cites.
+    """
+    results = []
+    previous = ""
+    for sentence in SENTENCE_END.split(body):
+        numbers = [int(n) for group in CITATION_PATTERN.findall(sentence)
+                   for n in group.split(",")]
+        text = re.sub(r"\s*" + CITATION_PATTERN.pattern, "",
+                      sentence).strip()
+        if numbers:
+            # A marker placed after the full stop cites the sentence
+            # before it.
+            results.append((text or previous,
+                            list(dict.fromkeys(numbers))))
+        if text:
+            previous = text
+    return results
+
+
+def build_index(context: Sequence[Any]) -> Dict[str, SourceIndex]:
+    """
+    Index the scraped chunks by source URL.
+
+    Args:
+        context (Sequence[Document]): The scraped chunks.
+
+    Returns:
+        Dict[str, SourceIndex]: Token indexes keyed by normalized URL.
+    """
+    index: Dict[str, SourceIndex] = {}
+    for doc in context:
+        url = normalize_url(doc.metadata.get("source", ""))
+        index.setdefault(url, SourceIndex()).add(doc.page_content)
+    return index
+
+
+def support_score(sentence: str, source: SourceIndex) -> float:
+    """
+    Score how well a source supports a sentence.
+
+    The score averages the share of the sentence's tokens and of its
+    bigrams that also occur in the source, so copied or closely
+    paraphrased facts score high and unrelated claims score low.
+
+    Args:
+        sentence (str): The cited sentence.
+        source (SourceIndex): The cited source.
+
+    Returns:
+        float: The support score between 0 and 1.
+    """
+    tokens = tokenize(sentence)
+    if not tokens:
+        return 0.0
+    unigram = len(set(tokens) & source.unigrams) / len(set(tokens))
+    bigrams = set(zip(tokens, tokens[1:]))
+    if not bigrams:
+        return unigram
+    bigram = len(bigrams & source.bigrams) / len(bigrams)
+    return (unigram + bigram) / 2
+
+
+def check_citations(
+        answer: str,
+        context: Sequence[Any],
+        sources: Optional[Sequence[Dict[str, Any]]] = None,
+        pass_threshold: float = 0.5,
+        fail_threshold: float = 0.25) -> Tuple[str, List[CitationCheck]]:
+    """
+    Verify the `[n]` citations of an answer against scraped content.
+
+    Each cited sentence is scored against the chunks of the source it
+    cites. Scores at or above `pass_threshold` pass, those below
+    `fail_threshold` fail and the rest are 'UNSURE'.
+
+    Args:
+        answer (str): The generated answer with a Sources section.
+        context (Sequence[Document]): All scraped chunks.
+        sources (Sequence[dict], optional): The numbered sources shown
+            to the LLM, used when the answer lists no URL for a number.
+        pass_threshold (float): Minimum score for a PASS.
+        fail_threshold (float): Scores below this FAIL.
+
+    Returns:
+        Tuple[str, List[CitationCheck]]: The overall status ('PASS',
+        'FAIL', 'UNSURE', or 'None' when nothing is cited) and the
+        per-citation checks.
+    """
+    body, urls = split_answer(answer)
+    numbered = {s["number"]: s["url"] for s in sources or []}
+    index = build_index(context)
+
+    checks = []
+    for sentence, numbers in cited_sentences(body):
+        for number in numbers:
+            url, source = "", None
+            for candidate in (urls.get(number), numbered.get(number)):
+                if candidate:
+                    url = candidate
+                    source = index.get(normalize_url(candidate))
+                    if source is not None:
+                        break
+            score = support_score(sentence, source) if source else 0.0
+            if score >= pass_threshold:
+                verdict = "PASS"
+            elif score < fail_threshold:
+                verdict = "FAIL"
+            else:
+                verdict = "UNSURE"
+            checks.append(CitationCheck(sentence, number, url,
+                                        round(score, 3), verdict))
+
+    verdicts = {check.verdict for check in checks}
+    if not checks:
+        status = "None"
+    elif "FAIL" in verdicts:
+        status = "FAIL"
+    elif "UNSURE" in verdicts:
+        status = "UNSURE"
+    else:
+        status = "PASS"
+    return status, checks
+
+
+def report(checks: Sequence[CitationCheck]) -> List[Dict[str, Any]]:
+    """
+    Convert citation checks to plain dicts for the graph state.
+    """
+    return [asdict(check) for check in checks]
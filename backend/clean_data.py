@@ -45,6 +45,13 @@ def remove_multiple_newlines(text: str) -> str:
     return re.sub(r"\n{2,}", "\n", text)
 
 
+def _is_word(char: str) -> bool:
+    """
+    Whether a character matches `\\w` in a `str` pattern.
+    """
+    return char.isalnum() or char == "_"
+
+
 def clean_text(text: str) -> str:
     """
     Cleans the input text by applying a series of formatting fixes:
@@ -52,16 +59,44 @@ def clean_text(text: str) -> str:
     - Replaces single newlines with spaces.
     - Reduces multiple newlines to a single one.
 
+    The fixes are applied in a single pass over the lines of the text;
+    the result is the same as applying `merge_hyphenated_words`,
+    `fix_newlines` and `remove_multiple_newlines` in that order.
+
     Args:
         text (str): Text to be cleaned.
 
     Returns:
         str: Cleaned and normalized text.
     """
-    cleaning_functions = [
-        merge_hyphenated_words,
-        fix_newlines,
-        remove_multiple_newlines]
-    for cleaning_function in cleaning_functions:
-        text = cleaning_function(text)
-    return text
+    if "\n" not in text:
+        return text
+    lines = text.split("\n")
+    last = len(lines) - 1
+    parts = [lines[0]]
+    # Whether the previous line break merged a hyphenated word, which
+    # consumes the first character of the current line.
+    merged = False
+    i = 1
+    while i <= last:
+        if lines[i] == "" and i < last:
+            # A run of two or more newlines collapses into one.
+            while lines[i] == "" and i < last:
+                i += 1
+            parts.append("\n")
+            parts.append(lines[i])
+            merged = False
+            i += 1
+            continue
+        previous, line = lines[i - 1], lines[i]
+        if (line and _is_word(line[0]) and len(previous) >= 2
+                and previous[-1] == "-" and _is_word(previous[-2])
+                and not (merged and len(previous) == 2)):
+            parts[-1] = parts[-1][:-1]
+            merged = True
+        else:
+            parts.append(" ")
+            merged = False
+        parts.append(line)
+        i += 1
+    return "".join(parts)
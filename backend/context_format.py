@@ -0,0 +1,63 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+from .ranking import estimate_tokens
+
+
+@dataclass
+class FormattedContext:
+    """
+    Context text ready to be placed in the generation prompt.
+
+    Attributes:
+        text (str): The formatted context.
+        sources (List[Dict]): One entry per numbered source with its
+            `number`, `title` and `url`, in citation order.
+        tokens (int): The estimated token count of `text`.
+    """
+    text: str
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+
+
+def _title(metadata: Dict[str, Any]) -> str:
+    """
+    Return a single-line title for a source.
+    """
+    title = " ".join(str(metadata.get("title") or "").split())
+    return title or "Untitled"
+
+
+def format_context(docs: Sequence[Any]) -> FormattedContext:
+    """
+    Format chunks for the prompt, grouped under numbered sources.
+
+    Each source is introduced once by a `[n] Title, URL` header that
+    matches the citation style the prompt asks for, followed by its
+    chunks. Sources are numbered from 1 in order of first appearance,
+    so the most relevant source comes first when `docs` is ranked.
+
+    Args:
+        docs (Sequence[Document]): The chunks to include.
+
+    Returns:
+        FormattedContext: The prompt text, numbered sources and
+        estimated token count.
+    """
+    groups: Dict[str, List[str]] = {}
+    sources: List[Dict[str, Any]] = []
+    for doc in docs:
+        url = doc.metadata.get("source", "")
+        if url not in groups:
+            groups[url] = []
+            sources.append({"number": len(sources) + 1,
+                            "title": _title(doc.metadata),
+                            "url": url})
+        groups[url].append(doc.page_content.strip())
+
+    blocks = []
+    for source in sources:
+        header = f"[{source['number']}] {source['title']}, {source['url']}"
+        blocks.append("\n".join([header, *groups[source["url"]]]))
+    text = "\n\n".join(blocks)
+    return FormattedContext(text=text, sources=sources,
+                            tokens=estimate_tokens(text))
@@ -0,0 +1,324 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set
+import xxhash
+from .chunk_store import ChunkList, Source
+from .page_cache import normalize_url
+from .ranking import tokenize
+from .settings import get_settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    link TEXT NOT NULL,
+    chunking TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    text TEXT NOT NULL,
+    starts BLOB NOT NULL,
+    ends BLOB NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_index USING fts5(
+    text, tokenize = 'porter unicode61');
+"""
+
+# A chunk's rowid in the index is its page id shifted left by this
+# many bits plus its position, so a page's chunks form one rowid range.
+CHUNK_BITS = 16
+
+# Chunks read from the index per lookup, best first.
+LOOKUP_CHUNKS = 200
+
+# A page only covers a question when the question's terms occur
+# together, within this many content words of each other in one chunk,
+# rather than anywhere in it.
+MATCH_WINDOW = 12
+
+# Questions with fewer content terms than this are too vague to tell
+# whether pages scraped for other questions answer them.
+MIN_TERMS = 2
+
+
+def window_coverage(terms: Set[str], text: str) -> float:
+    """
+    The largest share of a question's terms found within
+    `MATCH_WINDOW` consecutive content words of a text.
+
+    Args:
+        terms (Set[str]): The question's terms.
+        text (str): The chunk text.
+
+    Returns:
+        float: The share, from 0 to 1.
+    """
+    hits = [(position, token)
+            for position, token in enumerate(tokenize(text))
+            if token in terms]
+    counts: Dict[str, int] = {}
+    best = 0
+    start = 0
+    for position, token in hits:
+        counts[token] = counts.get(token, 0) + 1
+        while position - hits[start][0] >= MATCH_WINDOW:
+            first = hits[start][1]
+            counts[first] -= 1
+            if not counts[first]:
+                del counts[first]
+            start += 1
+        best = max(best, len(counts))
+    return best / len(terms)
+
+
+@dataclass
+class CorpusHit:
+    """
+    A fresh local page that matches a question.
+
+    Attributes:
+        link (str): The page URL as it was scraped.
+        title (str): The page title, if known.
+        snippet (str): The start of the best matching chunk.
+        coverage (float): Share of the question's terms found close
+            together in the best matching chunk.
+        fetched_at (float): When the page was scraped (epoch seconds).
+        chunks (ChunkList): All of the page's chunks.
+    """
+    link: str
+    title: str
+    snippet: str
+    coverage: float
+    fetched_at: float
+    chunks: ChunkList = field(repr=False)
+
+
+class LocalCorpus:
+    """
+    A persistent full-text index of every page scraped so far.
+
+    Each page's cleaned text and chunk offsets are stored together
+    with the time it was scraped, and every chunk is indexed in an
+    SQLite FTS5 table ranked with BM25. A question is answered locally
+    when enough fresh pages each have a chunk containing most of the
+    question's terms close together; otherwise the caller falls back to
+    web search, whose pages are indexed in turn.
+    """
+
+    def __init__(self, path: str, max_age: float, min_pages: int,
+                 min_coverage: float, max_pages: int) -> None:
+        """
+        Args:
+            path (str): The SQLite file to use; parent dirs are created.
+            max_age (float): Seconds a page is used after scraping.
+            min_pages (int): Fresh matching pages needed to skip web
+                search.
+            min_coverage (float): Share of the question's terms a
+                page's best chunk must contain to count as a match.
+            max_pages (int): Pages kept; the oldest are dropped first.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_age = max_age
+        self.min_pages = min_pages
+        self.min_coverage = min_coverage
+        self.max_pages = max_pages
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls) -> "LocalCorpus":
+        """
+        Build the corpus from the `ASK_WEB_CORPUS_*` settings.
+        """
+        settings = get_settings()
+        return cls(os.path.join(settings.cache_dir, "corpus.sqlite3"),
+                   settings.corpus_max_age, settings.corpus_min_pages,
+                   settings.corpus_min_coverage, settings.corpus_max_pages)
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_page(self, link: str, chunks: ChunkList, chunking: str) -> None:
+        """
+        Index a scraped page, replacing any earlier version of it. A
+        page whose text has not changed only has its scrape time
+        renewed.
+
+        Args:
+            link (str): The page URL.
+            chunks (ChunkList): The page's chunks, all from one text.
+            chunking (str): Identifies how the chunks were made.
+        """
+        if not chunks:
+            return
+        source = chunks.sources[0]
+        content_hash = xxhash.xxh3_64_hexdigest(
+            f"{chunking}\0{source.text}".encode("utf-8"))
+        url = normalize_url(link)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT id, content_hash FROM pages WHERE url = ?",
+                (url,)).fetchone()
+            if row is not None and row[1] == content_hash:
+                conn.execute("UPDATE pages SET fetched_at = ? WHERE id = ?",
+                             (now, row[0]))
+                return
+            if row is not None:
+                self._delete(conn, row[0])
+            spans = [(start, end) for page, start, end in zip(
+                chunks.pages, chunks.starts, chunks.ends) if page == 0]
+            page_id = conn.execute(
+                "INSERT INTO pages (url, link, chunking, content_hash, "
+                "metadata, text, starts, ends, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, link, chunking, content_hash,
+                 json.dumps(source.metadata), source.text,
+                 array("I", (start for start, _ in spans)).tobytes(),
+                 array("I", (end for _, end in spans)).tobytes(),
+                 now)).lastrowid
+            conn.executemany(
+                "INSERT INTO chunk_index (rowid, text) VALUES (?, ?)",
+                (((page_id << CHUNK_BITS) + i, source.text[start:end])
+                 for i, (start, end) in enumerate(spans)))
+            self._evict(conn)
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, page_id: int) -> None:
+        """
+        Remove a page and its indexed chunks.
+        """
+        conn.execute(
+            "DELETE FROM chunk_index WHERE rowid BETWEEN ? AND ?",
+            (page_id << CHUNK_BITS, ((page_id + 1) << CHUNK_BITS) - 1))
+        conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """
+        Drop the least recently scraped pages beyond `max_pages`.
+        """
+        (count,) = conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        if count <= self.max_pages:
+            return
+        for (page_id,) in conn.execute(
+                "SELECT id FROM pages ORDER BY fetched_at LIMIT ?",
+                (count - self.max_pages,)).fetchall():
+            self._delete(conn, page_id)
+
+    def search(self, question: str, chunking: str) -> List[CorpusHit]:
+        """
+        Find the fresh pages whose best chunk contains at least
+        `min_coverage` of the question's terms close together (see
+        `window_coverage`), best BM25 match first. Questions with
+        fewer than `MIN_TERMS` terms match nothing.
+
+        Args:
+            question (str): The user's question.
+            chunking (str): Only pages chunked this way are returned.
+
+        Returns:
+            List[CorpusHit]: The matching pages.
+        """
+        terms = set(tokenize(question))
+        if len(terms) < MIN_TERMS:
+            return []
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT rowid, text FROM chunk_index WHERE chunk_index MATCH ? "
+            "ORDER BY bm25(chunk_index) LIMIT ?",
+            (" OR ".join(f'"{term}"' for term in sorted(terms)),
+             LOOKUP_CHUNKS)).fetchall()
+        best: Dict[int, tuple] = {}
+        for rowid, text in rows:
+            page_id = rowid >> CHUNK_BITS
+            coverage = window_coverage(terms, text)
+            if coverage >= self.min_coverage and (
+                    page_id not in best or coverage > best[page_id][0]):
+                best[page_id] = (coverage, text)
+        if not best:
+            return []
+        hits = []
+        oldest = time.time() - self.max_age
+        for page_id, (coverage, text) in best.items():
+            row = conn.execute(
+                "SELECT link, metadata, text, starts, ends, fetched_at "
+                "FROM pages WHERE id = ? AND chunking = ? "
+                "AND fetched_at >= ?", (page_id, chunking, oldest)).fetchone()
+            if row is None:
+                continue
+            link, metadata, page_text, start_bytes, end_bytes, fetched_at = (
+                row)
+            metadata = json.loads(metadata)
+            starts, ends = array("I"), array("I")
+            starts.frombytes(start_bytes)
+            ends.frombytes(end_bytes)
+            hits.append(CorpusHit(
+                link=link, title=metadata.get("title", ""),
+                snippet=text[:200], coverage=coverage,
+                fetched_at=fetched_at,
+                chunks=ChunkList([Source(page_text, metadata)],
+                                 [0] * len(starts), starts, ends)))
+        return hits
+
+    def lookup(self, question: str,
+               chunking: str) -> Optional[List[CorpusHit]]:
+        """
+        Answer a question's search locally when the corpus covers it.
+
+        Args:
+            question (str): The user's question.
+            chunking (str): Only pages chunked this way are used.
+
+        Returns:
+            Optional[List[CorpusHit]]: At least `min_pages` matching
+            fresh pages, or None when web search is needed.
+        """
+        hits = self.search(question, chunking)
+        return hits if len(hits) >= max(1, self.min_pages) else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the number of pages and chunks indexed.
+        """
+        conn = self._connect()
+        (pages,) = conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        (fresh,) = conn.execute(
+            "SELECT COUNT(*) FROM pages WHERE fetched_at >= ?",
+            (time.time() - self.max_age,)).fetchone()
+        return {"pages": pages, "fresh_pages": fresh,
+                "bytes_on_disk": os.path.getsize(self.path)}
+
+
+@lru_cache(maxsize=None)
+def get_corpus() -> Optional[LocalCorpus]:
+    """
+    Return the process-wide local corpus, or None if it is disabled
+    with `ASK_WEB_CORPUS=0`.
+
+    Returns:
+        Optional[LocalCorpus]: The shared corpus.
+    """
+    if not get_settings().corpus_enabled:
+        return None
+    return LocalCorpus.from_settings()
@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import xxhash
+from .ranking import TOKEN_PATTERN
+
+SHINGLE_SIZE = 3
+_SHIFTS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text: str) -> int:
+    """
+    Compute a 64-bit SimHash fingerprint of a text.
+
+    Word 3-gram shingles are hashed with xxh3 and each fingerprint bit
+    is set when the majority of shingle hashes have it set, so similar
+    texts get fingerprints a small Hamming distance apart.
+
+    Args:
+        text (str): The text to fingerprint.
+
+    Returns:
+        int: The fingerprint.
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = [" ".join(tokens[i:i + SHINGLE_SIZE])
+                    for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    hashes = np.fromiter((xxhash.xxh3_64_intdigest(s) for s in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    bits = (hashes[:, None] >> _SHIFTS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return sum(1 << int(i) for i in np.flatnonzero(votes > 0))
+
+
+def hamming(a: int, b: int) -> int:
+    """
+    Return the number of differing bits between two fingerprints.
+    """
+    return bin(a ^ b).count("1")
+
+
+def _distances(fingerprint: int, others: np.ndarray) -> np.ndarray:
+    """
+    Hamming distances from one fingerprint to an array of them.
+    """
+    xor = others ^ np.uint64(fingerprint)
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8),
+                         axis=1).sum(axis=1)
+
+
+def dedupe_chunks(
+        docs: Sequence[Any],
+        max_distance: int = 6,
+        source_rank: Optional[Dict[str, int]] = None
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Drop chunks that are near-duplicates of another chunk.
+
+    Chunks whose SimHash fingerprints differ in at most `max_distance`
+    bits are treated as duplicates. Of each group the chunk from the
+    strongest source is kept, i.e. the one with the lowest
+    `source_rank` (the search position of its page), so attribution
+    goes to the best-ranked original rather than a mirror.
+
+    Args:
+        docs (Sequence[Document]): The candidate chunks.
+        max_distance (int): Largest Hamming distance for duplicates.
+            Unrelated 500-character English chunks are rarely closer
+            than 10 bits; a one-word edit typically moves 4-8.
+        source_rank (Dict[str, int], optional): Rank of each source
+            URL; lower is stronger. Unknown sources rank last.
+
+    Returns:
+        Tuple[List[Document], Dict]: The kept chunks in their original
+        order, and counts with the dedup ratio.
+    """
+    rank = source_rank or {}
+    fingerprints = [simhash(doc.page_content) for doc in docs]
+    order = sorted(range(len(docs)), key=lambda i: (
+        rank.get(docs[i].metadata.get("source"), len(rank)), i))
+
+    kept = []
+    kept_fingerprints = np.zeros(len(docs), dtype=np.uint64)
+    for index in order:
+        distances = _distances(fingerprints[index],
+                               kept_fingerprints[:len(kept)])
+        if distances.size and distances.min() <= max_distance:
+            continue
+        kept_fingerprints[len(kept)] = fingerprints[index]
+        kept.append(index)
+
+    kept.sort()
+    stats = {
+        "chunks_in": len(docs),
+        "chunks_out": len(kept),
+        "duplicates": len(docs) - len(kept),
+        "dedup_ratio": (len(docs) - len(kept)) / len(docs) if docs else 0.0,
+    }
+    return [docs[i] for i in kept], stats
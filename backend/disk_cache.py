@@ -0,0 +1,298 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import zstandard
+
+
+@dataclass
+class CacheEntry:
+    """
+    A value read back from the disk cache.
+
+    Attributes:
+        key (str): The cache key.
+        value (bytes): The decompressed value.
+        meta (Dict[str, str]): Small string metadata stored alongside.
+        stored_at (float): When the value was written (epoch seconds).
+        expires_at (float): When the value stops being fresh.
+    """
+    key: str
+    value: bytes
+    meta: Dict[str, str] = field(default_factory=dict)
+    stored_at: float = 0.0
+    expires_at: float = 0.0
+
+    @property
+    def fresh(self) -> bool:
+        """
+        Whether the entry is still within its time-to-live.
+        """
+        return time.time() < self.expires_at
+
+
+@dataclass
+class CacheStats:
+    """
+    Per-process counters for a disk cache.
+
+    Attributes:
+        hits (int): Lookups that found an entry.
+        misses (int): Lookups that found nothing.
+        stores (int): Values written.
+        evictions (int): Entries removed to respect the size cap.
+        bytes_read (int): Compressed bytes read from disk.
+        bytes_written (int): Compressed bytes written to disk.
+    """
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    meta TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (name, value)
+    SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries;
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET value = value + new.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET value = value - old.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries
+BEGIN
+    UPDATE totals SET value = value - old.size + new.size
+        WHERE name = 'bytes';
+END;
+"""
+
+# Entries deleted per statement while evicting, so one write never
+# scans or locks the whole table.
+EVICT_BATCH = 64
+
+
+class DiskCache:
+    """
+    A size-bounded, zstd-compressed key/value store backed by SQLite.
+
+    SQLite in WAL mode lets several worker processes share one cache
+    file safely. Entries carry a time-to-live; stale entries are still
+    returned (with `fresh == False`) so callers can revalidate them.
+    When the stored size exceeds `max_bytes` the least recently used
+    entries are evicted. The total size is kept up to date by triggers
+    in a `totals` row, so checking the cap does not scan the table.
+    """
+
+    def __init__(self, path: str, max_bytes: int,
+                 compression_level: int = 3) -> None:
+        """
+        Args:
+            path (str): The SQLite file to use; parent dirs are created.
+            max_bytes (int): The cap on total compressed bytes stored.
+            compression_level (int): The zstd compression level.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.compression_level = compression_level
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _codecs(self) -> tuple:
+        """
+        Return this thread's zstd compressor and decompressor; they
+        are not safe to share between threads.
+        """
+        codecs = getattr(self._local, "codecs", None)
+        if codecs is None:
+            codecs = (
+                zstandard.ZstdCompressor(level=self.compression_level),
+                zstandard.ZstdDecompressor())
+            self._local.codecs = codecs
+        return codecs
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Look up a key and mark it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[CacheEntry]: The entry, fresh or stale, or None.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, meta, stored_at, expires_at FROM entries "
+            "WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        blob, meta, stored_at, expires_at = row
+        with conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?",
+                         (time.time(), key))
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.bytes_read += len(blob)
+        return CacheEntry(
+            key=key,
+            value=self._codecs()[1].decompress(blob),
+            meta=json.loads(meta),
+            stored_at=stored_at,
+            expires_at=expires_at,
+        )
+
+    def get_meta(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Read only an entry's metadata, without decompressing its value,
+        marking it as used or counting a lookup.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[Dict[str, str]]: The metadata, or None on a miss.
+        """
+        row = self._connect().execute(
+            "SELECT meta FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key: str, value: bytes, ttl: float,
+            meta: Optional[Dict[str, str]] = None) -> None:
+        """
+        Store a value, replacing any previous entry for the key, then
+        evict least recently used entries if over the size cap.
+
+        Args:
+            key (str): The cache key.
+            value (bytes): The value to store.
+            ttl (float): Seconds the value stays fresh.
+            meta (Dict[str, str], optional): Small string metadata.
+        """
+        blob = self._codecs()[0].compress(value)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            # An upsert rather than INSERT OR REPLACE, whose implicit
+            # delete would not fire the trigger keeping the total.
+            conn.execute(
+                "INSERT INTO entries (key, value, meta, size, stored_at, "
+                "expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                "meta = excluded.meta, size = excluded.size, "
+                "stored_at = excluded.stored_at, "
+                "expires_at = excluded.expires_at, "
+                "last_access = excluded.last_access",
+                (key, blob, json.dumps(meta or {}), len(blob),
+                 now, now + ttl, now))
+        with self._lock:
+            self.stats.stores += 1
+            self.stats.bytes_written += len(blob)
+        self._evict()
+
+    def refresh(self, key: str, ttl: float,
+                meta: Optional[Dict[str, str]] = None) -> None:
+        """
+        Extend an entry's time-to-live without rewriting its value,
+        e.g. after a successful conditional revalidation.
+
+        Args:
+            key (str): The cache key.
+            ttl (float): Seconds the value stays fresh from now.
+            meta (Dict[str, str], optional): Replacement metadata.
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            if meta is None:
+                conn.execute(
+                    "UPDATE entries SET expires_at = ?, last_access = ? "
+                    "WHERE key = ?", (now + ttl, now, key))
+            else:
+                conn.execute(
+                    "UPDATE entries SET expires_at = ?, last_access = ?, "
+                    "meta = ? WHERE key = ?",
+                    (now + ttl, now, json.dumps(meta), key))
+
+    def delete(self, key: str) -> None:
+        """
+        Remove a key if present.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def total_bytes(self) -> int:
+        """
+        Return the total compressed size of all stored entries.
+        """
+        row = self._connect().execute(
+            "SELECT value FROM totals WHERE name = 'bytes'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _evict(self) -> None:
+        """
+        Delete least recently used entries until the cache is back
+        under its size cap, reading at most `EVICT_BATCH` of them per
+        round through the `last_access` index.
+        """
+        evicted = 0
+        conn = self._connect()
+        while True:
+            with conn:
+                excess = self.total_bytes() - self.max_bytes
+                if excess <= 0:
+                    break
+                victims = []
+                for key, size in conn.execute(
+                        "SELECT key, size FROM entries "
+                        "ORDER BY last_access ASC LIMIT ?", (EVICT_BATCH,)):
+                    victims.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM entries WHERE key = ?",
+                                 victims)
+            if not victims:
+                break
+            evicted += len(victims)
+        with self._lock:
+            self.stats.evictions += evicted
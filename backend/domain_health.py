@@ -0,0 +1,261 @@
+import asyncio
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+from .fetcher import FetchError
+from .instrumentation import DOMAIN_EVENTS
+from .parse_pool import ParseBusy, ParseTimeout
+from .settings import get_settings
+
+# Failures that open the circuit straight away: the site is refusing us.
+BLOCKING_REASONS = frozenset({"blocked", "captcha"})
+
+CAPTCHA_PATTERN = re.compile(
+    r"captcha|are you (?:a )?(?:robot|human)|verify (?:that )?you are "
+    r"(?:a )?human|unusual traffic|access denied|attention required|"
+    r"just a moment\.\.\.|checking your browser|enable javascript and "
+    r"cookies to continue", re.I)
+
+# Interstitial and block pages are short: at most this many chunks.
+CAPTCHA_MAX_CHUNKS = 4
+
+
+def domain_of(url: str) -> str:
+    """
+    The host a URL points at, lowercased and without a `www.` prefix.
+    """
+    host = (urlsplit(url.strip()).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def looks_like_captcha(chunks: Sequence[Any]) -> bool:
+    """
+    Whether a page's chunks look like a captcha, bot check or block
+    page rather than content.
+    """
+    if not chunks or len(chunks) > CAPTCHA_MAX_CHUNKS:
+        return False
+    text = " ".join(chunk.page_content for chunk in chunks)
+    return CAPTCHA_PATTERN.search(text) is not None
+
+
+def failure_reason(error: BaseException) -> Optional[str]:
+    """
+    Classify a scrape error as `blocked` (403/429), `timeout` or
+    `error`, or None when the error is ours rather than the site's,
+    such as every parse worker being busy.
+    """
+    if isinstance(error, ParseBusy):
+        return None
+    if isinstance(error, FetchError):
+        if error.status in (403, 429):
+            return "blocked"
+        if isinstance(error.__cause__, asyncio.TimeoutError):
+            return "timeout"
+    if isinstance(error, (ParseTimeout, asyncio.TimeoutError)):
+        return "timeout"
+    return "error"
+
+
+@dataclass
+class DomainState:
+    """
+    What is known about one domain.
+
+    Attributes:
+        failures (int): Failures since the last success or since the
+            circuit last opened.
+        opened (int): Times the circuit opened without a success in
+            between, which sets the length of the next cool-down.
+        open_until (float): Monotonic time the circuit stays open.
+        reason (str): The most recent failure reason.
+    """
+    failures: int = 0
+    opened: int = 0
+    open_until: float = 0.0
+    reason: str = ""
+
+
+class DomainHealth:
+    """
+    A per-domain circuit breaker for the sites pages are scraped from.
+
+    Failures (errors, timeouts, empty extractions) are counted per
+    domain. After `threshold` of them in a row, or at once for a 403,
+    a 429 or a captcha, the circuit opens for a cool-down that doubles
+    each time it reopens, up to `max_cooldown`. While open, links to
+    the domain are skipped; once the cool-down has passed they are
+    tried again, after the healthy links, and a success closes the
+    circuit.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 60.0,
+                 max_cooldown: float = 3600.0) -> None:
+        """
+        Args:
+            threshold (int): Failures in a row that open the circuit;
+                0 never opens it.
+            cooldown (float): Seconds the circuit first stays open.
+            max_cooldown (float): Upper bound of the cool-down.
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._domains: Dict[str, DomainState] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "DomainHealth":
+        """
+        Build the tracker from the `ASK_WEB_DOMAIN_*` settings.
+        """
+        settings = get_settings()
+        return cls(settings.domain_failure_threshold,
+                   settings.domain_cooldown, settings.domain_max_cooldown)
+
+    def record_success(self, url: str) -> None:
+        """
+        Close the circuit of a URL's domain and forget its failures.
+        """
+        with self._lock:
+            self._domains.pop(domain_of(url), None)
+
+    def record_error(self, url: str, error: BaseException) -> None:
+        """
+        Count a scrape error against a URL's domain, unless it was not
+        the site's fault.
+
+        Args:
+            url (str): The page that failed.
+            error (BaseException): What the scrape raised.
+        """
+        reason = failure_reason(error)
+        if reason is not None:
+            self.record_failure(url, reason)
+
+    def record_failure(self, url: str, reason: str) -> None:
+        """
+        Count a failure for a URL's domain, opening its circuit when
+        the domain keeps failing.
+
+        Args:
+            url (str): The page that failed.
+            reason (str): `blocked`, `captcha`, `empty`, `timeout` or
+                `error`.
+        """
+        DOMAIN_EVENTS.inc(event=reason)
+        if self.threshold <= 0:
+            return
+        domain = domain_of(url)
+        with self._lock:
+            state = self._domains.setdefault(domain, DomainState())
+            state.failures += 1
+            state.reason = reason
+            if (reason not in BLOCKING_REASONS
+                    and state.failures < self.threshold):
+                return
+            state.opened += 1
+            state.failures = 0
+            state.open_until = time.monotonic() + min(
+                self.max_cooldown, self.cooldown * 2 ** (state.opened - 1))
+        DOMAIN_EVENTS.inc(event="opened")
+        print(f"Skipping {domain} for a while after repeated failures "
+              f"({reason})")
+
+    def check_page(self, url: str, chunks: Sequence[Any]) -> bool:
+        """
+        Record the outcome of a scraped page: empty and captcha pages
+        count as failures, anything else as a success.
+
+        Args:
+            url (str): The page.
+            chunks (Sequence): The page's chunks.
+
+        Returns:
+            bool: Whether the chunks are usable content.
+        """
+        if not chunks:
+            self.record_failure(url, "empty")
+            return False
+        if looks_like_captcha(chunks):
+            self.record_failure(url, "captcha")
+            return False
+        self.record_success(url)
+        return True
+
+    def status(self, url: str) -> str:
+        """
+        The state of a URL's domain: `open` while it is cooling down,
+        `suspect` when it failed recently or its cool-down has just
+        ended, otherwise `ok`.
+        """
+        with self._lock:
+            state = self._domains.get(domain_of(url))
+            if state is None:
+                return "ok"
+            if time.monotonic() < state.open_until:
+                return "open"
+            return "suspect"
+
+    def triage(self, url: str) -> str:
+        """
+        The `status` of a URL about to be scraped, counting it as
+        skipped when its domain's circuit is open.
+        """
+        status = self.status(url)
+        if status == "open":
+            DOMAIN_EVENTS.inc(event="skipped")
+        return status
+
+    def prioritize(self, links: List[str]) -> Tuple[List[str],
+                                                    Dict[str, Any]]:
+        """
+        Drop links to domains whose circuit is open and move links to
+        suspect domains behind the healthy ones, keeping search order
+        otherwise.
+
+        Args:
+            links (List[str]): Search result links, best first.
+
+        Returns:
+            Tuple[List[str], Dict]: The links to scrape, and the
+            skipped domains and number of deprioritized links.
+        """
+        healthy, suspect, skipped = [], [], []
+        for link in links:
+            status = self.triage(link)
+            if status == "open":
+                skipped.append(domain_of(link))
+            elif status == "suspect":
+                suspect.append(link)
+            else:
+                healthy.append(link)
+        return healthy + suspect, {"skipped": skipped,
+                                   "deprioritized": len(suspect)}
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The tracked domains with their state, for `/health`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {domain: {"failures": state.failures,
+                             "opened": state.opened,
+                             "reason": state.reason,
+                             "open_for": max(0.0, state.open_until - now)}
+                    for domain, state in self._domains.items()}
+
+
+@lru_cache(maxsize=None)
+def get_domain_health() -> DomainHealth:
+    """
+    Return the process-wide domain health tracker.
+
+    Returns:
+        DomainHealth: The shared tracker.
+    """
+    return DomainHealth.from_settings()
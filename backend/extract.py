@@ -0,0 +1,201 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Optional
+from langchain.schema import Document
+
+# Elements whose content is never useful answer context.
+SKIP_TAGS = frozenset(
+    {"script", "style", "nav", "noscript", "template", "svg"})
+
+META_CHARSET = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?([a-zA-Z0-9_\-]+)""", re.I)
+
+
+def sniff_charset(head: bytes) -> Optional[str]:
+    """
+    Find the charset declared in a page's `<meta>` tags.
+
+    Args:
+        head (bytes): The first bytes of the page.
+
+    Returns:
+        Optional[str]: The declared charset, if it is a known codec.
+    """
+    match = META_CHARSET.search(head[:4096])
+    if match is None:
+        return None
+    name = match.group(1).decode("ascii")
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return None
+    return name
+
+
+class TextExtractor(HTMLParser):
+    """
+    An incremental HTML-to-text extractor that stops early.
+
+    Feed it the page as it downloads; it keeps the visible text
+    (skipping script, style and navigation content) and reports when
+    `max_chars` characters have been collected so the download can be
+    abandoned. It also records the title, description and language
+    metadata WebBaseLoader used to attach.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None,
+                 encoding: Optional[str] = None) -> None:
+        """
+        Args:
+            max_chars (int, optional): Stop after this many characters
+                of text; None keeps the whole page.
+            encoding (str, optional): The charset announced by the
+                server; sniffed from the page when missing.
+        """
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.encoding = encoding
+        self.done = False
+        self.title: Optional[str] = None
+        self.description: Optional[str] = None
+        self.language: Optional[str] = None
+        self._decoder = None
+        self._parts: list[str] = []
+        self._chars = 0
+        self._skip_depth = 0
+        self._in_title = False
+
+    def start(self, encoding: Optional[str]) -> None:
+        """
+        Receive the charset from the response headers.
+        """
+        self.encoding = self.encoding or encoding
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        """
+        Decode and parse the next piece of the download.
+
+        Args:
+            chunk (bytes): The next bytes of the body.
+
+        Returns:
+            bool: True once enough text has been collected.
+        """
+        if self._decoder is None:
+            self.encoding = (self.encoding or sniff_charset(chunk)
+                             or "utf-8")
+            try:
+                factory = codecs.getincrementaldecoder(self.encoding)
+            except LookupError:
+                self.encoding = "utf-8"
+                factory = codecs.getincrementaldecoder(self.encoding)
+            self._decoder = factory(errors="replace")
+        self.feed(self._decoder.decode(chunk))
+        return self.done
+
+    def feed(self, data: str) -> None:
+        """
+        Parse more HTML, ignoring input once the budget is reached.
+        """
+        if not self.done:
+            super().feed(data)
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attributes = dict(attrs)
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title" and self.title is None:
+            self._in_title = True
+            self.title = ""
+        elif tag == "meta" and attributes.get("name") == "description":
+            self.description = attributes.get(
+                "content") or "No description found."
+        elif tag == "html" and self.language is None:
+            self.language = attributes.get("lang") or "No language found."
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+        if self._skip_depth or self.done:
+            return
+        self._parts.append(data)
+        self._chars += len(data)
+        if self.max_chars is not None and self._chars >= self.max_chars:
+            self.done = True
+
+    @property
+    def text(self) -> str:
+        """
+        The text collected so far, capped at `max_chars`.
+        """
+        text = "".join(self._parts)
+        return text if self.max_chars is None else text[:self.max_chars]
+
+    def document(self, url: str) -> Document:
+        """
+        Finish parsing and return the page as a Document.
+
+        Args:
+            url (str): The URL the page was loaded from.
+
+        Returns:
+            Document: The extracted text with its metadata.
+        """
+        if not self.done:
+            if self._decoder is not None:
+                super().feed(self._decoder.decode(b"", final=True))
+            self.close()
+        metadata = {"source": url}
+        if self.title is not None:
+            metadata["title"] = self.title
+        if self.description is not None:
+            metadata["description"] = self.description
+        if self.language is not None:
+            metadata["language"] = self.language
+        return Document(page_content=self.text, metadata=metadata)
+
+
+def extract_document(body: bytes, url: str,
+                     encoding: Optional[str] = None,
+                     max_chars: Optional[int] = None) -> Document:
+    """
+    Extract a Document from an already downloaded page body.
+
+    Args:
+        body (bytes): The raw HTML.
+        url (str): The URL the page was loaded from.
+        encoding (str, optional): The page charset, if known.
+        max_chars (int, optional): Stop after this many characters.
+
+    Returns:
+        Document: The page text with its metadata.
+    """
+    extractor = TextExtractor(max_chars=max_chars, encoding=encoding)
+    step = 64 * 1024
+    for offset in range(0, len(body), step):
+        if extractor.feed_bytes(body[offset:offset + step]):
+            break
+    return extractor.document(url)
+
+
+def html_to_document(html: str, url: str) -> Document:
+    """
+    Convert a downloaded HTML page into a LangChain Document.
+
+    Args:
+        html (str): The decoded HTML of the page.
+        url (str): The URL the page was loaded from.
+
+    Returns:
+        Document: The page text with its metadata.
+    """
+    extractor = TextExtractor()
+    extractor.feed(html)
+    return extractor.document(url)
@@ -0,0 +1,124 @@
+"""
+A deterministic, in-process chat model, so the whole graph can run
+offline. Select it with `ASK_WEB_LLM_MODEL=fake` (see `load_llm`).
+"""
+import asyncio
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.callbacks import (AsyncCallbackManagerForLLMRun,
+                                      CallbackManagerForLLMRun)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import (ChatGeneration, ChatGenerationChunk,
+                                    ChatResult)
+from langchain_core.runnables import RunnableLambda
+
+SOURCE_LINE = re.compile(r"^\[(\d+)\] (.*), (https?://\S+)$", re.MULTILINE)
+
+
+def fake_answer(prompt: str) -> str:
+    """
+    Write a deterministic answer that cites the first source of the
+    prompt's context with a sentence copied from it.
+    """
+    sources = SOURCE_LINE.findall(prompt)
+    if not sources:
+        return "I could not find an answer in the sources."
+    number, title, url = sources[0]
+    start = prompt.index(url) + len(url)
+    words = prompt[start:].split()[:25]
+    return (f"{' '.join(words).rstrip('.')} [{number}].\n\n"
+            f"Sources:\n[{number}] {title}, {url}")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A deterministic chat model with configurable latency.
+
+    It waits `first_token_latency` seconds, then streams its answer
+    word by word with `token_latency` seconds between words, and
+    reports usage metadata estimated at four characters per token.
+    Citation verification through `with_structured_output` always
+    passes.
+    """
+
+    first_token_latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    @staticmethod
+    def _prompt(messages: List[BaseMessage]) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    @staticmethod
+    def _usage(prompt: str, answer: str) -> Dict[str, int]:
+        input_tokens = len(prompt) // 4
+        output_tokens = len(answer) // 4
+        return {"input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _pieces(self, messages: List[BaseMessage]) -> Iterator[tuple]:
+        prompt = self._prompt(messages)
+        answer = fake_answer(prompt)
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            text = word if i == len(words) - 1 else word + " "
+            yield (self.first_token_latency if i == 0
+                   else self.token_latency), AIMessageChunk(content=text)
+        yield 0.0, AIMessageChunk(content="",
+                                  usage_metadata=self._usage(prompt, answer))
+
+    def _generate(self, messages: List[BaseMessage], stop: Any = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None,
+                  **kwargs: Any) -> ChatResult:
+        prompt = self._prompt(messages)
+        answer = fake_answer(prompt)
+        time.sleep(self.first_token_latency
+                   + self.token_latency * len(answer.split(" ")))
+        message = AIMessage(content=answer,
+                            usage_metadata=self._usage(prompt, answer))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Any = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for delay, chunk in self._pieces(messages):
+            if delay:
+                time.sleep(delay)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+            self, messages: List[BaseMessage], stop: Any = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any):
+        for delay, chunk in self._pieces(messages):
+            if delay:
+                await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=chunk)
+
+    def with_structured_output(self, schema: Any, *,
+                               include_raw: bool = False,
+                               **kwargs: Any) -> RunnableLambda:
+        verdict = {"status": "PASS"}
+
+        def result(prompt: Any) -> Dict[str, Any]:
+            if not include_raw:
+                return verdict
+            raw = AIMessage(content='{"status": "PASS"}',
+                            usage_metadata=self._usage(str(prompt), "PASS"))
+            return {"raw": raw, "parsed": verdict, "parsing_error": None}
+
+        def verify(prompt: Any) -> Dict[str, Any]:
+            time.sleep(self.first_token_latency)
+            return result(prompt)
+
+        async def averify(prompt: Any) -> Dict[str, Any]:
+            await asyncio.sleep(self.first_token_latency)
+            return result(prompt)
+
+        return RunnableLambda(verify, afunc=averify)
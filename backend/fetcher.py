@@ -0,0 +1,298 @@
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Mapping, Optional, Protocol
+from urllib.parse import urlsplit
+import aiohttp
+from multidict import CIMultiDict
+from .extract import sniff_charset
+from .settings import Settings, get_settings
+
+
+class FetchError(Exception):
+    """
+    Raised when a page cannot be downloaded (connection error,
+    timeout, invalid URL or an HTTP error status).
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        """
+        Args:
+            message (str): What went wrong.
+            status (int, optional): The HTTP status, for error responses.
+        """
+        super().__init__(message)
+        self.status = status
+
+
+CHUNK_SIZE = 16 * 1024
+
+
+class BodySink(Protocol):
+    """
+    Receives a response body while it downloads.
+
+    `start` is called once with the charset from the response headers
+    (or None); `feed_bytes` is called per chunk and returns True when
+    the sink has seen enough and the download can stop.
+    """
+    encoding: Optional[str]
+
+    def start(self, encoding: Optional[str]) -> None:
+        ...
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        ...
+
+
+@dataclass
+class FetchResult:
+    """
+    The outcome of downloading a single URL.
+
+    Attributes:
+        url (str): The final URL after redirects.
+        status (int): The HTTP status code.
+        headers (Mapping[str, str]): The response headers
+            (case-insensitive).
+        body (bytes): The raw response body.
+        encoding (str): The charset used to decode the body.
+        truncated (bool): Whether the download stopped before the end
+            of the body.
+    """
+    url: str
+    status: int
+    headers: Mapping[str, str] = field(default_factory=CIMultiDict)
+    body: bytes = b""
+    encoding: str = "utf-8"
+    truncated: bool = False
+
+    @property
+    def text(self) -> str:
+        """
+        The body decoded with the detected charset.
+        """
+        return self.body.decode(self.encoding, errors="replace")
+
+
+class AsyncFetcher:
+    """
+    An asyncio page downloader sharing one pooled aiohttp session.
+
+    The connector keeps connections alive between requests, caps the
+    total and per-host number of open connections and caches DNS
+    lookups. A fetcher is bound to the event loop it first runs on;
+    use `get_fetcher` to obtain the one for the current loop.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None) -> None:
+        self.settings = settings or get_settings()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared session, creating it on first use.
+        """
+        if self._session is None or self._session.closed:
+            settings = self.settings
+            connector = aiohttp.TCPConnector(
+                limit=settings.fetch_max_connections,
+                limit_per_host=settings.fetch_max_per_host,
+                ttl_dns_cache=settings.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=settings.fetch_total_timeout,
+                sock_connect=settings.fetch_connect_timeout,
+                sock_read=settings.fetch_read_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={"User-Agent": settings.user_agent},
+            )
+        return self._session
+
+    async def fetch(
+            self,
+            url: str,
+            headers: Optional[Dict[str, str]] = None,
+            max_bytes: Optional[int] = None,
+            sink: Optional[BodySink] = None) -> FetchResult:
+        """
+        Download a URL through the shared connection pool.
+
+        With `max_bytes` or `sink` the body is streamed in chunks and
+        the download stops as soon as the byte cap is reached or the
+        sink reports it has enough, instead of buffering whole pages.
+
+        Args:
+            url (str): The URL to download.
+            headers (Dict[str, str], optional): Extra request headers.
+            max_bytes (int, optional): Stop reading after this many bytes.
+            sink (BodySink, optional): Consumes the body as it arrives.
+
+        Returns:
+            FetchResult: The response status, headers and (possibly
+            truncated) body.
+
+        Raises:
+            FetchError: If the connection fails or a timeout expires.
+        """
+        session = self._get_session()
+        try:
+            async with session.get(url, headers=headers) as response:
+                if max_bytes is None and sink is None:
+                    body = await response.read()
+                    truncated = False
+                    try:
+                        encoding = response.get_encoding()
+                    except RuntimeError:
+                        encoding = "utf-8"
+                else:
+                    body, truncated = await self._read_capped(
+                        response, max_bytes, sink)
+                    encoding = ((sink.encoding if sink else None)
+                                or response.charset or sniff_charset(body)
+                                or "utf-8")
+                return FetchResult(
+                    url=str(response.url),
+                    status=response.status,
+                    headers=CIMultiDict(response.headers),
+                    body=body,
+                    encoding=encoding,
+                    truncated=truncated,
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise FetchError(f"{url}: {e!r}") from e
+
+    async def warm_up(self, url: str) -> bool:
+        """
+        Open a pooled connection to a URL's origin (DNS lookup, TCP
+        and TLS handshakes) ahead of the page downloads that will use
+        it. A HEAD request for the site root is sent without following
+        redirects, and the kept-alive connection returns to the pool.
+
+        Args:
+            url (str): Any URL on the site.
+
+        Returns:
+            bool: Whether a connection was opened.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            return False
+        timeout = aiohttp.ClientTimeout(
+            total=self.settings.fetch_connect_timeout)
+        try:
+            async with self._get_session().head(
+                    f"{parts.scheme}://{parts.netloc}/",
+                    allow_redirects=False, timeout=timeout):
+                return True
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return False
+
+    @staticmethod
+    async def _read_capped(
+            response: aiohttp.ClientResponse,
+            max_bytes: Optional[int],
+            sink: Optional[BodySink]) -> tuple[bytes, bool]:
+        """
+        Stream a response body, stopping at the byte cap or when the
+        sink has enough.
+
+        Returns:
+            tuple[bytes, bool]: The bytes read and whether reading
+            stopped early.
+        """
+        if sink is not None:
+            sink.start(response.charset)
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            # Only bytes beyond the cap mean the body was cut; a body of
+            # exactly `max_bytes` ends the loop untruncated.
+            if max_bytes is not None and len(body) + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - len(body)]
+                body += chunk
+                if sink is not None and chunk:
+                    sink.feed_bytes(chunk)
+                return bytes(body), True
+            body += chunk
+            if sink is not None and sink.feed_bytes(chunk):
+                return bytes(body), True
+        return bytes(body), False
+
+    async def close(self) -> None:
+        """
+        Close the underlying session and release pooled connections.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# One fetcher per event loop: aiohttp sessions cannot cross loops.
+_fetchers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_loop_lock = threading.Lock()
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_fetcher() -> AsyncFetcher:
+    """
+    Return the fetcher bound to the running event loop, creating it on
+    first use. Must be called from inside a coroutine.
+
+    Returns:
+        AsyncFetcher: The shared fetcher for this loop.
+    """
+    loop = asyncio.get_running_loop()
+    fetcher = _fetchers.get(loop)
+    if fetcher is None:
+        fetcher = AsyncFetcher()
+        _fetchers[loop] = fetcher
+    return fetcher
+
+
+async def close_fetcher() -> None:
+    """
+    Close the fetcher bound to the running event loop, if any.
+    Call this before a short-lived loop (e.g. `asyncio.run`) exits.
+    """
+    fetcher = _fetchers.pop(asyncio.get_running_loop(), None)
+    if fetcher is not None:
+        await fetcher.close()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the event loop that serves synchronous callers, starting
+    it in a daemon thread the first time it is needed.
+    """
+    global _background_loop
+    with _loop_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="fetcher-loop", daemon=True)
+            thread.start()
+            _background_loop = loop
+    return _background_loop
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine on the shared background loop and wait for it.
+
+    This lets synchronous code (e.g. graph nodes run by `graph.stream`
+    in worker threads) reuse one connection pool instead of opening a
+    new session per call.
+
+    Args:
+        coro (Awaitable): The coroutine to run.
+
+    Returns:
+        Any: The coroutine's result.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
+    return future.result()
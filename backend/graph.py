@@ -1,6 +1,9 @@
-from .nodes import (State, get_links, scrape_web_data,
-                    generate_answer, send_to_scrape_data,
-                    verify_citations)
+from .nodes import (State, get_links, aget_links, route_links,
+                    scrape_web_data, ascrape_web_data, search_and_scrape,
+                    asearch_and_scrape, select_context, generate_answer,
+                    agenerate_answer, verify_citations, averify_citations)
+from .settings import get_settings
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import START, StateGraph
 import os
 from dotenv import load_dotenv
@@ -14,31 +17,59 @@ def generate_graph() -> StateGraph:
     for a web-based question-answering workflow.
 
     The flow of the graph is:
-    START → get_links → scrape_web_data → generate_answer → verify_citations
+    START → get_links → scrape_web_data → select_context
+          → generate_answer → verify_citations
 
-    The transition from `get_links` to `scrape_web_data` is
-    determined by the `send_to_scrape_data` condition.
+    When the local corpus of previously scraped pages covers the
+    question, `get_links` returns their chunks and the graph goes
+    straight to `select_context`. With `ASK_WEB_PIPELINE=1` the first
+    two steps are replaced by `search_and_scrape`, which starts each
+    download as soon as its search result is known.
+
+    `scrape_web_data` fetches the links concurrently under a time
+    budget (see `ScrapePolicy`). Every I/O-bound node has both a sync
+    and an async implementation, so the graph can be driven with
+    `stream` or `astream`; under `astream` no thread is blocked on the
+    network while waiting for search, pages or the LLM.
 
     Returns:
         StateGraph: A compiled LangGraph StateGraph object
     """
     os.environ["LANGSMITH_API_KEY"] = os.getenv("LANGSMITH_API_KEY", "")
-    os.environ["LANGSMITH_TRACING"] = "true"
+    os.environ["LANGSMITH_TRACING"] = (
+        "true" if os.environ["LANGSMITH_API_KEY"] else "false")
     os.environ["LANGCHAIN_PROJECT"] = "Web Assistant QA"
 
     graph_builder = StateGraph(State)
-    graph_builder.add_node(get_links)
-    graph_builder.add_node(scrape_web_data)
-    graph_builder.add_node(generate_answer)
-    graph_builder.add_node(verify_citations)
-
-    graph_builder.add_edge(START, "get_links")
-    graph_builder.add_conditional_edges(
-        'get_links',
-        send_to_scrape_data,
-        ['scrape_web_data']
+    if get_settings().pipeline_search:
+        graph_builder.add_node(
+            "search_and_scrape",
+            RunnableLambda(search_and_scrape, afunc=asearch_and_scrape),
+        )
+        graph_builder.add_edge(START, "search_and_scrape")
+        graph_builder.add_edge("search_and_scrape", "select_context")
+    else:
+        graph_builder.add_node(
+            "get_links", RunnableLambda(get_links, afunc=aget_links))
+        graph_builder.add_node(
+            "scrape_web_data",
+            RunnableLambda(scrape_web_data, afunc=ascrape_web_data),
+        )
+        graph_builder.add_edge(START, "get_links")
+        graph_builder.add_conditional_edges(
+            'get_links', route_links, ['scrape_web_data', 'select_context'])
+        graph_builder.add_edge('scrape_web_data', 'select_context')
+    graph_builder.add_node(select_context)
+    graph_builder.add_node(
+        "generate_answer",
+        RunnableLambda(generate_answer, afunc=agenerate_answer),
+    )
+    graph_builder.add_node(
+        "verify_citations",
+        RunnableLambda(verify_citations, afunc=averify_citations),
     )
-    graph_builder.add_edge('scrape_web_data', 'generate_answer')
+
+    graph_builder.add_edge('select_context', 'generate_answer')
     graph_builder.add_edge('generate_answer', 'verify_citations')
     graph = graph_builder.compile()
 
@@ -0,0 +1,275 @@
+import asyncio
+import functools
+import json
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from .settings import get_settings
+
+Labels = Tuple[Tuple[str, str], ...]
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1024, 8192, 32768, 131072, 524288, 2097152, 8388608)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """
+    A monotonically increasing count, one series per label set.
+    """
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._series: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels: Any) -> None:
+        """
+        Add `value` to the series with the given labels.
+        """
+        key = _labels(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    """
+    A distribution of observed values in cumulative buckets, one
+    series per label set, as used by Prometheus.
+    """
+
+    def __init__(self, name: str, help: str,
+                 buckets: Sequence[float] = SECONDS_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """
+        Record one value in the series with the given labels.
+        """
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.setdefault(
+                key, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(
+                    self._series.items()):
+                for bound, value in zip(self.buckets, counts):
+                    le = _format_labels(labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {value}")
+                le = _format_labels(labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+                lines.append(
+                    f"{self.name}_sum{_format_labels(labels)} {total}")
+                lines.append(
+                    f"{self.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """
+    The process-wide collection of counters and histograms.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str) -> Counter:
+        """
+        Return the counter registered under `name`, creating it.
+        """
+        return self._get_or_create(name, lambda: Counter(name, help))
+
+    def histogram(self, name: str, help: str,
+                  buckets: Sequence[float] = SECONDS_BUCKETS) -> Histogram:
+        """
+        Return the histogram registered under `name`, creating it.
+        """
+        return self._get_or_create(
+            name, lambda: Histogram(name, help, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The text served on `/metrics`.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def reset(self) -> None:
+        """
+        Drop every recorded sample. Mainly useful in tests.
+        """
+        with self._lock:
+            for metric in self._metrics.values():
+                with metric._lock:
+                    metric._series.clear()
+
+
+REGISTRY = MetricsRegistry()
+NODE_SECONDS = REGISTRY.histogram(
+    "ask_web_node_seconds", "Time spent in each graph node.")
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ask_web_request_seconds", "End-to-end time to answer a question.")
+PAGE_SECONDS = REGISTRY.histogram(
+    "ask_web_scrape_page_seconds",
+    "Time to scrape one candidate page, by outcome.")
+PAGE_BYTES = REGISTRY.histogram(
+    "ask_web_page_bytes", "Bytes downloaded per page.", BYTES_BUCKETS)
+PAGE_CHUNKS = REGISTRY.histogram(
+    "ask_web_page_chunks", "Chunks produced per page.", COUNT_BUCKETS)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "ask_web_cache_lookups_total", "Cache lookups by cache and result.")
+LLM_TOKENS = REGISTRY.counter(
+    "ask_web_llm_tokens_total", "LLM tokens by call and kind.")
+SEARCH_EVENTS = REGISTRY.counter(
+    "ask_web_search_events_total",
+    "Search cache hits, misses, upstream calls and throttling.")
+DOMAIN_EVENTS = REGISTRY.counter(
+    "ask_web_domain_events_total",
+    "Scrape failures by reason, circuits opened and links skipped.")
+LLM_EVENTS = REGISTRY.counter(
+    "ask_web_llm_events_total",
+    "LLM calls by model and outcome: hedged, hedge won, timed out or "
+    "queued for a provider slot.")
+
+# The scrape record of the candidate page being scraped in this task,
+# filled in by the fetching and splitting code.
+current_page: ContextVar[Optional[dict]] = ContextVar(
+    "current_page", default=None)
+
+
+def note_page(**values: Any) -> None:
+    """
+    Add values to the record of the page currently being scraped, if
+    the scrape runs under `gather_pages`.
+    """
+    record = current_page.get()
+    if record is not None:
+        record.update(values)
+
+
+def record_usage(call: str, usage: Optional[Dict[str, int]]) -> None:
+    """
+    Count the tokens of one LLM call.
+
+    Args:
+        call (str): The node that made the call.
+        usage (Dict[str, int], optional): The message's usage metadata.
+    """
+    for kind in ("input_tokens", "output_tokens"):
+        if usage and usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], call=call, kind=kind)
+
+
+def timed(node: str) -> Callable:
+    """
+    Decorate a graph node, sync or async, to record its duration in
+    `ask_web_node_seconds` and in the state's `metrics["timings"]`.
+
+    Args:
+        node (str): The node name.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def finish(update: Optional[dict], start: float) -> dict:
+        seconds = time.perf_counter() - start
+        NODE_SECONDS.observe(seconds, node=node)
+        update = dict(update or {})
+        metrics = dict(update.get("metrics", {}))
+        metrics["timings"] = {node: seconds}
+        update["metrics"] = metrics
+        return update
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> dict:
+                start = time.perf_counter()
+                return finish(await func(*args, **kwargs), start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> dict:
+            start = time.perf_counter()
+            return finish(func(*args, **kwargs), start)
+        return wrapper
+    return decorator
+
+
+_trace_lock = threading.Lock()
+
+
+def record_trace(question: str, state: Dict[str, Any],
+                 done: Dict[str, Any]) -> None:
+    """
+    Observe a finished request and, when `ASK_WEB_TRACE_PATH` is set,
+    append its per-node breakdown to that JSONL file.
+
+    Args:
+        question (str): The user's question.
+        state (Dict[str, Any]): The final graph state.
+        done (Dict[str, Any]): The `done` event data (latency, ttft).
+    """
+    REQUEST_SECONDS.observe(done.get("latency", 0.0),
+                            cached=bool(done.get("cached")))
+    path = get_settings().trace_path
+    if not path:
+        return
+    answer = state.get("answer")
+    record = {
+        "time": time.time(),
+        "question": question,
+        "status": state.get("status"),
+        "usage_metadata": getattr(answer, "usage_metadata", None),
+        **done,
+        "metrics": state.get("metrics", {}),
+    }
+    line = json.dumps(record, default=str) + "\n"
+    with _trace_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
@@ -0,0 +1,526 @@
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import (Any, AsyncIterator, Callable, Deque, Dict, Generator,
+                    Iterator, List, Optional)
+from langchain_core.runnables import RunnableLambda
+from .instrumentation import LLM_EVENTS
+from .settings import get_settings
+
+# Calls a model must have made before its latency quantile is trusted
+# enough to hedge on.
+MIN_SAMPLES = 20
+
+# Recent call latencies kept per model and kind of call.
+MAX_SAMPLES = 200
+
+
+class LLMTimeout(Exception):
+    """
+    Raised when an LLM call does not finish within its deadline.
+    """
+
+
+class LatencyTracker:
+    """
+    A rolling window of a model's recent call latencies.
+    """
+
+    def __init__(self, size: int = MAX_SAMPLES) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """
+        Record the latency of one call.
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Return the `q` quantile of the recorded latencies, or None
+        until `MIN_SAMPLES` calls have been seen.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def provider_of(model: str) -> str:
+    """
+    The provider serving a model, which its concurrency cap is
+    shared across.
+    """
+    return "fake" if model.split(":")[0] == "fake" else "google"
+
+
+class ProviderSlots:
+    """
+    The requests in flight to one provider, capped at `limit`.
+
+    Calls come from worker threads and from more than one event loop,
+    so a freed slot is handed straight to the oldest waiter, which is
+    woken through its own thread or loop rather than polling.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+        self._waiters: Deque[Callable[[], None]] = deque()
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot if one is free and nobody is queued for it.
+        """
+        with self._lock:
+            if self.used < self.limit and not self._waiters:
+                self.used += 1
+                return True
+            return False
+
+    def acquire(self, timeout: float) -> bool:
+        """
+        Wait up to `timeout` seconds for a slot.
+
+        Returns:
+            bool: Whether a slot was taken.
+        """
+        event = threading.Event()
+        if self._enqueue(event.set):
+            return True
+        event.wait(max(0.0, timeout))
+        return self._leave(event.set)
+
+    async def aacquire(self, timeout: float) -> bool:
+        """
+        Async version of `acquire`.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+        if self._enqueue(wake):
+            return True
+        try:
+            await asyncio.wait_for(waiter, max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if self._leave(wake):
+                self.release()
+            raise
+        return self._leave(wake)
+
+    def _enqueue(self, wake: Callable[[], None]) -> bool:
+        """
+        Take a free slot, or queue `wake` to be called when one is
+        handed over. Returns whether a slot was taken right away.
+        """
+        with self._lock:
+            if self.used < self.limit and not self._waiters:
+                self.used += 1
+                return True
+            self._waiters.append(wake)
+            return False
+
+    def _leave(self, wake: Callable[[], None]) -> bool:
+        """
+        Stop waiting, returning whether a slot was handed over first.
+        """
+        with self._lock:
+            if wake in self._waiters:
+                self._waiters.remove(wake)
+                return False
+            return True
+
+    def release(self) -> None:
+        """
+        Free a slot, or hand it to the oldest waiter.
+        """
+        with self._lock:
+            if not self._waiters:
+                if self.used == 0:
+                    raise ValueError("provider slot released too many times")
+                self.used -= 1
+                return
+            wake = self._waiters.popleft()
+        wake()
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _once(release: Callable[[], None]) -> Callable[[], None]:
+    """
+    Wrap `release` so that only its first call has an effect.
+    """
+    lock = threading.Lock()
+
+    def once() -> None:
+        if lock.acquire(blocking=False):
+            release()
+    return once
+
+
+@lru_cache(maxsize=None)
+def get_provider_limit(provider: str) -> ProviderSlots:
+    """
+    Return the slots capping the requests in flight to a provider,
+    sized by `ASK_WEB_LLM_MAX_CONCURRENCY`.
+
+    Args:
+        provider (str): The provider name.
+
+    Returns:
+        ProviderSlots: The shared slots.
+    """
+    return ProviderSlots(max(1, get_settings().llm_max_concurrency))
+
+
+class _Race:
+    """
+    The bookkeeping of one call and its hedge, shared by the sync and
+    async loops: when to hedge, which attempt won and when to give up.
+    """
+
+    def __init__(self, backend: "LLMBackend", kind: str) -> None:
+        self.backend = backend
+        self.tracker = backend.trackers[kind]
+        self.start = time.monotonic()
+        self.deadline = self.start + backend.timeout
+        self.hedge_after = (self.tracker.quantile(backend.hedge_quantile)
+                            if backend.hedge_quantile > 0 else None)
+        self.started: List[float] = []
+        self.cancels: Dict[int, Callable[[], None]] = {}
+        self.winner: Optional[int] = None
+
+    def add(self, cancel: Callable[[], None]) -> int:
+        """
+        Register a started attempt and return its number.
+        """
+        self.started.append(time.monotonic())
+        self.cancels[len(self.started) - 1] = cancel
+        return len(self.started) - 1
+
+    def wait(self) -> float:
+        """
+        Seconds until the deadline or, while no attempt has answered,
+        until the hedge is due.
+        """
+        until = self.deadline
+        if self.hedge_due_at() is not None:
+            until = min(until, self.hedge_due_at())
+        return max(0.0, until - time.monotonic())
+
+    def hedge_due_at(self) -> Optional[float]:
+        """
+        When the hedge should be sent, or None if it never will be.
+        """
+        if (self.hedge_after is None or self.winner is not None
+                or len(self.started) != 1):
+            return None
+        return self.started[0] + self.hedge_after
+
+    def hedge_due(self) -> bool:
+        due = self.hedge_due_at()
+        return due is not None and time.monotonic() >= due
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def timeout(self) -> LLMTimeout:
+        """
+        Cancel every attempt and build the error to raise.
+        """
+        self.cancel_all()
+        LLM_EVENTS.inc(model=self.backend.name, event="timeout")
+        return LLMTimeout(f"{self.backend.name}: no answer within "
+                          f"{self.backend.timeout:g}s")
+
+    def cancel_all(self) -> None:
+        for cancel in self.cancels.values():
+            cancel()
+        self.cancels.clear()
+
+    def handle(self, attempt: int, event: str) -> bool:
+        """
+        Take an event from an attempt, picking the first attempt to
+        answer as the winner and cancelling the other.
+
+        Args:
+            attempt (int): The attempt the event came from.
+            event (str): `item`, `done` or `error`.
+
+        Returns:
+            bool: Whether the event belongs to the winner and must be
+            acted on; events of losing attempts are dropped.
+        """
+        if self.winner is not None:
+            return attempt == self.winner
+        if event == "error" and len(self.cancels) > 1:
+            self.cancels.pop(attempt, None)
+            return False
+        self.winner = attempt
+        if event != "error":
+            self.tracker.observe(time.monotonic() - self.started[attempt])
+            if attempt > 0:
+                LLM_EVENTS.inc(model=self.backend.name, event="hedge_won")
+        for other, cancel in list(self.cancels.items()):
+            if other != attempt:
+                cancel()
+                del self.cancels[other]
+        return True
+
+
+class LLMBackend:
+    """
+    A chat model wrapped with a per-call deadline, a per-provider
+    concurrency cap and hedged requests.
+
+    When no answer has started after the model's recent latency
+    quantile (`ASK_WEB_LLM_HEDGE_QUANTILE`), a second identical request
+    is sent if a provider slot is free; whichever answers first is
+    used and the other is cancelled. Streams are raced on their first
+    chunk, single results on the whole call. A call that is not done
+    within `timeout` seconds raises `LLMTimeout`.
+    """
+
+    def __init__(self, model: Any, name: str, provider: str,
+                 timeout: float, hedge_quantile: float) -> None:
+        """
+        Args:
+            model (Any): The LangChain chat model to call.
+            name (str): The model name, used in metrics.
+            provider (str): The provider whose slots the calls take.
+            timeout (float): Seconds one call may take in total.
+            hedge_quantile (float): The latency quantile after which a
+                hedge is sent; 0 disables hedging.
+        """
+        self.model = model
+        self.name = name
+        self.provider = provider
+        self.timeout = timeout
+        self.hedge_quantile = hedge_quantile
+        self.trackers = {"stream": LatencyTracker(),
+                         "invoke": LatencyTracker()}
+
+    @classmethod
+    def from_settings(cls, model: Any, name: str) -> "LLMBackend":
+        """
+        Wrap a model with the `ASK_WEB_LLM_*` settings.
+        """
+        settings = get_settings()
+        return cls(model, name, provider_of(name), settings.llm_timeout,
+                   settings.llm_hedge_quantile)
+
+    def _race(self, kind: str,
+              call: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        """
+        Run `call` in worker threads, hedging and enforcing the
+        deadline, and yield the items of the attempt that wins.
+
+        A blocking call cannot be interrupted, so a cancelled attempt
+        gives its provider slot back at once and its thread is left to
+        finish on its own; a stream stops at its next chunk.
+        """
+        race = _Race(self, kind)
+        # Looked up once, so every slot goes back to the semaphore it
+        # came from even if the shared one is replaced meanwhile.
+        slots = get_provider_limit(self.provider)
+        events: queue.Queue = queue.Queue()
+
+        def run(attempt: int, stop: threading.Event,
+                free: Callable[[], None]) -> None:
+            items = None
+            try:
+                items = call()
+                for item in items:
+                    if stop.is_set():
+                        return
+                    events.put((attempt, "item", item))
+                events.put((attempt, "done", None))
+            except Exception as e:
+                events.put((attempt, "error", e))
+            finally:
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+                free()
+
+        def launch() -> None:
+            stop = threading.Event()
+            free = _once(slots.release)
+
+            def cancel() -> None:
+                stop.set()
+                free()
+
+            attempt = race.add(cancel)
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run,
+                             args=(run, attempt, stop, free),
+                             daemon=True).start()
+
+        if not slots.try_acquire():
+            LLM_EVENTS.inc(model=self.name, event="waited")
+            if not slots.acquire(race.deadline - time.monotonic()):
+                raise race.timeout()
+        launch()
+        try:
+            while True:
+                try:
+                    attempt, event, value = events.get(timeout=race.wait())
+                except queue.Empty:
+                    if race.expired():
+                        raise race.timeout()
+                    if race.hedge_due():
+                        self._hedge(race, slots, launch)
+                    continue
+                if not race.handle(attempt, event):
+                    continue
+                if event == "error":
+                    raise value
+                if event == "done":
+                    return
+                yield value
+        finally:
+            race.cancel_all()
+
+    async def _arace(self, kind: str,
+                     call: Callable[[], AsyncIterator[Any]]
+                     ) -> AsyncIterator[Any]:
+        """
+        Async version of `_race`, running each attempt as a task.
+        """
+        race = _Race(self, kind)
+        slots = get_provider_limit(self.provider)
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def run(attempt: int) -> None:
+            try:
+                async for item in call():
+                    events.put_nowait((attempt, "item", item))
+                events.put_nowait((attempt, "done", None))
+            except Exception as e:
+                events.put_nowait((attempt, "error", e))
+
+        def launch() -> None:
+            # Released from a done callback, which also runs when the
+            # task is cancelled before it ever started.
+            task = asyncio.ensure_future(run(len(race.started)))
+            task.add_done_callback(lambda _: slots.release())
+            race.add(task.cancel)
+
+        if not slots.try_acquire():
+            LLM_EVENTS.inc(model=self.name, event="waited")
+            if not await slots.aacquire(race.deadline - time.monotonic()):
+                raise race.timeout()
+        launch()
+        try:
+            while True:
+                try:
+                    attempt, event, value = await asyncio.wait_for(
+                        events.get(), timeout=race.wait())
+                except asyncio.TimeoutError:
+                    if race.expired():
+                        raise race.timeout()
+                    if race.hedge_due():
+                        self._hedge(race, slots, launch)
+                    continue
+                if not race.handle(attempt, event):
+                    continue
+                if event == "error":
+                    raise value
+                if event == "done":
+                    return
+                yield value
+        finally:
+            race.cancel_all()
+
+    def _hedge(self, race: _Race, slots: ProviderSlots,
+               launch: Callable[[], None]) -> None:
+        """
+        Send the hedge if a provider slot is free right now; a busy
+        provider is not sent more load.
+        """
+        if slots.try_acquire():
+            LLM_EVENTS.inc(model=self.name, event="hedged")
+            launch()
+        else:
+            race.hedge_after = None
+
+    def stream(self, prompt: Any) -> Iterator[Any]:
+        """
+        Stream the model's answer to a prompt.
+
+        Args:
+            prompt (Any): The prompt, as accepted by the model.
+
+        Returns:
+            Iterator[AIMessageChunk]: The answer's chunks.
+
+        Raises:
+            LLMTimeout: If the answer is not done within the deadline.
+        """
+        return self._race("stream", lambda: self.model.stream(prompt))
+
+    def astream(self, prompt: Any) -> AsyncIterator[Any]:
+        """
+        Async version of `stream`.
+        """
+        return self._arace("stream", lambda: self.model.astream(prompt))
+
+    def with_structured_output(self, schema: Any, *,
+                               include_raw: bool = False,
+                               **kwargs: Any) -> RunnableLambda:
+        """
+        Return a runnable calling the model for structured output,
+        with the same deadline and hedging as `stream`.
+
+        Args:
+            schema (Any): The output schema.
+            include_raw (bool): Also return the raw message.
+
+        Returns:
+            RunnableLambda: A runnable with `invoke` and `ainvoke`.
+        """
+        runnable = self.model.with_structured_output(
+            schema, include_raw=include_raw, **kwargs)
+
+        def invoke(prompt: Any) -> Any:
+            return _only(self._race(
+                "invoke", lambda: iter([runnable.invoke(prompt)])))
+
+        async def ainvoke(prompt: Any) -> Any:
+            async def call() -> AsyncIterator[Any]:
+                yield await runnable.ainvoke(prompt)
+
+            results = self._arace("invoke", call)
+            try:
+                return await results.__anext__()
+            finally:
+                await results.aclose()
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def _only(items: Generator) -> Any:
+    """
+    The single item of a one-item race.
+    """
+    try:
+        return next(items)
+    finally:
+        items.close()
@@ -1,27 +1,54 @@
 import getpass
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
+from .settings import get_settings
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
 load_dotenv()
 
 
-def load_llm() -> ChatGoogleGenerativeAI:
+def load_llm(model: str = "gemini-2.0-flash") -> "BaseChatModel":
     """
-    Loads and returns a Google Generative AI language model (LLM) instance.
+    Loads and returns a language model (LLM) instance.
+
+    The Gemini client is imported here rather than at module level so
+    importing the backend stays cheap until a model is actually needed.
+    Use `backend.registry.get_llm` to share one instance per process.
+
+    A model of `fake`, or `fake:<first token s>:<token s>`, returns the
+    deterministic offline model of `backend.fake_llm` with those
+    latencies, so the whole graph can run without an API key.
+
+    Args:
+        model (str): The Gemini model name, or a `fake` spec.
 
     Returns:
-        ChatGoogleGenerativeAI: An instance of the Gemini 2.0 Flash model
+        BaseChatModel: The chat model; Gemini unless `model` is fake.
     """
+    name, _, latencies = model.partition(":")
+    if name == "fake":
+        from .fake_llm import FakeChatModel
+        first, _, token = latencies.partition(":")
+        return FakeChatModel(first_token_latency=float(first or 0),
+                             token_latency=float(token or 0))
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY", "")
     if "GOOGLE_API_KEY" not in os.environ:
         os.environ["GOOGLE_API_KEY"] = getpass.getpass(
             "Enter your Google AI API key: ")
 
+    # Deadlines and hedging are enforced by `backend.llm.LLMBackend`;
+    # the client keeps one retry for transient errors.
     llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
+        model=model,
         temperature=0,
         max_tokens=None,
-        timeout=120,
-        max_retries=2,
+        timeout=get_settings().llm_timeout,
+        max_retries=1,
     )
     return llm
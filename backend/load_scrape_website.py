@@ -1,44 +1,380 @@
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import asyncio
+import sqlite3
+import weakref
+from typing import AsyncIterator, Optional
 from langchain.schema import Document
-from langchain_community.tools import DuckDuckGoSearchResults
+from .chunk_store import ChunkList
+from .chunking import split_offsets
+from .corpus import get_corpus
 from .clean_data import clean_text
+from .extract import TextExtractor, html_to_document
+from .domain_health import get_domain_health
+from .fetcher import FetchError, get_fetcher, run_sync
+from .instrumentation import (CACHE_LOOKUPS, PAGE_BYTES, PAGE_CHUNKS,
+                              note_page)
+from .page_cache import CachedPage, get_page_cache, normalize_url
+from .parse_pool import (aparse_chunks, get_parse_pool, parse_chunks,
+                         parser_name)
+from .search import get_search_service
+from .settings import get_settings
 
 
-def search_duckduckgo(query: str) -> list[dict]:
+def search_duckduckgo(query: str, max_results: int = 3) -> list[dict]:
     """
     Search DuckDuckGo for a given query and return a list of result of
     dictionaries containing title, link and snipppet.
 
+    Results are served by the shared search service, which caches
+    them, merges identical in-flight searches and paces upstream calls.
+
     Args:
         query (str): The search query.
+        max_results (int): The number of results to return.
 
     Returns:
         list[dict]: A list from the search results .
     """
-    search = DuckDuckGoSearchResults(output_format='list')
-    results = search.invoke(query)
-    return results[:3]
+    results = get_search_service().search(query)
+    return results[:max_results]
+
+
+async def asearch_duckduckgo(query: str,
+                             max_results: int = 3) -> list[dict]:
+    """
+    Async version of `search_duckduckgo`.
+
+    Args:
+        query (str): The search query.
+        max_results (int): The number of results to return.
+
+    Returns:
+        list[dict]: A list from the search results .
+    """
+    results = await get_search_service().asearch(query)
+    return results[:max_results]
+
+
+async def astream_duckduckgo(query: str) -> AsyncIterator[dict]:
+    """
+    Yield search results as they become known, from the shared search
+    service (see `SearchService.astream`).
+
+    Args:
+        query (str): The search query.
+
+    Yields:
+        dict: One search result.
+    """
+    async for result in get_search_service().astream(query):
+        yield result
+
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+
+def chunking_key() -> str:
+    """
+    Identify how pages are extracted, reduced and split, so cached
+    chunks are invalidated whenever these parameters change.
+    """
+    return (f"v3-{parser_name()}-{CHUNK_SIZE}-{CHUNK_OVERLAP}-"
+            f"{get_settings().page_max_chars}")
+
+
+async def afetch_page(link: str) -> CachedPage:
+    """
+    Download a page, serving it from the page cache when fresh and
+    revalidating stale entries with a conditional request.
+
+    Without a parse pool, new downloads are streamed through a
+    `TextExtractor`, which stops reading once `page_max_chars` of text
+    have been collected, so large pages are never fully downloaded or
+    held in memory. With one, parsing is left to the pool and the
+    download only stops at `page_max_bytes`, keeping the event loop
+    free of HTML parsing.
+
+    Args:
+        link (str): The link of the website to load.
+
+    Returns:
+        CachedPage: The page body with its validators.
+
+    Raises:
+        FetchError: If the page cannot be downloaded in time or the
+            server answers with an HTTP error.
+    """
+    cache = get_page_cache()
+    cached = cache.get_page(link) if cache else None
+    if cached is not None and cached.fresh:
+        CACHE_LOOKUPS.inc(cache="page", result="hit")
+        note_page(cache="hit", bytes=0)
+        return cached
+    headers = cache.validators(cached) if cached is not None else None
+    settings = get_settings()
+    extractor = (TextExtractor(max_chars=settings.page_max_chars)
+                 if get_parse_pool() is None else None)
+    result = await get_fetcher().fetch(link, headers=headers,
+                                       max_bytes=settings.page_max_bytes,
+                                       sink=extractor)
+    PAGE_BYTES.observe(len(result.body))
+    if cached is not None and result.status == 304:
+        CACHE_LOOKUPS.inc(cache="page", result="revalidated")
+        note_page(cache="revalidated", bytes=0)
+        return cache.mark_revalidated(cached)
+    if result.status >= 400:
+        note_page(cache="miss", bytes=len(result.body), status=result.status)
+        raise FetchError(f"{link}: HTTP {result.status}",
+                         status=result.status)
+    CACHE_LOOKUPS.inc(cache="page", result="miss")
+    note_page(cache="miss", bytes=len(result.body),
+              truncated=result.truncated)
+    # Stopping once the extractor has its text loses nothing; stopping
+    # at the byte cap may, so such pages are not cached.
+    partial = result.truncated and not (
+        extractor is not None and extractor.done)
+    if cache is not None:
+        page = cache.put_page(link, result, partial)
+    else:
+        page = CachedPage.from_result(link, result)
+    if extractor is not None:
+        page.document = extractor.document(link)
+    return page
+
+
+def page_to_chunks(page: CachedPage) -> ChunkList:
+    """
+    Turn a page into cleaned chunks, reusing cached chunks for the
+    same page content when available. Pages not already extracted
+    while downloading are parsed in the parse pool.
+
+    Args:
+        page (CachedPage): The downloaded page.
+
+    Returns:
+        ChunkList: The page's chunks.
+    """
+    key = chunking_key()
+    chunks = _cached_chunks(page, key)
+    if chunks is not None:
+        return chunks
+    if page.document is not None:
+        chunks = split_content([page.document])
+        text_chars = len(page.document.page_content)
+    else:
+        chunks, text_chars = parse_chunks(page.body, page.url, page.encoding,
+                                          CHUNK_SIZE, CHUNK_OVERLAP)
+    _store_chunks(page, key, chunks, text_chars)
+    return chunks
+
+
+async def apage_to_chunks(page: CachedPage) -> ChunkList:
+    """
+    Async version of `page_to_chunks`. A page sent to the parse pool
+    is awaited on the event loop; the cache and any in-process parsing
+    run in worker threads.
+    """
+    if page.document is not None or get_parse_pool() is None:
+        return await asyncio.to_thread(page_to_chunks, page)
+    key = chunking_key()
+    chunks = await asyncio.to_thread(_cached_chunks, page, key)
+    if chunks is not None:
+        return chunks
+    chunks, text_chars = await aparse_chunks(
+        page.body, page.url, page.encoding, CHUNK_SIZE, CHUNK_OVERLAP)
+    await asyncio.to_thread(_store_chunks, page, key, chunks, text_chars)
+    return chunks
+
+
+def _cached_chunks(page: CachedPage, key: str) -> Optional[ChunkList]:
+    """
+    The page's chunks from the page cache, if it holds them.
+    """
+    cache = get_page_cache()
+    if cache is None:
+        return None
+    chunks = cache.get_chunks(page, key)
+    if chunks is None:
+        CACHE_LOOKUPS.inc(cache="chunks", result="miss")
+        return None
+    CACHE_LOOKUPS.inc(cache="chunks", result="hit")
+    note_page(chunk_cache="hit", chunks_out=len(chunks))
+    return chunks
+
+
+def _store_chunks(page: CachedPage, key: str, chunks: ChunkList,
+                  text_chars: int) -> None:
+    """
+    Record a freshly parsed page and cache its chunks.
+    """
+    PAGE_CHUNKS.observe(len(chunks))
+    note_page(chunk_cache="miss", text_chars=text_chars,
+              chunks_out=len(chunks))
+    cache = get_page_cache()
+    if cache is not None and page.status == 200 and not page.partial:
+        cache.put_chunks(page, key, chunks)
+
+
+def index_page(link: str, chunks: ChunkList) -> None:
+    """
+    Add a page's chunks to the local corpus, if it is enabled. A
+    failure to index is logged and does not fail the scrape.
+
+    Args:
+        link (str): The page URL.
+        chunks (ChunkList): The page's chunks.
+    """
+    corpus = get_corpus()
+    if corpus is None:
+        return
+    try:
+        corpus.add_page(link, chunks, chunking_key())
+    except sqlite3.Error as e:
+        print(f"Error indexing {link}: {e}")
+
+
+# In-flight scrapes per event loop: normalized URL -> [task, waiters].
+_inflight: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+scrape_counters = {"scrapes": 0, "coalesced": 0}
+
+
+async def _ascrape_once(link: str) -> ChunkList:
+    health = get_domain_health()
+    try:
+        page = await afetch_page(link)
+        chunks = await apage_to_chunks(page)
+    except Exception as e:
+        health.record_error(link, e)
+        raise
+    if not health.check_page(link, chunks):
+        return ChunkList()
+    await asyncio.to_thread(index_page, link, chunks)
+    return chunks
+
+
+async def ascrape_link(link: str, coalesce: bool = True) -> ChunkList:
+    """
+    Download a link and split it into chunks without blocking the
+    event loop.
+
+    Concurrent calls for the same normalized URL on one event loop
+    (e.g. several questions of a batch citing the same page) share a
+    single download. The shared download is cancelled once every
+    caller has given up on it.
+
+    Args:
+        link (str): The link of the website to load.
+        coalesce (bool): Share a download already in flight. Hedged
+            requests pass False so they really send a second request.
+
+    Returns:
+        ChunkList: The page's chunks, empty for a captcha page.
+    """
+    if not coalesce:
+        scrape_counters["scrapes"] += 1
+        return await _ascrape_once(link)
+    key = normalize_url(link)
+    inflight = _inflight.setdefault(asyncio.get_running_loop(), {})
+
+    def forget(entry: list) -> None:
+        if inflight.get(key) is entry:
+            del inflight[key]
+
+    entry = inflight.get(key)
+    if entry is None:
+        scrape_counters["scrapes"] += 1
+        task = asyncio.ensure_future(_ascrape_once(link))
+        entry = inflight[key] = [task, 0]
+
+        task.add_done_callback(lambda _: forget(entry))
+    else:
+        scrape_counters["coalesced"] += 1
+        note_page(coalesced=True)
+    task = entry[0]
+    entry[1] += 1
+    try:
+        return await asyncio.shield(task)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not task.done():
+            task.cancel()
+            forget(entry)
+
+
+async def ascrape_hedge(link: str) -> ChunkList:
+    """
+    Scrape a link for a hedged request, bypassing the download of the
+    same URL already in flight.
+    """
+    return await ascrape_link(link, coalesce=False)
+
+
+def scrape_link(link: str) -> ChunkList:
+    """
+    Download a link and split it into chunks. The download runs on the
+    shared fetcher loop; parsing runs in the calling thread.
+
+    Args:
+        link (str): The link of the website to load.
+
+    Returns:
+        ChunkList: The page's chunks, empty for a captcha page.
+    """
+    health = get_domain_health()
+    try:
+        chunks = page_to_chunks(run_sync(afetch_page(link)))
+    except Exception as e:
+        health.record_error(link, e)
+        raise
+    if not health.check_page(link, chunks):
+        return ChunkList()
+    index_page(link, chunks)
+    return chunks
+
+
+async def aload_website_content(link: str) -> list[Document]:
+    """
+    Download website content from a url through the shared,
+    connection-pooled async fetcher.
+
+    Args:
+        link (str): The link of the website to load.
+
+    Returns:
+        list[Document]:
+        A list of LangChain Document objects containing page content.
+
+    Raises:
+        FetchError: If the page cannot be downloaded in time.
+    """
+    page = await afetch_page(link)
+    doc = await asyncio.to_thread(html_to_document, page.text, link)
+    return [doc]
 
 
 def load_website_content(link: str) -> list[Document]:
     """
     download website content from a url.
 
+    Synchronous wrapper around `aload_website_content`; downloads run
+    on a shared background event loop so every caller reuses the same
+    connection pool.
+
     Args:
-        query (str): The link of the website to load.
+        link (str): The link of the website to load.
 
     Returns:
         list[Document]:
         A list of LangChain Document objects containing page content.
     """
-    docs = WebBaseLoader(link).load()
-    return docs
+    page = run_sync(afetch_page(link))
+    return [html_to_document(page.text, link)]
 
 
 def get_reduced_text(doc: Document) -> str:
     """
-    Extracts the main part  of the document's text.
+    Extracts the main part  of the document's text, capped at
+    `page_max_chars` characters.
 
     Args:
         doc (Document): The original document.
@@ -47,37 +383,33 @@ def get_reduced_text(doc: Document) -> str:
         str: The reduced text that is clean.
     """
     full_text = doc.page_content
-    half_length = int(len(full_text) * 0.3)
-    reducecd_doc = full_text[:half_length]
+    reducecd_doc = full_text[:get_settings().page_max_chars]
     return clean_text(reducecd_doc)
 
 
-def split_content(docs: list[Document]) -> list[Document]:
+def split_content(docs: list[Document]) -> ChunkList:
     """
     Split a list of Document objects into smaller chunks for processing.
 
+    The chunks are those of a `RecursiveCharacterTextSplitter` with
+    `CHUNK_SIZE` and `CHUNK_OVERLAP`, computed as offsets into the
+    reduced text by `split_offsets`. Each document's reduced text is
+    kept once and the chunks are views into it.
+
     Args:
         docs (list[Document]): A list of LangChain Document objects.
 
     Returns:
-        list[Document]: A list of chunked Document objects.
+        ChunkList: The chunks of every document, in order.
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50
-    )
-    all_chunks = []
+    pages = []
     for doc in docs:
         try:
             reduced_text = get_reduced_text(doc)
-            chunks = splitter.split_text(reduced_text)
-
-            for chunk in chunks:
-                all_chunks.append(
-                    Document(
-                        page_content=chunk,
-                        metadata=doc.metadata))
+            spans = split_offsets(reduced_text, CHUNK_SIZE, CHUNK_OVERLAP)
+            pages.append(ChunkList.from_spans(reduced_text, doc.metadata,
+                                              spans))
         except Exception as e:
             print(f"Error splitting document: {e}")
 
-    return all_chunks
+    return ChunkList.concat(pages)
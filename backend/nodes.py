@@ -1,15 +1,27 @@
-from typing import List, Annotated, Tuple
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Annotated, Optional, Tuple
 from operator import add
 from typing_extensions import TypedDict
-from .load_llm import load_llm
-from .load_scrape_website import load_website_content, split_content
+from .registry import get_llm
+from .fetcher import run_sync
+from .warmup import get_host_hints, origin_of
+from .load_scrape_website import ascrape_hedge, ascrape_link, chunking_key
+from .chunk_store import ChunkList
+from .corpus import get_corpus
+from .citations import check_citations, report
+from .context_format import FormattedContext, format_context
+from .dedup import dedupe_chunks
+from .domain_health import domain_of, get_domain_health
+from .instrumentation import CACHE_LOOKUPS, record_usage, timed
+from .ranking import select_context as rank_context
+from .scrape_policy import ScrapePolicy, gather_pages
+from .settings import get_settings
 from .prompts import GENERATE_RESULT_PROMPT, VERIFY_PROMPT
-from .load_scrape_website import search_duckduckgo
-from langgraph.types import Send
-
-
-# Load the language model and prompt template
-llm = load_llm()
+from .load_scrape_website import (asearch_duckduckgo, astream_duckduckgo,
+                                  search_duckduckgo)
+from langchain_core.messages import message_chunk_to_message
+from langgraph.config import get_stream_writer
 
 
 class CitationStatus(TypedDict):
@@ -39,64 +51,180 @@ class AnswerWithSources(TypedDict):
     ]
 
 
+def merge_metrics(left: dict, right: dict) -> dict:
+    """
+    Reducer combining the metrics reported by each node. Dict values
+    reported under the same key, like `timings`, are merged too.
+    """
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = {**merged[key], **value}
+        merged[key] = value
+    return merged
+
+
 class State(TypedDict):
     """
     The full state of the question-answering graph.
 
     Attributes:
         question (str): The user's input question.
-        context (List[Document]): The documents retrieved .
+        context (ChunkList): The chunks retrieved, as views into one
+            text per page.
+        selected_context (ChunkList): The ranked chunks that fit the
+            prompt token budget.
         answer (AnswerWithSources): The final answer with source citations.
+        sources (List[dict]): The numbered sources shown to the LLM.
+        citation_report (List[dict]): Per-citation verification scores.
+        metrics (dict): Per-node measurements, keyed by node name.
     """
     question: str
     links: List[str]
     raw_results: List[dict]
-    context: Annotated[list, add]
+    context: Annotated[ChunkList, add]
+    selected_context: ChunkList
     answer: AnswerWithSources
+    sources: List[dict]
     status: CitationStatus
+    citation_report: List[dict]
+    metrics: Annotated[dict, merge_metrics]
 
 
-class WebState(TypedDict):
+def local_links(question: str) -> Optional[dict]:
     """
-    A dictionary representing the state of a web document
-    retrieval process.
+    Look the question up in the local corpus of scraped pages. When
+    enough fresh pages match, they stand in for both the web search
+    and the scrape: their links and chunks are returned directly.
 
-    Attributes:
-        link (str): The URL of the web page to retrieve or process.
+    Args:
+        question (str): The user's question.
+
+    Returns:
+        Optional[dict]: The links, raw results and context of the
+        matching pages, or None when the web must be searched.
     """
-    link: str
+    corpus = get_corpus()
+    if corpus is None:
+        return None
+    hits = corpus.lookup(question, chunking_key())
+    CACHE_LOOKUPS.inc(cache="corpus", result="hit" if hits else "miss")
+    if hits is None:
+        return None
+    hits = hits[:ScrapePolicy.from_settings().target_pages]
+    return {
+        "links": [hit.link for hit in hits],
+        "raw_results": [{"title": hit.title, "link": hit.link,
+                         "snippet": hit.snippet} for hit in hits],
+        "context": ChunkList.concat([hit.chunks for hit in hits]),
+        "metrics": {"corpus": {
+            "pages": len(hits),
+            "oldest": time.time() - min(hit.fetched_at for hit in hits)}},
+    }
+
+
+def pick_links(results: List[dict]) -> dict:
+    """
+    Choose the links to scrape from the search results: domains that
+    keep failing or blocking us are skipped while cooling down, and
+    recently failed ones are tried after the healthy ones. The rest of
+    the results then make up for the skipped links.
 
+    Args:
+        results (List[dict]): The search results, best first.
 
+    Returns:
+        dict: The links to scrape, the raw results and the domain
+        health decisions for `metrics`.
+    """
+    links = [link['link'] for link in results if 'link' in link]
+    get_host_hints().observe(links)
+    links, health = get_domain_health().prioritize(links)
+    return {"links": links[:ScrapePolicy.from_settings().candidates],
+            'raw_results': results, "metrics": {"domain_health": health}}
+
+
+@timed("get_links")
 def get_links(state: State) -> dict:
     """
-    Retrieve links based on the question.
+    Retrieve links based on the question, leaving out domains whose
+    circuit is open. Questions the local corpus already covers are
+    answered from it without searching the web.
 
     Args:
         state (State): The current state of the graph.
 
     Returns:
         dict: A dictionary containing the retrieved
-        links and raw results.
+        links and raw results, and the context when it came from
+        the local corpus.
     """
-    results = search_duckduckgo(state["question"])
-    links = [link['link'] for link in results if 'link' in link]
-    return {"links": links, 'raw_results': results}
+    local = local_links(state["question"])
+    if local is not None:
+        return local
+    results = search_duckduckgo(
+        state["question"], max_results=get_settings().search_num_results)
+    return pick_links(results)
+
+
+@timed("get_links")
+async def aget_links(state: State) -> dict:
+    """
+    Async version of `get_links`.
+
+    Args:
+        state (State): The current state of the graph.
+
+    Returns:
+        dict: A dictionary containing the retrieved
+        links and raw results, and the context when it came from
+        the local corpus.
+    """
+    local = await asyncio.to_thread(local_links, state["question"])
+    if local is not None:
+        return local
+    results = await asearch_duckduckgo(
+        state["question"], max_results=get_settings().search_num_results)
+    return pick_links(results)
 
 
-def send_to_scrape_data(state: State) -> list:
+def route_links(state: State) -> str:
     """
-    Send the links to be scraped, uses parallezation to improve speed
+    Skip scraping when `get_links` already found the context in the
+    local corpus.
 
     Args:
         state (State): The current state of the graph.
 
+    Returns:
+        str: The next node.
+    """
+    return "select_context" if state.get("context") else "scrape_web_data"
+
+
+def scrape_web_data(state: State) -> dict:
     """
-    return [Send("scrape_web_data", {"link": s}) for s in state['links']]
+      download the content of the links found by `get_links`.
+
+      Links are scraped concurrently under the configured
+      `ScrapePolicy`: the first pages to succeed within the time
+      budget are kept and slower or failing sites are cancelled.
 
+      Args:
+          state (State): The current state of the graph.
 
-def scrape_web_data(state: WebState) -> dict:
+      Returns:
+          dict: A dictionary containing the retrieved context documents.
     """
-      download the content of the link provided.
+    return run_sync(ascrape_web_data(state))
+
+
+@timed("scrape_web_data")
+async def ascrape_web_data(state: State) -> dict:
+    """
+      Async version of `scrape_web_data`, used when the graph is run
+      with `astream`/`ainvoke`. Downloads share the event loop's
+      pooled connections; parsing and splitting run in worker threads.
 
       Args:
           state (State): The current state of the graph.
@@ -104,47 +232,341 @@ def scrape_web_data(state: WebState) -> dict:
       Returns:
           dict: A dictionary containing the retrieved context documents.
     """
-    docs = load_website_content(state["link"])
-    retrieved_docs = split_content(docs)
-    return {"context": retrieved_docs}
+    pages, stats = await gather_pages(state.get("links", []),
+                                      ascrape_link,
+                                      ScrapePolicy.from_settings(),
+                                      hedge=ascrape_hedge)
+    return {"context": ChunkList.concat(pages),
+            "metrics": {"scrape_web_data": stats}}
+
+
+async def stream_links(question: str, results: List[dict],
+                       health: dict) -> AsyncIterator[str]:
+    """
+    Yield the links to scrape while the search results arrive. Links
+    to domains whose circuit is open are skipped and those to suspect
+    domains are held back until the search is over, as `pick_links`
+    does for a whole result list.
+
+    Args:
+        question (str): The user's question.
+        results (List[dict]): Filled with the raw results as they come.
+        health (dict): Filled with the domain health decisions.
+
+    Yields:
+        str: A link to scrape.
+    """
+    domains = get_domain_health()
+    health.update(skipped=[], deprioritized=0)
+    suspect = []
+    async for result in astream_duckduckgo(question):
+        results.append(result)
+        link = result.get('link')
+        if not link:
+            continue
+        status = domains.triage(link)
+        if status == "ok":
+            yield link
+        elif status == "suspect":
+            suspect.append(link)
+        else:
+            health["skipped"].append(domain_of(link))
+    get_host_hints().observe(result['link'] for result in results
+                             if 'link' in result)
+    health["deprioritized"] = len(suspect)
+    for link in suspect:
+        yield link
+
+
+def search_and_scrape(state: State) -> dict:
+    """
+    Search the web and scrape the results in one pipelined stage,
+    instead of `get_links` followed by `scrape_web_data`.
+
+    Args:
+        state (State): The current state of the graph.
+
+    Returns:
+        dict: The links, raw results, context and stage metrics.
+    """
+    return run_sync(asearch_and_scrape(state))
+
+
+@timed("search_and_scrape")
+async def asearch_and_scrape(state: State) -> dict:
+    """
+    Async version of `search_and_scrape`.
+
+    Connections to the sites search results usually point at are
+    opened while the search runs, and each result link is handed to
+    the scraper as soon as it is known rather than after the whole
+    result list. `metrics["pipeline"]` reports when the first link
+    arrived, how long the search took, how long scraping overlapped
+    it, and which warmed sites were then scraped.
+
+    Args:
+        state (State): The current state of the graph.
+
+    Returns:
+        dict: The links, raw results, context and stage metrics.
+    """
+    question = state["question"]
+    local = await asyncio.to_thread(local_links, question)
+    if local is not None:
+        return local
+
+    hints = get_host_hints()
+    warm_up = asyncio.ensure_future(
+        hints.warm(hints.likely(get_settings().warmup_hosts)))
+    results, health = [], {}
+    try:
+        pages, stats = await gather_pages(
+            stream_links(question, results, health), ascrape_link,
+            ScrapePolicy.from_settings(), hedge=ascrape_hedge)
+    finally:
+        warm_up.cancel()
+        await asyncio.gather(warm_up, return_exceptions=True)
+    warmed = set() if warm_up.cancelled() else set(warm_up.result())
+
+    links = stats["links"]
+    search_end = (stats["links_done"] if stats["links_done"] is not None
+                  else stats["elapsed"])
+    pipeline = {
+        "first_link": stats["first_link"],
+        "search": stats["links_done"],
+        "overlap": max(0.0, search_end - (stats["first_link"]
+                                          or search_end)),
+        "warmed": sorted(warmed),
+        "warm_hits": sum(origin_of(link) in warmed for link in links),
+    }
+    return {"links": links, "raw_results": results,
+            "context": ChunkList.concat(pages),
+            "metrics": {"domain_health": health, "scrape_web_data": stats,
+                        "pipeline": pipeline}}
+
+
+@timed("select_context")
+def select_context(state: State) -> dict:
+    """
+    Drop near-duplicate chunks, then rank the rest against the
+    question and keep the best ones that fit the context token budget.
 
+    Args:
+        state (State): The current state of the graph.
 
+    Returns:
+        dict: The selected chunks, dedup counts and tokens saved.
+    """
+    settings = get_settings()
+    context = state.get("context", [])
+    metrics = {}
+    if settings.dedup_max_distance >= 0:
+        source_rank = {link: rank
+                       for rank, link in enumerate(state.get("links", []))}
+        context, metrics["dedup"] = dedupe_chunks(
+            context, settings.dedup_max_distance, source_rank)
+    selected, metrics["select_context"] = rank_context(
+        state["question"],
+        context,
+        settings.context_token_budget,
+    )
+    return {"selected_context": ChunkList.from_documents(selected),
+            "metrics": metrics}
+
+
+def answer_prompt(state: State) -> Tuple[FormattedContext, str]:
+    """
+    Build the numbered context and the answer prompt for a question.
+
+    Args:
+        state (State): The current state of the graph.
+
+    Returns:
+        Tuple[FormattedContext, str]: The context and the prompt.
+    """
+    context = format_context(
+        state.get('selected_context', state['context']))
+    formatted_prompt = GENERATE_RESULT_PROMPT.format(
+        question=state["question"],
+        context=context.text
+    )
+    return context, formatted_prompt
+
+
+def answer_update(response: Any, context: FormattedContext,
+                  start: float, ttft: Optional[float],
+                  model: Optional[str] = None) -> dict:
+    """
+    Build the state update of `generate_answer` from the streamed
+    response.
+    """
+    answer = message_chunk_to_message(response)
+    record_usage("generate_answer", answer.usage_metadata)
+    return {"answer": answer,
+            "sources": context.sources,
+            "metrics": {"generate_answer": {
+                "context_tokens": context.tokens,
+                "ttft": ttft,
+                "duration": time.perf_counter() - start,
+                "model": model,
+                "usage": answer.usage_metadata}}}
+
+
+@timed("generate_answer")
 def generate_answer(state: State) -> dict:
     """
     Generate an answer using the language model and retrieved context.
 
+    The answer is streamed from the LLM; each piece of text is written
+    to the graph's `custom` stream as `{"token": text}` so callers can
+    display it before generation finishes.
+
     Args:
         state (State): The current state of the graph.
 
     Returns:
         dict: A dictionary containing the generated answer and sources.
     """
-    formatted_prompt = GENERATE_RESULT_PROMPT.format(
-        question=state["question"],
-        context=state['context']
+    context, formatted_prompt = answer_prompt(state)
+    writer = get_stream_writer()
+    start = time.perf_counter()
+    ttft = None
+    response = None
+    llm = get_llm("generate", state["question"])
+    for chunk in llm.stream(formatted_prompt):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        if chunk.content:
+            writer({"token": chunk.content})
+        response = chunk if response is None else response + chunk
+    return answer_update(response, context, start, ttft,
+                         getattr(llm, "name", None))
+
+
+@timed("generate_answer")
+async def agenerate_answer(state: State) -> dict:
+    """
+    Async version of `generate_answer`, streaming with `astream`.
+
+    Args:
+        state (State): The current state of the graph.
+
+    Returns:
+        dict: A dictionary containing the generated answer and sources.
+    """
+    context, formatted_prompt = answer_prompt(state)
+    writer = get_stream_writer()
+    start = time.perf_counter()
+    ttft = None
+    response = None
+    llm = get_llm("generate", state["question"])
+    async for chunk in llm.astream(formatted_prompt):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        if chunk.content:
+            writer({"token": chunk.content})
+        response = chunk if response is None else response + chunk
+    return answer_update(response, context, start, ttft,
+                         getattr(llm, "name", None))
+
+
+def local_citation_check(state: State) -> Tuple[str, list, Optional[str]]:
+    """
+    Check the answer's citations locally and, when the verdict is
+    unsure and the fallback is enabled, build the LLM verify prompt.
+
+    Args:
+        state (State): The current state of the graph.
+
+    Returns:
+        Tuple[str, list, Optional[str]]: The local status, the
+        per-citation checks and the fallback prompt, or None when the
+        LLM does not need to be asked.
+    """
+    settings = get_settings()
+    answer = state['answer'].content
+    status, checks = check_citations(
+        answer,
+        state.get('context', []),
+        state.get('sources'),
+        settings.citation_pass_threshold,
+        settings.citation_fail_threshold,
+    )
+    if status != "UNSURE" or not settings.citation_llm_fallback:
+        return status, checks, None
+    cited = {check.url for check in checks}
+    prompt = VERIFY_PROMPT.format(
+        citations=answer,
+        content=[doc.page_content for doc in state.get('context', [])
+                 if doc.metadata.get('source') in cited]
     )
-    response = llm.invoke(formatted_prompt)
-    return {"answer": response}
+    return status, checks, prompt
 
 
+def citation_update(status: str, checks: list,
+                    verdict: Optional[dict]) -> dict:
+    """
+    Build the state update of `verify_citations`, counting the tokens
+    of the LLM fallback when it was used.
+    """
+    used_llm = verdict is not None
+    usage = None
+    if used_llm:
+        status = (verdict.get("parsed") or {}).get("status", status)
+        usage = getattr(verdict["raw"], "usage_metadata", None)
+        record_usage("verify_citations", usage)
+    return {"status": status,
+            "citation_report": report(checks),
+            "metrics": {"verify_citations": {
+                "citations": len(checks),
+                "passed": sum(c.verdict == "PASS" for c in checks),
+                "failed": sum(c.verdict == "FAIL" for c in checks),
+                "unsure": sum(c.verdict == "UNSURE" for c in checks),
+                "llm_fallback": used_llm,
+                "usage": usage}}}
+
+
+@timed("verify_citations")
 def verify_citations(state: State) -> dict:
     """
     Verifies whether the citations in a given answer are genuinely supported
     by the associated content.
 
-    This function formats a verification prompt using the provided answer and
-    its related context, then invokes a language model
-    that returns a structured
-    result conforming to the CitationStatus TypedDict.
+    Each `[n]` citation is checked locally by scoring token and bigram
+    overlap between the cited sentence and the scraped chunks of
+    source n. Only when the local check is unsure (and the fallback is
+    enabled) is the language model asked, with the cited sources'
+    content, to return a structured CitationStatus.
 
     Returns:
-        dict: A dictionary with a single key:
-            - 'status' (str): Either 'PASS' or 'FAIL', indicating whether the
+        dict: A dictionary with:
+            - 'status' (str): 'PASS', 'FAIL', 'UNSURE' or 'None'
+            - 'citation_report' (list): the per-citation scores
     """
-    prompt = VERIFY_PROMPT.format(
-        citations=state['answer'],
-        content=state['raw_results']
-    )
-    structured_llm = llm.with_structured_output(CitationStatus)
-    response = structured_llm.invoke(prompt)
-    return {"status": response["status"]}
+    status, checks, prompt = local_citation_check(state)
+    verdict = None
+    if prompt is not None:
+        structured_llm = get_llm("verify").with_structured_output(
+            CitationStatus, include_raw=True)
+        verdict = structured_llm.invoke(prompt)
+    return citation_update(status, checks, verdict)
+
+
+@timed("verify_citations")
+async def averify_citations(state: State) -> dict:
+    """
+    Async version of `verify_citations`, using `ainvoke` for the LLM
+    fallback.
+
+    Returns:
+        dict: A dictionary with:
+            - 'status' (str): 'PASS', 'FAIL', 'UNSURE' or 'None'
+            - 'citation_report' (list): the per-citation scores
+    """
+    status, checks, prompt = local_citation_check(state)
+    verdict = None
+    if prompt is not None:
+        structured_llm = get_llm("verify").with_structured_output(
+            CitationStatus, include_raw=True)
+        verdict = await structured_llm.ainvoke(prompt)
+    return citation_update(status, checks, verdict)
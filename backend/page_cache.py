@@ -0,0 +1,299 @@
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import xxhash
+from langchain.schema import Document
+from .chunk_store import ChunkList
+from .disk_cache import DiskCache
+from .fetcher import FetchResult
+from .settings import get_settings
+
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref_src"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings share a cache entry.
+
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters (utm_*, fbclid, ...) and sorts the query string.
+
+    Args:
+        url (str): The URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in TRACKING_PARAMS and not k.startswith("utm_"))
+    return urlunsplit(
+        (scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+@dataclass
+class CachedPage:
+    """
+    A downloaded page, either fresh from the network or from the cache.
+
+    Attributes:
+        url (str): The URL the page was requested with.
+        body (bytes): The raw response body.
+        encoding (str): The charset used to decode the body.
+        status (int): The HTTP status of the original download.
+        etag (str): The ETag validator, if the server sent one.
+        last_modified (str): The Last-Modified validator, if any.
+        content_hash (str): A hash of the body, used to key chunks.
+        fresh (bool): Whether the page is within its time-to-live.
+        document (Document): The text extracted while downloading, if
+            any; not stored in the cache.
+        partial (bool): Whether the body was cut short before all the
+            text a page may contribute was read; neither the page nor
+            its chunks are cached.
+    """
+    url: str
+    body: bytes
+    encoding: str = "utf-8"
+    status: int = 200
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: str = ""
+    fresh: bool = True
+    document: Optional[Document] = None
+    partial: bool = False
+
+    @property
+    def text(self) -> str:
+        """
+        The body decoded with the detected charset.
+        """
+        return self.body.decode(self.encoding, errors="replace")
+
+    @classmethod
+    def from_result(cls, url: str, result: FetchResult) -> "CachedPage":
+        """
+        Build a page from a network download.
+
+        Args:
+            url (str): The URL the page was requested with.
+            result (FetchResult): The download.
+
+        Returns:
+            CachedPage: The page with its validators and content hash.
+        """
+        return cls(
+            url=url,
+            body=result.body,
+            encoding=result.encoding,
+            status=result.status,
+            etag=result.headers.get("ETag"),
+            last_modified=result.headers.get("Last-Modified"),
+            content_hash=xxhash.xxh3_64_hexdigest(result.body),
+        )
+
+
+class PageCache:
+    """
+    A persistent cache of downloaded pages and of the chunks produced
+    from them, keyed by normalized URL.
+
+    Stale pages are kept so they can be revalidated with
+    If-None-Match / If-Modified-Since. Chunks are keyed by the page's
+    content hash and the chunking parameters, so a cache hit skips HTML
+    parsing, cleaning and splitting entirely.
+    """
+
+    def __init__(self, store: DiskCache, ttl: float) -> None:
+        """
+        Args:
+            store (DiskCache): The backing store.
+            ttl (float): Seconds a page is served without revalidation.
+        """
+        self.store = store
+        self.ttl = ttl
+        self.revalidated = 0
+
+    @staticmethod
+    def _page_key(url: str) -> str:
+        return "page:" + xxhash.xxh3_128_hexdigest(normalize_url(url))
+
+    @staticmethod
+    def _chunks_key(page: CachedPage, chunking: str) -> str:
+        return f"chunks:{chunking}:{page.content_hash}"
+
+    def get_page(self, url: str) -> Optional[CachedPage]:
+        """
+        Look up a page, fresh or stale.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            Optional[CachedPage]: The cached page, or None on a miss.
+        """
+        entry = self.store.get(self._page_key(url))
+        if entry is None:
+            return None
+        meta = entry.meta
+        return CachedPage(
+            url=url,
+            body=entry.value,
+            encoding=meta.get("encoding", "utf-8"),
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            content_hash=meta.get("content_hash", ""),
+            fresh=entry.fresh,
+        )
+
+    def content_hash(self, url: str) -> Optional[str]:
+        """
+        Look up the content hash of a cached page from its metadata
+        alone, without reading the body.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            Optional[str]: The hash, or None if the page is not cached.
+        """
+        meta = self.store.get_meta(self._page_key(url))
+        return None if meta is None else meta.get("content_hash", "")
+
+    def put_page(self, url: str, result: FetchResult,
+                 partial: Optional[bool] = None) -> CachedPage:
+        """
+        Store a successful download. Error responses and partial
+        bodies are not cached, so a later read never reuses a page cut
+        at the byte cap as if it were complete.
+
+        Args:
+            url (str): The URL the page was requested with.
+            result (FetchResult): The download.
+            partial (bool, optional): Whether the body is incomplete;
+                by default any truncated download is. A download that
+                stopped once the extractor had its text budget is not.
+
+        Returns:
+            CachedPage: The page built from the download.
+        """
+        page = CachedPage.from_result(url, result)
+        page.partial = result.truncated if partial is None else partial
+        if result.status == 200 and not page.partial:
+            self.store.put(self._page_key(url), page.body, self.ttl, {
+                "encoding": page.encoding,
+                "etag": page.etag,
+                "last_modified": page.last_modified,
+                "content_hash": page.content_hash,
+            })
+        return page
+
+    def mark_revalidated(self, page: CachedPage) -> CachedPage:
+        """
+        Record that the server confirmed a stale page is unchanged
+        (HTTP 304) and restart its time-to-live.
+
+        Args:
+            page (CachedPage): The stale cached page.
+
+        Returns:
+            CachedPage: The same page, now marked fresh.
+        """
+        self.store.refresh(self._page_key(page.url), self.ttl)
+        self.revalidated += 1
+        page.fresh = True
+        return page
+
+    @staticmethod
+    def validators(page: CachedPage) -> Dict[str, str]:
+        """
+        Build conditional request headers for revalidating a page.
+
+        Args:
+            page (CachedPage): The stale cached page.
+
+        Returns:
+            Dict[str, str]: If-None-Match / If-Modified-Since headers.
+        """
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def get_chunks(self, page: CachedPage,
+                   chunking: str) -> Optional[ChunkList]:
+        """
+        Look up the chunks previously produced from a page.
+
+        Args:
+            page (CachedPage): The page the chunks came from.
+            chunking (str): Identifies the cleaning/splitting parameters.
+
+        Returns:
+            Optional[ChunkList]: The chunks, or None on a miss.
+        """
+        entry = self.store.get(self._chunks_key(page, chunking))
+        if entry is None:
+            return None
+        return ChunkList.from_dict(json.loads(entry.value))
+
+    def put_chunks(self, page: CachedPage, chunking: str,
+                   chunks: ChunkList) -> None:
+        """
+        Store the chunks produced from a page, as the page text and
+        the chunk offsets into it.
+
+        Args:
+            page (CachedPage): The page the chunks came from.
+            chunking (str): Identifies the cleaning/splitting parameters.
+            chunks (ChunkList): The chunks to store.
+        """
+        value = json.dumps(chunks.to_dict()).encode("utf-8")
+        self.store.put(self._chunks_key(page, chunking), value, self.ttl)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss/byte counters for sizing the cache.
+
+        Returns:
+            Dict[str, int]: Counters for this process plus the total
+            bytes currently stored on disk.
+        """
+        stats = self.store.stats
+        return {
+            "hits": stats.hits,
+            "misses": stats.misses,
+            "revalidated": self.revalidated,
+            "stores": stats.stores,
+            "evictions": stats.evictions,
+            "bytes_read": stats.bytes_read,
+            "bytes_written": stats.bytes_written,
+            "bytes_on_disk": self.store.total_bytes(),
+        }
+
+
+@lru_cache(maxsize=None)
+def get_page_cache() -> Optional[PageCache]:
+    """
+    Return the process-wide page cache, or None if it is disabled
+    with `ASK_WEB_PAGE_CACHE=0`.
+
+    Returns:
+        Optional[PageCache]: The shared cache.
+    """
+    settings = get_settings()
+    if not settings.page_cache_enabled:
+        return None
+    store = DiskCache(os.path.join(settings.cache_dir, "pages.sqlite3"),
+                      settings.page_cache_max_bytes)
+    return PageCache(store, settings.page_cache_ttl)
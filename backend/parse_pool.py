@@ -0,0 +1,316 @@
+import asyncio
+import multiprocessing
+import signal
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from .chunk_store import ChunkList, Source
+from .chunking import split_offsets
+from .clean_data import clean_text
+from .extract import SKIP_TAGS, extract_document, sniff_charset
+from .settings import get_settings
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is in requirements.txt
+    etree = None
+
+# What a worker sends back: the cleaned page text, its metadata, the
+# chunk start and end offsets and the length of the extracted text.
+ParsedPage = Tuple[str, Dict[str, Any], array, array, int]
+
+
+class ParseTimeout(Exception):
+    """
+    Raised when a page takes longer than `parse_timeout` to parse.
+    """
+
+
+class ParseBusy(Exception):
+    """
+    Raised when every parse worker stayed busy for too long to start a
+    page. The page itself is not at fault.
+    """
+
+
+# How long a page may wait for a free worker, as a multiple of
+# `parse_timeout`, on top of the parse itself.
+QUEUE_SLACK = 1.0
+
+
+def lxml_extract(body: bytes, url: str, encoding: Optional[str] = None,
+                 max_chars: Optional[int] = None) -> Tuple[str, dict]:
+    """
+    Extract the visible text and metadata of a page with lxml.
+
+    Keeps the same text as `TextExtractor` (script, style and
+    navigation content dropped, comments ignored), with the parsing
+    done in C.
+
+    Args:
+        body (bytes): The raw HTML.
+        url (str): The URL the page was loaded from.
+        encoding (str, optional): The page charset, if known.
+        max_chars (int, optional): Keep at most this many characters.
+
+    Returns:
+        Tuple[str, dict]: The page text and its metadata.
+    """
+    metadata = {"source": url}
+    if not body.strip():
+        return "", metadata
+    encoding = encoding or sniff_charset(body) or "utf-8"
+    parser = lxml.html.HTMLParser(encoding=encoding)
+    root = lxml.html.document_fromstring(body, parser=parser)
+    title = root.find(".//title")
+    if title is not None:
+        metadata["title"] = title.text_content()
+    description = root.find(".//meta[@name='description']")
+    if description is not None:
+        metadata["description"] = (description.get("content")
+                                   or "No description found.")
+    metadata["language"] = root.get("lang") or "No language found."
+
+    etree.strip_elements(root, *SKIP_TAGS, with_tail=False)
+    etree.strip_elements(root, etree.Comment, etree.ProcessingInstruction,
+                         with_tail=False)
+    parts = []
+    chars = 0
+    for text in root.itertext():
+        parts.append(text)
+        chars += len(text)
+        if max_chars is not None and chars >= max_chars:
+            break
+    text = "".join(parts)
+    return (text if max_chars is None else text[:max_chars]), metadata
+
+
+def parse_page(body: bytes, url: str, encoding: Optional[str],
+               max_chars: int, chunk_size: int, chunk_overlap: int,
+               fast: bool = True) -> ParsedPage:
+    """
+    Turn a raw page into cleaned text and chunk offsets.
+
+    This is what runs in the worker processes: extraction, cleaning
+    and splitting, with only the bytes sent in and the compact result
+    sent back.
+
+    Args:
+        body (bytes): The raw HTML.
+        url (str): The URL the page was loaded from.
+        encoding (str, optional): The page charset, if known.
+        max_chars (int): Characters of text kept per page.
+        chunk_size (int): The maximum chunk length.
+        chunk_overlap (int): The maximum overlap between chunks.
+        fast (bool): Use lxml when it is installed.
+
+    Returns:
+        ParsedPage: The cleaned text, metadata, chunk starts, chunk
+        ends and the length of the extracted text.
+    """
+    if fast and etree is not None:
+        text, metadata = lxml_extract(body, url, encoding, max_chars)
+    else:
+        document = extract_document(body, url, encoding, max_chars)
+        text, metadata = document.page_content, document.metadata
+    extracted = len(text)
+    text = clean_text(text[:max_chars])
+    spans = split_offsets(text, chunk_size, chunk_overlap)
+    return (text, metadata, array("I", (start for start, _ in spans)),
+            array("I", (end for _, end in spans)), extracted)
+
+
+def parse_bounded(timeout: float, *args: Any) -> ParsedPage:
+    """
+    Run `parse_page` in a worker, stopping it with `ParseTimeout` after
+    `timeout` seconds so a pathological page cannot keep the worker
+    busy. The timer is a SIGALRM, so it fires between Python steps of
+    the parse; where there is no `setitimer` the parse is unbounded.
+
+    Args:
+        timeout (float): Seconds the parse may take; 0 for no limit.
+        *args: The arguments of `parse_page`.
+
+    Returns:
+        ParsedPage: What `parse_page` returns.
+    """
+    if timeout <= 0 or not hasattr(signal, "setitimer"):
+        return parse_page(*args)
+
+    def expire(signum: int, frame: Any) -> None:
+        raise ParseTimeout(f"{args[1]}: parsing took over {timeout}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        return parse_page(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _ready() -> bool:
+    """
+    A no-op task that makes the pool start a worker.
+    """
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Return the process-wide pool that parses pages, or None when
+    `ASK_WEB_PARSE_WORKERS` is 0 and pages are parsed in threads.
+
+    Workers are spawned rather than forked, as the process already
+    runs threads (the fetcher loop, the server), and are started
+    right away so the first pages do not pay for their imports.
+
+    Returns:
+        Optional[ProcessPoolExecutor]: The shared pool.
+    """
+    workers = get_settings().parse_workers
+    if workers <= 0:
+        return None
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    for _ in range(workers):
+        pool.submit(_ready)
+    return pool
+
+
+def close_parse_pool() -> None:
+    """
+    Shut down the parse pool, if one was started.
+    """
+    if get_parse_pool.cache_info().currsize:
+        pool = get_parse_pool()
+        get_parse_pool.cache_clear()
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Stop using a broken pool, so the next page starts a fresh one, and
+    release its remaining workers and queue.
+    """
+    if get_parse_pool.cache_info().currsize and get_parse_pool() is pool:
+        get_parse_pool.cache_clear()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parser_name() -> str:
+    """
+    Identify the extractor pages are parsed with, so cached chunks
+    made by a different one are not reused.
+    """
+    if get_settings().parse_workers > 0 and etree is not None:
+        return "lxml"
+    return "html"
+
+
+def parse_chunks(
+        body: bytes, url: str, encoding: Optional[str], chunk_size: int,
+        chunk_overlap: int) -> Tuple[ChunkList, int]:
+    """
+    Parse a page into chunks in the parse pool. The worker gives up on
+    the page after `parse_timeout` seconds of parsing; time spent
+    waiting for a free worker does not count towards that. Without a
+    pool the page is parsed in the calling thread with the standard
+    library parser.
+
+    Args:
+        body (bytes): The raw HTML.
+        url (str): The URL the page was loaded from.
+        encoding (str, optional): The page charset, if known.
+        chunk_size (int): The maximum chunk length.
+        chunk_overlap (int): The maximum overlap between chunks.
+
+    Returns:
+        Tuple[ChunkList, int]: The chunks and the length of the
+        extracted text.
+
+    Raises:
+        ParseTimeout: If the page takes too long to parse.
+        ParseBusy: If no worker was free to start the page in time.
+    """
+    args = _parse_args(body, url, encoding, chunk_size, chunk_overlap)
+    pool = get_parse_pool()
+    if pool is None:
+        return _to_chunks(parse_page(*args, fast=False))
+    timeout = get_settings().parse_timeout
+    future = pool.submit(parse_bounded, timeout, *args)
+    try:
+        parsed = future.result(timeout=_wait_limit(timeout))
+    except FutureTimeout:
+        # Still queued, as a running parse stops itself in time.
+        future.cancel()
+        raise _busy(url, timeout)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start afresh.
+        _discard_pool(pool)
+        raise
+    return _to_chunks(parsed)
+
+
+async def aparse_chunks(
+        body: bytes, url: str, encoding: Optional[str], chunk_size: int,
+        chunk_overlap: int) -> Tuple[ChunkList, int]:
+    """
+    Async version of `parse_chunks`. The pool's result is awaited on
+    the event loop, so a page waiting for a worker does not also hold
+    a thread of the default executor. Without a pool the page is
+    parsed in a worker thread.
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return await asyncio.to_thread(
+            parse_chunks, body, url, encoding, chunk_size, chunk_overlap)
+    args = _parse_args(body, url, encoding, chunk_size, chunk_overlap)
+    timeout = get_settings().parse_timeout
+    future = pool.submit(parse_bounded, timeout, *args)
+    try:
+        parsed = await asyncio.wait_for(asyncio.wrap_future(future),
+                                        _wait_limit(timeout))
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise _busy(url, timeout)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    return _to_chunks(parsed)
+
+
+def _parse_args(body: bytes, url: str, encoding: Optional[str],
+                chunk_size: int, chunk_overlap: int) -> tuple:
+    return (body, url, encoding, get_settings().page_max_chars, chunk_size,
+            chunk_overlap)
+
+
+def _wait_limit(timeout: float) -> Optional[float]:
+    """
+    How long to wait for a page's result: its parse plus the time it
+    may spend queued.
+    """
+    return timeout * (1 + QUEUE_SLACK) if timeout > 0 else None
+
+
+def _busy(url: str, timeout: float) -> ParseBusy:
+    return ParseBusy(f"{url}: no parse worker free within "
+                     f"{timeout * QUEUE_SLACK:g}s")
+
+
+def _to_chunks(parsed: ParsedPage) -> Tuple[ChunkList, int]:
+    """
+    Turn a worker's result into chunks over the page text.
+    """
+    text, metadata, starts, ends, extracted = parsed
+    if not starts:
+        return ChunkList(), extracted
+    return ChunkList([Source(text, metadata)], [0] * len(starts), starts,
+                     ends), extracted
@@ -4,6 +4,7 @@ If you don't know the answer, just say that you don't know, don't try to make up
 
 Cite sources using square brackets with numbers (e.g., [1], [2]). At the end, include a "Sources" section
  listing each number, title, and URL. Numbering should always start from 1
+The context is grouped by source, each introduced by its number, title and URL; use those numbers when citing.
 
 Example:
 
@@ -0,0 +1,122 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from has have how i if
+in into is it its of on or that the their there these this to was what
+when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens, dropping common stopwords.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        List[str]: The content-bearing tokens.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many LLM tokens a piece of text costs.
+
+    Uses the common ~4 characters per token rule of thumb, which is
+    close enough for budgeting English prompts.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return math.ceil(len(text) / 4)
+
+
+def bm25_scores(
+        query_tokens: Sequence[str],
+        docs_tokens: Sequence[Sequence[str]],
+        k1: float = 1.5,
+        b: float = 0.75) -> np.ndarray:
+    """
+    Score documents against a query with Okapi BM25.
+
+    Args:
+        query_tokens (Sequence[str]): The tokenized query.
+        docs_tokens (Sequence[Sequence[str]]): The tokenized documents.
+        k1 (float): Term frequency saturation.
+        b (float): Length normalization strength.
+
+    Returns:
+        np.ndarray: One score per document.
+    """
+    terms = sorted(set(query_tokens))
+    n_docs = len(docs_tokens)
+    if not terms or n_docs == 0:
+        return np.zeros(n_docs)
+
+    tf = np.zeros((n_docs, len(terms)))
+    for row, tokens in enumerate(docs_tokens):
+        counts = Counter(tokens)
+        tf[row] = [counts.get(term, 0) for term in terms]
+    lengths = np.array([len(tokens) for tokens in docs_tokens], dtype=float)
+    avg_length = lengths.mean() or 1.0
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * lengths / avg_length)
+    weights = tf * (k1 + 1) / (tf + norm[:, None])
+    return weights @ idf
+
+
+def select_context(
+        question: str,
+        docs: Sequence[Any],
+        token_budget: int) -> Tuple[List[Any], Dict[str, int]]:
+    """
+    Keep the chunks most relevant to the question that fit a token
+    budget.
+
+    Chunks are ranked by BM25 against the question and added greedily
+    in score order until the budget is spent.
+
+    Args:
+        question (str): The user's question.
+        docs (Sequence[Document]): The candidate chunks.
+        token_budget (int): The maximum estimated context tokens.
+
+    Returns:
+        Tuple[List[Document], Dict[str, int]]: The selected chunks in
+        relevance order, and stats on chunks and tokens kept/saved.
+    """
+    costs = [estimate_tokens(doc.page_content) for doc in docs]
+    scores = bm25_scores(tokenize(question),
+                         [tokenize(doc.page_content) for doc in docs])
+
+    selected = []
+    used = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if used + costs[index] > token_budget:
+            continue
+        selected.append(docs[index])
+        used += costs[index]
+
+    tokens_in = sum(costs)
+    stats = {
+        "chunks_in": len(docs),
+        "chunks_out": len(selected),
+        "tokens_in": tokens_in,
+        "tokens_out": used,
+        "tokens_saved": tokens_in - used,
+    }
+    return selected, stats
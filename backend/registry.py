@@ -0,0 +1,87 @@
+import threading
+from typing import Any, Callable, Dict
+from .settings import get_settings
+
+
+_lock = threading.Lock()
+_instances: Dict[str, Any] = {}
+
+
+def _get_or_build(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Return the process-wide instance registered under `name`,
+    building it with `factory` the first time it is requested.
+
+    Args:
+        name (str): The registry key.
+        factory (Callable): Zero-argument callable that builds the instance.
+
+    Returns:
+        Any: The shared instance.
+    """
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        instance = _instances.get(name)
+        if instance is None:
+            instance = factory()
+            _instances[name] = instance
+    return instance
+
+
+def get_llm(task: str = "generate", question: str = "") -> Any:
+    """
+    Return the shared language model for a task, creating it on first
+    use.
+
+    Citation verification and questions of at most
+    `ASK_WEB_LLM_SHORT_QUESTION_CHARS` characters go to the fast model
+    (`ASK_WEB_LLM_FAST_MODEL`); everything else to `ASK_WEB_LLM_MODEL`.
+    Each model is wrapped once in an `LLMBackend`, which adds the
+    deadline, the provider's concurrency cap and hedged requests.
+
+    Args:
+        task (str): `generate` or `verify`.
+        question (str): The question being answered, if any.
+
+    Returns:
+        LLMBackend: The process-wide backend of the chosen model.
+    """
+    settings = get_settings()
+    model = settings.llm_model
+    if task == "verify" or (
+            question
+            and len(question) <= settings.llm_short_question_chars):
+        model = settings.llm_fast_model or model
+
+    def build() -> Any:
+        from .llm import LLMBackend
+        from .load_llm import load_llm
+        return LLMBackend.from_settings(load_llm(model), model)
+    return _get_or_build(f"llm:{model}", build)
+
+
+def get_graph() -> Any:
+    """
+    Return the shared compiled graph, building it on first use.
+
+    The compiled graph is stateless between runs, so one instance
+    can serve Streamlit reruns, `ask_the_web` and any server.
+
+    Returns:
+        CompiledStateGraph: The process-wide compiled graph.
+    """
+    def build() -> Any:
+        from .graph import generate_graph
+        return generate_graph()
+    return _get_or_build("graph", build)
+
+
+def reset() -> None:
+    """
+    Drop every cached instance so the next request rebuilds it.
+    Mainly useful in tests and after configuration changes.
+    """
+    with _lock:
+        _instances.clear()
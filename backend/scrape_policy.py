@@ -0,0 +1,248 @@
+import asyncio
+import contextvars
+import math
+import time
+from dataclasses import dataclass
+from typing import (Any, AsyncIterator, Awaitable, Callable, Dict, List,
+                    Optional, Tuple, Union)
+from .domain_health import get_domain_health
+from .instrumentation import PAGE_SECONDS, current_page
+from .settings import Settings, get_settings
+
+Scraper = Callable[[str], Awaitable[list]]
+Links = Union[List[str], AsyncIterator[str]]
+
+
+@dataclass(frozen=True)
+class ScrapePolicy:
+    """
+    How many pages to scrape per question and how long to wait.
+
+    Attributes:
+        budget (float): Seconds the whole scraping stage may take.
+        target_pages (int): Stop once this many pages have succeeded.
+        overfetch (float): Candidate links tried per target page, so
+            failures and slow sites can be replaced by later results.
+        hedge_after (float): Seconds before a still-pending page gets a
+            duplicate request; 0 disables hedging.
+    """
+    budget: float = 8.0
+    target_pages: int = 3
+    overfetch: float = 2.0
+    hedge_after: float = 3.0
+
+    @property
+    def candidates(self) -> int:
+        """
+        The number of links to try.
+        """
+        return max(self.target_pages,
+                   math.ceil(self.target_pages * self.overfetch))
+
+    @classmethod
+    def from_settings(cls, settings: Settings = None) -> "ScrapePolicy":
+        """
+        Build the policy from the `ASK_WEB_SCRAPE_*` settings.
+        """
+        settings = settings or get_settings()
+        return cls(budget=settings.scrape_budget,
+                   target_pages=settings.scrape_target_pages,
+                   overfetch=settings.scrape_overfetch,
+                   hedge_after=settings.scrape_hedge_after)
+
+
+async def _cancel(tasks: set) -> None:
+    """
+    Cancel tasks and wait for them to finish unwinding.
+    """
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _hedged(link: str, scrape: Scraper, hedge: Scraper,
+                  hedge_after: float, stats: Dict[str, Any]) -> list:
+    """
+    Scrape a link, sending a duplicate request with `hedge` if the
+    first one has not finished after `hedge_after` seconds. The first
+    attempt to succeed wins and the other is cancelled.
+    """
+    pending = {asyncio.ensure_future(scrape(link))}
+    try:
+        if hedge_after > 0:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                stats["hedged"] += 1
+                pending.add(asyncio.ensure_future(hedge(link)))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            # Read every finished attempt's error, so a failed loser
+            # is never reported as an unretrieved task exception.
+            errors = [(task, task.exception()) for task in done]
+            for task, task_error in errors:
+                if task_error is None:
+                    return task.result()
+                error = task_error
+        raise error
+    finally:
+        # Also reached when the branch itself is cancelled, so no
+        # attempt keeps downloading after `gather_pages` returns.
+        await _cancel(pending)
+
+
+async def _as_stream(links: Links) -> AsyncIterator[str]:
+    """
+    Iterate a list of links or an async stream of them alike.
+    """
+    if hasattr(links, "__aiter__"):
+        async for link in links:
+            yield link
+    else:
+        for link in links:
+            yield link
+
+
+async def gather_pages(
+        links: Links,
+        scrape: Scraper,
+        policy: ScrapePolicy,
+        hedge: Optional[Scraper] = None
+) -> Tuple[List[list], Dict[str, Any]]:
+    """
+    Scrape candidate links concurrently and return the first pages
+    that succeed within the time budget.
+
+    Up to `policy.candidates` links are started, each as soon as it is
+    known: `links` may be an async stream, such as search results
+    still arriving. The budget starts with the first link. As soon as
+    `policy.target_pages` pages return chunks, or the budget runs out,
+    the remaining downloads are cancelled and the stage answers with
+    whatever has arrived. Failed or empty pages are skipped, and
+    pages cut off by the budget count as timeouts for their domain.
+
+    Args:
+        links (Links): Candidate links, best first, as a list or an
+            async stream.
+        scrape (Scraper): Coroutine function returning a page's chunks.
+        policy (ScrapePolicy): The budget, target and hedging settings.
+        hedge (Scraper, optional): Sends the duplicate request of a
+            slow page; `scrape` by default. It must not merge into
+            the download already in flight.
+
+    Returns:
+        Tuple[List[list], Dict]: The chunk lists of the successful
+        pages in search-rank order, and stats for the stage, including
+        the `links` started. With a stream, `first_link` and
+        `links_done` are the seconds after which the first link
+        arrived and the stream ended.
+
+    Raises:
+        Exception: Whatever the stream raised, if it failed before
+            yielding any link.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = None
+    stats = {"candidates": 0, "succeeded": 0, "failed": 0,
+             "empty": 0, "cancelled": 0, "hedged": 0, "timed_out": False,
+             "first_link": None, "links_done": None, "pages": []}
+
+    started = {}
+    tasks = {}
+    records = {}
+
+    def launch(link: str) -> asyncio.Task:
+        # Each branch gets its own record, which the fetching and
+        # splitting code fills in through `note_page`.
+        record = {"link": link}
+        context = contextvars.copy_context()
+        context.run(current_page.set, record)
+        task = loop.create_task(
+            _hedged(link, scrape, hedge or scrape, policy.hedge_after,
+                    stats),
+            context=context)
+        tasks[task] = (len(tasks), link)
+        records[task] = record
+        started[task] = time.perf_counter()
+        return task
+
+    stream = _as_stream(links)
+    reader = (asyncio.ensure_future(anext(stream))
+              if policy.candidates > 0 else None)
+    results = []
+    pending = set()
+    try:
+        while (pending or reader) and len(results) < policy.target_pages:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    stats["timed_out"] = True
+                    break
+            waiting = pending | {reader} if reader else pending
+            done, _ = await asyncio.wait(
+                waiting, timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED)
+            if reader in done:
+                done.discard(reader)
+                error = reader.exception()
+                if error is None:
+                    if deadline is None:
+                        stats["first_link"] = loop.time() - start
+                        deadline = loop.time() + policy.budget
+                    pending.add(launch(reader.result()))
+                if error is None and len(tasks) < policy.candidates:
+                    reader = asyncio.ensure_future(anext(stream))
+                else:
+                    reader = None
+                    stats["links_done"] = loop.time() - start
+                    if not isinstance(error, (StopAsyncIteration,
+                                              type(None))):
+                        if not tasks:
+                            raise error
+                        stats["stream_error"] = repr(error)
+            pending -= done
+            for task in done:
+                rank, link = tasks[task]
+                page = records[task]
+                page["duration"] = time.perf_counter() - started[task]
+                if task.exception() is not None:
+                    stats["failed"] += 1
+                    page["error"] = repr(task.exception())
+                    outcome = "failed"
+                    print(f"Error loading website: {task.exception()}")
+                elif not task.result():
+                    stats["empty"] += 1
+                    outcome = "empty"
+                else:
+                    results.append((rank, task.result()))
+                    page["chunks"] = len(task.result())
+                    outcome = "ok"
+                PAGE_SECONDS.observe(page["duration"], outcome=outcome)
+                stats["pages"].append(page)
+    finally:
+        stats["cancelled"] = len(pending)
+        if stats["timed_out"]:
+            # Pages still loading when the budget ran out count against
+            # their domain; those cancelled because enough pages
+            # arrived do not.
+            for task in pending:
+                get_domain_health().record_failure(tasks[task][1],
+                                                   "timeout")
+        for task in pending:
+            PAGE_SECONDS.observe(time.perf_counter() - started[task],
+                                 outcome="cancelled")
+        if reader is not None:
+            pending.add(reader)
+        await _cancel(pending)
+        await stream.aclose()
+
+    stats["candidates"] = len(tasks)
+    stats["links"] = [link for _, link in tasks.values()]
+    results.sort(key=lambda item: item[0])
+    pages = [chunks for _, chunks in results[:policy.target_pages]]
+    stats["succeeded"] = len(pages)
+    stats["elapsed"] = loop.time() - start
+    return pages, stats
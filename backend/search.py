@@ -0,0 +1,468 @@
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import (Any, AsyncIterator, Callable, Dict, Optional, Set,
+                    Tuple)
+from .disk_cache import DiskCache
+from .instrumentation import SEARCH_EVENTS
+from .settings import get_settings
+
+SearchBackend = Callable[[str], list[dict]]
+
+
+class SearchError(Exception):
+    """
+    Raised when the upstream search keeps failing after every retry
+    and no cached result is available.
+    """
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a question so trivially different spellings share a
+    cache entry: lowercase, collapse whitespace and strip surrounding
+    punctuation.
+
+    Args:
+        query (str): The raw question.
+
+    Returns:
+        str: The normalized question.
+    """
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" ?!.,;:\"'")
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Return True if an upstream error means we are being throttled.
+
+    Args:
+        error (Exception): The error raised by the search backend.
+
+    Returns:
+        bool: Whether backing off and retrying is appropriate.
+    """
+    try:
+        from duckduckgo_search.exceptions import (
+            RatelimitException, TimeoutException)
+        if isinstance(error, (RatelimitException, TimeoutException)):
+            return True
+    except ImportError:
+        pass
+    message = str(error).lower()
+    return ("ratelimit" in message
+            or re.search(r"\b429\b", message) is not None)
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that paces outbound requests.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Each caller reserves a token at once, letting the balance go
+    negative, and then waits out its own delay: `acquire` sleeps in the
+    calling thread and `aacquire` on the event loop, so async callers
+    never hold a worker thread while paced. A `rate` of 0 or less
+    disables pacing.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token, possibly ahead of time.
+
+        Returns:
+            float: The seconds to wait before using the token.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until it is due.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def aacquire(self) -> float:
+        """
+        Async version of `acquire`, waiting with `asyncio.sleep`.
+        """
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class SearchService:
+    """
+    A caching, rate-limit-aware front for a web search backend.
+
+    Queries are normalized and cached with a TTL. Identical searches
+    already in flight are merged into one upstream call. Upstream
+    traffic is paced by a token bucket, and throttled calls back off
+    exponentially; once retries run out a stale cached result is
+    served if one exists.
+    """
+
+    def __init__(
+            self,
+            backend: SearchBackend,
+            store: Optional[DiskCache],
+            ttl: float,
+            bucket: TokenBucket,
+            max_retries: int = 4,
+            backoff: float = 1.0) -> None:
+        """
+        Args:
+            backend (SearchBackend): Performs one upstream search.
+            store (DiskCache, optional): Where results are cached.
+            ttl (float): Seconds a result is reused.
+            bucket (TokenBucket): Paces upstream calls.
+            max_retries (int): Retries when throttled.
+            backoff (float): Base delay in seconds between retries.
+        """
+        self.backend = backend
+        self.store = store
+        self.ttl = ttl
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._inflight: Dict[str, Future] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0,
+                         "upstream_calls": 0, "throttled": 0,
+                         "stale_served": 0, "stale_streamed": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+        SEARCH_EVENTS.inc(event=name)
+
+    @staticmethod
+    def _key(normalized: str) -> str:
+        return "search:" + normalized
+
+    def _cached(self, key: str) -> Tuple[Optional[list], Optional[list]]:
+        """
+        Look a query up in the cache, counting a hit or a miss.
+
+        Returns:
+            Tuple[Optional[list], Optional[list]]: The fresh results,
+            or else the stale results if any are cached.
+        """
+        if self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                results = json.loads(entry.value)
+                if entry.fresh:
+                    self._count("hits")
+                    return results, None
+                self._count("misses")
+                return None, results
+        self._count("misses")
+        return None, None
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """
+        Return the in-flight search for a key, registering a new one
+        when there is none.
+
+        Returns:
+            Tuple[Future, bool]: The search's future, and whether the
+            caller leads it and must resolve the future.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self._count("coalesced")
+        return future, leader
+
+    def _settle(self, key: str, future: Future, results: Any = None,
+                error: Optional[BaseException] = None) -> None:
+        """
+        Resolve a led search and stop merging new callers into it.
+        """
+        if error is None:
+            future.set_result(results)
+        else:
+            future.set_exception(error)
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def search(self, query: str) -> list[dict]:
+        """
+        Return search results for a query, from cache when possible.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            list[dict]: The search results.
+
+        Raises:
+            SearchError: If every attempt failed and nothing is cached.
+        """
+        key = self._key(normalize_query(query))
+        fresh, stale = self._cached(key)
+        if fresh is not None:
+            return fresh
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            results = self._search_upstream(query, stale)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, results)
+        return results
+
+    async def asearch(self, query: str) -> list[dict]:
+        """
+        Async version of `search`. Pacing and backoff wait on the
+        event loop; the cache lookup and the blocking backend call run
+        in worker threads, so neither blocks the loop and throttled
+        searches do not tie up the default executor that page parsing
+        and indexing also use.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            list[dict]: The search results.
+
+        Raises:
+            SearchError: If every attempt failed and nothing is cached.
+        """
+        key = self._key(normalize_query(query))
+        fresh, stale = await asyncio.to_thread(self._cached, key)
+        if fresh is not None:
+            return fresh
+        return await self._asearch_led(query, key, stale)
+
+    async def _asearch_led(self, query: str, key: str,
+                           stale: Optional[list[dict]]) -> list[dict]:
+        """
+        Search upstream, or wait for the identical search in flight.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            results = await self._asearch_upstream(query, stale)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, results)
+        return results
+
+    async def astream(self, query: str) -> AsyncIterator[dict]:
+        """
+        Yield search results as soon as each is known.
+
+        Fresh cached results are yielded at once. When only a stale
+        result is cached, the upstream search is started in the
+        background and the stale entries are yielded straight away,
+        followed by any new links it returns, so callers can start
+        downloading before the search finishes. The refreshed result
+        is cached even if the caller stops reading early.
+        Backends return a whole page of results at a time, so without
+        a cached result everything arrives together.
+
+        Args:
+            query (str): The search query.
+
+        Yields:
+            dict: One search result.
+
+        Raises:
+            SearchError: If every attempt failed and nothing is cached.
+        """
+        key = self._key(normalize_query(query))
+        fresh, stale = await asyncio.to_thread(self._cached, key)
+        if fresh is not None:
+            for result in fresh:
+                yield result
+            return
+        if stale is None:
+            for result in await self._asearch_led(query, key, stale):
+                yield result
+            return
+
+        # Refresh in the background before streaming the stale links:
+        # callers often stop reading once they have enough links, and
+        # the fresh result must still be searched for and cached.
+        self._count("stale_streamed")
+        refresh = asyncio.ensure_future(
+            self._asearch_led(query, key, stale))
+        self._refreshing.add(refresh)
+        refresh.add_done_callback(self._refreshed)
+        seen = set()
+        for result in stale:
+            seen.add(result.get("link"))
+            yield result
+        for result in await asyncio.shield(refresh):
+            if result.get("link") not in seen:
+                yield result
+
+    def _refreshed(self, task: asyncio.Task) -> None:
+        """
+        Forget a finished background refresh, reporting its failure.
+        """
+        self._refreshing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error refreshing search: {task.exception()}")
+
+    def _give_up(self, attempt: int, error: Exception,
+                 stale: Optional[list[dict]]) -> Optional[list[dict]]:
+        """
+        Handle a failed upstream attempt.
+
+        Returns:
+            Optional[list[dict]]: The stale results to serve once the
+            retries have run out, or None to back off and retry.
+
+        Raises:
+            Exception: The error itself if it is not throttling.
+            SearchError: If retries ran out and nothing is cached.
+        """
+        if not is_rate_limited(error):
+            raise error
+        self._count("throttled")
+        if attempt < self.max_retries:
+            return None
+        if stale is None:
+            raise SearchError(
+                f"Search still throttled after "
+                f"{self.max_retries} retries: {error}") from error
+        self._count("stale_served")
+        return stale
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        The jittered delay before retry number `attempt + 1`.
+        """
+        delay = self.backoff * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def _store(self, query: str, results: list[dict]) -> None:
+        if self.store is not None:
+            self.store.put(self._key(normalize_query(query)),
+                           json.dumps(results).encode("utf-8"), self.ttl)
+
+    def _search_upstream(self, query: str,
+                         stale: Optional[list[dict]]) -> list[dict]:
+        """
+        Call the backend with pacing and backoff, caching the result.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self._count("upstream_calls")
+            try:
+                results = self.backend(query)
+            except Exception as e:
+                served = self._give_up(attempt, e, stale)
+                if served is not None:
+                    return served
+                time.sleep(self._backoff(attempt))
+                continue
+            self._store(query, results)
+            return results
+
+    async def _asearch_upstream(self, query: str,
+                                stale: Optional[list[dict]]) -> list[dict]:
+        """
+        Async version of `_search_upstream`.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.aacquire()
+            self._count("upstream_calls")
+            try:
+                results = await asyncio.to_thread(self.backend, query)
+            except Exception as e:
+                served = self._give_up(attempt, e, stale)
+                if served is not None:
+                    return served
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            await asyncio.to_thread(self._store, query, results)
+            return results
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return cache and upstream counters for this process.
+        """
+        with self._lock:
+            return dict(self.counters)
+
+
+def duckduckgo_backend(num_results: int = 10) -> SearchBackend:
+    """
+    Build a search backend around a single reusable
+    DuckDuckGoSearchResults tool.
+
+    Args:
+        num_results (int): Results requested per search, enough for
+            the scraper to over-fetch candidate links.
+
+    Returns:
+        SearchBackend: A callable returning a list of result dicts.
+    """
+    from langchain_community.tools import DuckDuckGoSearchResults
+
+    tool = DuckDuckGoSearchResults(output_format='list',
+                                   num_results=num_results)
+    return tool.invoke
+
+
+@lru_cache(maxsize=None)
+def get_search_service() -> SearchService:
+    """
+    Return the process-wide search service backed by DuckDuckGo.
+
+    Returns:
+        SearchService: The shared search service.
+    """
+    settings = get_settings()
+    store = DiskCache(os.path.join(settings.cache_dir, "search.sqlite3"),
+                      max_bytes=32 * 1024 * 1024)
+    return SearchService(
+        backend=duckduckgo_backend(settings.search_num_results),
+        store=store,
+        ttl=settings.search_cache_ttl,
+        bucket=TokenBucket(settings.search_rate, settings.search_burst),
+        max_retries=settings.search_max_retries,
+        backoff=settings.search_backoff,
+    )
@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from aiohttp import web
+from .answer_cache import AnswerCache, get_answer_cache
+from .domain_health import get_domain_health
+from .fetcher import close_fetcher
+from .instrumentation import REGISTRY
+from .parse_pool import close_parse_pool, get_parse_pool
+from .registry import get_graph
+from .search import normalize_query
+from .settings import get_settings
+from .streaming import answer_payload, astream_events, cached_events
+
+SSE_HEADERS = {
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    """
+    Encode one Server-Sent Event.
+
+    Args:
+        event (str): The event name.
+        data (Any): The JSON-serializable payload.
+
+    Returns:
+        bytes: The encoded event.
+    """
+    payload = json.dumps(data, default=str)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class QuestionRun:
+    """
+    One graph run whose output any number of clients can follow.
+
+    Events are buffered for the lifetime of the run, so a client that
+    attaches late first replays what it missed. Each follower reads at
+    its own pace, so a slow client never holds back the run or the
+    other clients.
+    """
+
+    def __init__(self, question: str) -> None:
+        self.question = question
+        self.events: List[Tuple[str, Any]] = []
+        self.done = False
+        self._changed = asyncio.Event()
+
+    def _publish(self, event: str, data: Any) -> None:
+        self.events.append((event, data))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def produce(self, source: AsyncIterator[Dict[str, Any]]) -> None:
+        """
+        Consume the stream events of a run and publish them as
+        `token`, `answer`, `done` or `error` events.
+
+        Args:
+            source (AsyncIterator[dict]): From `astream_events`.
+        """
+        state: Dict[str, Any] = {}
+        try:
+            async for event in source:
+                if event["event"] == "token":
+                    self._publish("token", {"text": event["data"]})
+                elif event["event"] == "values":
+                    state = event["data"]
+                else:
+                    self._publish("answer", answer_payload(state))
+                    self._publish("done", event["data"])
+        except Exception as e:
+            print(f"Error answering {self.question!r}: {e}")
+            self._publish("error", {"message": str(e)})
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def follow(self) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Yield every event of the run, from the first, until it ends.
+
+        Yields:
+            Tuple[str, Any]: The event name and payload.
+        """
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                return
+            await changed.wait()
+
+
+async def replay(events: List[Dict[str, Any]]
+                 ) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Turn a list of stream events back into an async stream.
+    """
+    for event in events:
+        yield event
+
+
+class AskService:
+    """
+    Runs questions through the shared graph for HTTP clients.
+
+    Requests whose normalized question is already being answered
+    attach to that run instead of starting another. At most
+    `max_concurrency` runs execute at once and up to `max_queue` more
+    wait for a slot; past that, new questions are rejected so the
+    load balancer can send them elsewhere. Cached answers are served
+    without taking a slot.
+    """
+
+    def __init__(self, graph: Any, cache: Optional[AnswerCache],
+                 max_concurrency: int, max_queue: int) -> None:
+        """
+        Args:
+            graph (Any): The compiled graph.
+            cache (AnswerCache, optional): The shared answer cache.
+            max_concurrency (int): Graph runs executed at once.
+            max_queue (int): Runs allowed to wait for a slot.
+        """
+        self.graph = graph
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._runs: Dict[str, QuestionRun] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.running = 0
+        self.counters = {"requests": 0, "runs": 0, "cache_hits": 0,
+                         "coalesced": 0, "rejected": 0}
+
+    async def attach(self, question: str) -> Optional[QuestionRun]:
+        """
+        Return the run answering a question, starting one if needed.
+
+        The answer cache is read in a worker thread, so its SQLite and
+        zstd work does not stall the streams of other questions.
+
+        Args:
+            question (str): The user's question.
+
+        Returns:
+            Optional[QuestionRun]: The run to follow, or None when the
+            service is saturated.
+        """
+        self.counters["requests"] += 1
+        key = normalize_query(question)
+        run = self._runs.get(key)
+        if run is None and self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, question)
+            # Another request may have started a run while we looked.
+            run = self._runs.get(key)
+        else:
+            cached = None
+        if run is not None:
+            self.counters["coalesced"] += 1
+            return run
+
+        run = QuestionRun(question)
+        if cached is not None:
+            self.counters["cache_hits"] += 1
+            self._start(run.produce(replay(
+                cached_events(cached, time.perf_counter()))))
+            return run
+
+        if len(self._runs) >= self.max_concurrency + self.max_queue:
+            self.counters["rejected"] += 1
+            return None
+        self.counters["runs"] += 1
+        self._runs[key] = run
+        self._start(self._execute(key, run))
+        return run
+
+    def _start(self, coro: Any) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, key: str, run: QuestionRun) -> None:
+        """
+        Wait for a slot, then run the graph for a question.
+        """
+        try:
+            async with self._slots:
+                self.running += 1
+                try:
+                    await run.produce(astream_events(
+                        self.graph, run.question, self.cache))
+                finally:
+                    self.running -= 1
+        finally:
+            self._runs.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return admission and coalescing counters.
+        """
+        return {**self.counters,
+                "running": self.running,
+                "queued": len(self._runs) - self.running}
+
+    async def close(self) -> None:
+        """
+        Cancel the runs still in progress.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+SERVICE = web.AppKey("service", AskService)
+
+
+async def read_question(request: web.Request) -> str:
+    """
+    Read the question from `?q=` or a JSON body `{"question": ...}`.
+    """
+    question = request.query.get("q", "")
+    if not question and request.can_read_body:
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+        if isinstance(body, dict):
+            question = str(body.get("question", ""))
+    return question.strip()
+
+
+async def handle_ask(request: web.Request) -> web.StreamResponse:
+    """
+    Answer a question as a stream of Server-Sent Events: `token`
+    events with answer text, then `answer` with the final answer,
+    citation status and usage, then `done` with timings (or `error`).
+    """
+    question = await read_question(request)
+    if not question:
+        return web.json_response(
+            {"error": "Missing question, pass ?q= or a JSON body."},
+            status=400)
+    run = await request.app[SERVICE].attach(question)
+    if run is None:
+        return web.json_response(
+            {"error": "Too many questions in progress, retry later."},
+            status=503, headers={"Retry-After": "1"})
+
+    response = web.StreamResponse(headers=SSE_HEADERS)
+    await response.prepare(request)
+    try:
+        async for event, data in run.follow():
+            # write() waits for the socket to drain, so a slow client
+            # only slows down its own stream.
+            await response.write(format_sse(event, data))
+    except ConnectionResetError:
+        pass
+    return response
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    """
+    Report liveness together with admission counters and the domains
+    currently failing or skipped.
+    """
+    return web.json_response({**request.app[SERVICE].stats(),
+                              "domains": get_domain_health().snapshot()})
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """
+    Expose the process metrics in the Prometheus text format.
+    """
+    return web.Response(text=REGISTRY.render(),
+                        content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def on_startup(app: web.Application) -> None:
+    """
+    Start the parse pool's workers before the first request.
+    """
+    get_parse_pool()
+
+
+async def on_cleanup(app: web.Application) -> None:
+    """
+    Stop unfinished runs, close the pooled HTTP session and shut down
+    the parse pool.
+    """
+    await app[SERVICE].close()
+    await close_fetcher()
+    await asyncio.to_thread(close_parse_pool)
+
+
+def create_app(graph: Any = None,
+               cache: Optional[AnswerCache] = None,
+               max_concurrency: Optional[int] = None,
+               max_queue: Optional[int] = None) -> web.Application:
+    """
+    Build the HTTP application around a single compiled graph.
+
+    Args:
+        graph (Any, optional): The compiled graph; the shared one from
+            the registry by default.
+        cache (AnswerCache, optional): The answer cache; the shared one
+            by default.
+        max_concurrency (int, optional): Graph runs executed at once.
+        max_queue (int, optional): Runs allowed to wait for a slot.
+
+    Returns:
+        web.Application: The application, serving `/ask`, `/health`
+        and `/metrics`.
+    """
+    settings = get_settings()
+    app = web.Application()
+    app[SERVICE] = AskService(
+        graph if graph is not None else get_graph(),
+        cache if cache is not None else get_answer_cache(),
+        max_concurrency or settings.server_max_concurrency,
+        settings.server_max_queue if max_queue is None else max_queue,
+    )
+    app.router.add_get("/ask", handle_ask)
+    app.router.add_post("/ask", handle_ask)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main() -> None:
+    """
+    Run the service: `python -m backend.server --port 8080`.
+    """
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        description="Serve ask-the-web answers over HTTP.")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Read an integer from the environment, falling back to a default.
+    """
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """
+    Read a float from the environment, falling back to a default.
+    """
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean flag (1/0, true/false, yes/no) from the environment.
+    """
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Tunable runtime settings, read once from environment variables.
+
+    Attributes:
+        user_agent (str): User-Agent header sent when fetching pages.
+        fetch_max_connections (int): Size of the shared connection pool.
+        fetch_max_per_host (int): Concurrent connections allowed per host.
+        fetch_connect_timeout (float): Seconds allowed to open a connection.
+        fetch_read_timeout (float): Seconds allowed between body reads.
+        fetch_total_timeout (float): Upper bound in seconds for one fetch.
+        dns_cache_ttl (int): Seconds a resolved hostname is reused.
+        cache_dir (str): Directory holding the on-disk caches.
+        page_cache_enabled (bool): Whether pages and chunks are cached.
+        page_cache_max_bytes (int): Size cap of the page cache.
+        page_cache_ttl (float): Seconds a cached page is served without
+            revalidation.
+        search_cache_ttl (float): Seconds a search result is reused.
+        search_rate (float): Upstream searches allowed per second; 0
+            disables pacing.
+        search_burst (int): Upstream searches allowed back to back.
+        search_max_retries (int): Retries when the search is throttled.
+        search_backoff (float): Base delay in seconds between retries.
+        context_token_budget (int): Estimated tokens of context sent to
+            the LLM after ranking.
+        search_num_results (int): Results requested from the search
+            engine per query.
+        scrape_budget (float): Seconds the scraping stage may take per
+            question before answering with the pages it has.
+        scrape_target_pages (int): Pages to collect before stopping.
+        scrape_overfetch (float): Candidate links tried per target page.
+        scrape_hedge_after (float): Seconds before a slow page gets a
+            duplicate request; 0 disables hedging.
+        page_max_chars (int): Characters of text kept per page; the
+            download stops once this much text has been extracted.
+        page_max_bytes (int): Hard cap on bytes downloaded per page.
+        parse_workers (int): Processes that parse and chunk pages; 0
+            (the default) streams pages through the text extractor and
+            parses them in threads instead.
+        parse_timeout (float): Seconds a page may take to parse before
+            it is dropped.
+        citation_pass_threshold (float): Overlap score at which a
+            citation is accepted by the local checker.
+        citation_fail_threshold (float): Overlap score below which a
+            citation is rejected.
+        citation_llm_fallback (bool): Ask the LLM to verify when the
+            local checker is unsure.
+        dedup_max_distance (int): SimHash bit distance under which two
+            chunks count as duplicates; -1 disables dedup.
+        domain_failure_threshold (int): Failures in a row after which a
+            domain is skipped for a while; 0 never skips.
+        domain_cooldown (float): Seconds a failing domain is first
+            skipped; doubled each time it fails again.
+        domain_max_cooldown (float): Upper bound of that cool-down.
+        corpus_enabled (bool): Whether scraped pages are indexed
+            locally and searched before the web.
+        corpus_max_age (float): Seconds an indexed page is used before
+            the web is searched again.
+        corpus_min_pages (int): Matching fresh pages needed to skip
+            web search.
+        corpus_min_coverage (float): Share of the question's terms a
+            page must contain to count as a match.
+        corpus_max_pages (int): Pages kept in the local index.
+        pipeline_search (bool): Search and scrape in one stage that
+            starts each download as soon as its link is known.
+        warmup_hosts (int): Sites connected to while searching in the
+            pipelined stage; 0 disables warm-up.
+        llm_model (str): The model answers are generated with; `fake`
+            (or `fake:<first token s>:<token s>`) runs offline.
+        llm_fast_model (str): The cheaper model citations are verified
+            with and short questions are answered with; empty uses
+            `llm_model` for everything.
+        llm_short_question_chars (int): Questions up to this long go to
+            the fast model; 0 sends every question to `llm_model`.
+        llm_timeout (float): Seconds one LLM call may take in total.
+        llm_hedge_quantile (float): Latency quantile, of a model's
+            recent calls, after which a duplicate request is sent; 0
+            disables hedging.
+        llm_max_concurrency (int): LLM requests in flight at once per
+            provider.
+        answer_cache_enabled (bool): Whether answers are cached.
+        answer_cache_ttl (float): Seconds a cached answer is reused.
+        answer_cache_max_bytes (int): Size cap of the answer cache.
+        answer_cache_check_sources (bool): Invalidate a cached answer
+            when one of its source pages has changed.
+        server_host (str): Interface the HTTP service listens on.
+        server_port (int): Port the HTTP service listens on.
+        server_max_concurrency (int): Graph runs the HTTP service
+            executes at once.
+        server_max_queue (int): Requests allowed to wait for a run
+            slot before new ones are rejected with 503.
+        trace_path (str): JSONL file each finished request is traced
+            to; empty disables tracing.
+    """
+    user_agent: str
+    fetch_max_connections: int
+    fetch_max_per_host: int
+    fetch_connect_timeout: float
+    fetch_read_timeout: float
+    fetch_total_timeout: float
+    dns_cache_ttl: int
+    cache_dir: str
+    page_cache_enabled: bool
+    page_cache_max_bytes: int
+    page_cache_ttl: float
+    search_cache_ttl: float
+    search_rate: float
+    search_burst: int
+    search_max_retries: int
+    search_backoff: float
+    context_token_budget: int
+    search_num_results: int
+    scrape_budget: float
+    scrape_target_pages: int
+    scrape_overfetch: float
+    scrape_hedge_after: float
+    page_max_chars: int
+    page_max_bytes: int
+    parse_workers: int
+    parse_timeout: float
+    citation_pass_threshold: float
+    citation_fail_threshold: float
+    citation_llm_fallback: bool
+    dedup_max_distance: int
+    domain_failure_threshold: int
+    domain_cooldown: float
+    domain_max_cooldown: float
+    corpus_enabled: bool
+    corpus_max_age: float
+    corpus_min_pages: int
+    corpus_min_coverage: float
+    corpus_max_pages: int
+    pipeline_search: bool
+    warmup_hosts: int
+    llm_model: str
+    llm_fast_model: str
+    llm_short_question_chars: int
+    llm_timeout: float
+    llm_hedge_quantile: float
+    llm_max_concurrency: int
+    answer_cache_enabled: bool
+    answer_cache_ttl: float
+    answer_cache_max_bytes: int
+    answer_cache_check_sources: bool
+    server_host: str
+    server_port: int
+    server_max_concurrency: int
+    server_max_queue: int
+    trace_path: str
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Build settings from `ASK_WEB_*` environment variables.
+
+        Returns:
+            Settings: The settings with defaults for unset variables.
+        """
+        return cls(
+            user_agent=os.getenv("USER_AGENT") or "ask-the-web",
+            fetch_max_connections=_env_int(
+                "ASK_WEB_FETCH_MAX_CONNECTIONS", 100),
+            fetch_max_per_host=_env_int("ASK_WEB_FETCH_MAX_PER_HOST", 4),
+            fetch_connect_timeout=_env_float(
+                "ASK_WEB_FETCH_CONNECT_TIMEOUT", 5.0),
+            fetch_read_timeout=_env_float("ASK_WEB_FETCH_READ_TIMEOUT", 10.0),
+            fetch_total_timeout=_env_float(
+                "ASK_WEB_FETCH_TOTAL_TIMEOUT", 20.0),
+            dns_cache_ttl=_env_int("ASK_WEB_DNS_CACHE_TTL", 300),
+            cache_dir=os.getenv("ASK_WEB_CACHE_DIR") or os.path.join(
+                os.path.expanduser("~"), ".cache", "ask_the_web"),
+            page_cache_enabled=_env_bool("ASK_WEB_PAGE_CACHE", True),
+            page_cache_max_bytes=_env_int(
+                "ASK_WEB_PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+            page_cache_ttl=_env_float("ASK_WEB_PAGE_CACHE_TTL", 3600.0),
+            search_cache_ttl=_env_float("ASK_WEB_SEARCH_CACHE_TTL", 900.0),
+            search_rate=_env_float("ASK_WEB_SEARCH_RATE", 1.0),
+            search_burst=_env_int("ASK_WEB_SEARCH_BURST", 3),
+            search_max_retries=_env_int("ASK_WEB_SEARCH_MAX_RETRIES", 4),
+            search_backoff=_env_float("ASK_WEB_SEARCH_BACKOFF", 1.0),
+            context_token_budget=_env_int(
+                "ASK_WEB_CONTEXT_TOKEN_BUDGET", 2000),
+            search_num_results=_env_int("ASK_WEB_SEARCH_NUM_RESULTS", 10),
+            scrape_budget=_env_float("ASK_WEB_SCRAPE_BUDGET", 8.0),
+            scrape_target_pages=_env_int("ASK_WEB_SCRAPE_TARGET_PAGES", 3),
+            scrape_overfetch=_env_float("ASK_WEB_SCRAPE_OVERFETCH", 2.0),
+            scrape_hedge_after=_env_float("ASK_WEB_SCRAPE_HEDGE_AFTER", 3.0),
+            page_max_chars=_env_int("ASK_WEB_PAGE_MAX_CHARS", 8000),
+            page_max_bytes=_env_int(
+                "ASK_WEB_PAGE_MAX_BYTES", 2 * 1024 * 1024),
+            parse_workers=_env_int("ASK_WEB_PARSE_WORKERS", 0),
+            parse_timeout=_env_float("ASK_WEB_PARSE_TIMEOUT", 5.0),
+            citation_pass_threshold=_env_float(
+                "ASK_WEB_CITATION_PASS_THRESHOLD", 0.5),
+            citation_fail_threshold=_env_float(
+                "ASK_WEB_CITATION_FAIL_THRESHOLD", 0.25),
+            citation_llm_fallback=_env_bool(
+                "ASK_WEB_CITATION_LLM_FALLBACK", True),
+            dedup_max_distance=_env_int("ASK_WEB_DEDUP_MAX_DISTANCE", 6),
+            domain_failure_threshold=_env_int(
+                "ASK_WEB_DOMAIN_FAILURE_THRESHOLD", 3),
+            domain_cooldown=_env_float("ASK_WEB_DOMAIN_COOLDOWN", 60.0),
+            domain_max_cooldown=_env_float(
+                "ASK_WEB_DOMAIN_MAX_COOLDOWN", 3600.0),
+            corpus_enabled=_env_bool("ASK_WEB_CORPUS", True),
+            corpus_max_age=_env_float("ASK_WEB_CORPUS_MAX_AGE", 86400.0),
+            corpus_min_pages=_env_int("ASK_WEB_CORPUS_MIN_PAGES", 3),
+            corpus_min_coverage=_env_float(
+                "ASK_WEB_CORPUS_MIN_COVERAGE", 0.8),
+            corpus_max_pages=_env_int("ASK_WEB_CORPUS_MAX_PAGES", 50000),
+            pipeline_search=_env_bool("ASK_WEB_PIPELINE", False),
+            warmup_hosts=_env_int("ASK_WEB_WARMUP_HOSTS", 4),
+            llm_model=os.getenv("ASK_WEB_LLM_MODEL") or "gemini-2.0-flash",
+            llm_fast_model=os.getenv(
+                "ASK_WEB_LLM_FAST_MODEL", "gemini-2.0-flash-lite"),
+            llm_short_question_chars=_env_int(
+                "ASK_WEB_LLM_SHORT_QUESTION_CHARS", 40),
+            llm_timeout=_env_float("ASK_WEB_LLM_TIMEOUT", 60.0),
+            llm_hedge_quantile=_env_float("ASK_WEB_LLM_HEDGE_QUANTILE", 0.95),
+            llm_max_concurrency=_env_int("ASK_WEB_LLM_MAX_CONCURRENCY", 16),
+            answer_cache_enabled=_env_bool("ASK_WEB_ANSWER_CACHE", True),
+            answer_cache_ttl=_env_float("ASK_WEB_ANSWER_CACHE_TTL", 21600.0),
+            answer_cache_max_bytes=_env_int(
+                "ASK_WEB_ANSWER_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+            answer_cache_check_sources=_env_bool(
+                "ASK_WEB_ANSWER_CACHE_CHECK_SOURCES", True),
+            server_host=os.getenv("ASK_WEB_SERVER_HOST", "0.0.0.0"),
+            server_port=_env_int("ASK_WEB_SERVER_PORT", 8080),
+            server_max_concurrency=_env_int(
+                "ASK_WEB_SERVER_MAX_CONCURRENCY", 32),
+            server_max_queue=_env_int("ASK_WEB_SERVER_MAX_QUEUE", 128),
+            trace_path=os.getenv("ASK_WEB_TRACE_PATH", ""),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Return the process-wide settings, read from the environment once.
+
+    Returns:
+        Settings: The shared settings instance.
+    """
+    return Settings.from_env()
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from langchain_core.messages import AIMessage
+from .answer_cache import AnswerCache, CachedAnswer
+from .instrumentation import record_trace
+
+
+def cached_state(cached: CachedAnswer) -> Dict[str, Any]:
+    """
+    Rebuild the final graph state of a cached answer.
+
+    Args:
+        cached (CachedAnswer): The cached answer.
+
+    Returns:
+        Dict[str, Any]: A state shaped like the graph's final output.
+    """
+    return {
+        "question": cached.question,
+        "answer": AIMessage(content=cached.answer,
+                            usage_metadata=cached.usage_metadata or None),
+        "sources": cached.sources,
+        "status": cached.status,
+        "citation_report": cached.citation_report,
+        "metrics": {"answer_cache": {"hit": True}},
+    }
+
+
+def answer_payload(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce the final graph state to the JSON sent to clients.
+
+    Args:
+        state (Dict[str, Any]): The final graph state.
+
+    Returns:
+        Dict[str, Any]: The answer, usage, citation status, sources
+        and per-node metrics.
+    """
+    answer = state.get("answer")
+    return {
+        "answer": answer.content if answer is not None else "",
+        "usage_metadata": dict(getattr(answer, "usage_metadata", None)
+                               or {}),
+        "status": state.get("status"),
+        "citation_report": state.get("citation_report", []),
+        "sources": state.get("sources", []),
+        "metrics": state.get("metrics", {}),
+    }
+
+
+def cached_events(cached: CachedAnswer,
+                  start: float) -> List[Dict[str, Any]]:
+    """
+    Build the stream events replaying a cached answer.
+
+    Args:
+        cached (CachedAnswer): The cached answer.
+        start (float): When the request started, from `perf_counter`.
+
+    Returns:
+        List[Dict[str, Any]]: A token, the final state and `done`.
+    """
+    elapsed = time.perf_counter() - start
+    return [
+        {"event": "token", "data": cached.answer},
+        {"event": "values", "data": cached_state(cached)},
+        {"event": "done",
+         "data": {"ttft": elapsed, "cached": True, "latency": elapsed}},
+    ]
+
+
+def stream_events(graph: Any, question: str,
+                  cache: Optional[AnswerCache] = None
+                  ) -> Iterator[Dict[str, Any]]:
+    """
+    Run the graph for a question and yield its output incrementally.
+
+    Events are dicts with an `event` key:
+        - `token`: `data` is the next piece of answer text.
+        - `values`: `data` is the full graph state after a step.
+        - `done`: `data` holds `ttft` (seconds until the first answer
+          token, or None), `latency` (total seconds) and `cached`.
+
+    When an answer cache is given and holds the question, the cached
+    answer is yielded as a single token and final state without
+    running the graph; otherwise the final state is stored in it.
+    Every finished request is recorded with `record_trace`.
+
+    Args:
+        graph (Any): The compiled graph.
+        question (str): The user's question.
+        cache (AnswerCache, optional): The shared answer cache.
+
+    Yields:
+        Dict[str, Any]: The stream events, in order.
+    """
+    start = time.perf_counter()
+    cached = cache.get(question) if cache is not None else None
+    if cached is not None:
+        events = cached_events(cached, start)
+        record_trace(question, events[1]["data"], events[2]["data"])
+        yield from events
+        return
+
+    ttft = None
+    state: Dict[str, Any] = {}
+    for mode, chunk in graph.stream({"question": question},
+                                    stream_mode=["values", "custom"]):
+        if mode == "custom":
+            if "token" not in chunk:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            yield {"event": "token", "data": chunk["token"]}
+        else:
+            state = chunk
+            yield {"event": "values", "data": chunk}
+    if cache is not None:
+        cache.put(question, state)
+    done = {"ttft": ttft, "cached": False,
+            "latency": time.perf_counter() - start}
+    record_trace(question, state, done)
+    yield {"event": "done", "data": done}
+
+
+async def astream_events(graph: Any, question: str,
+                         cache: Optional[AnswerCache] = None
+                         ) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async version of `stream_events`, driving the graph with `astream`
+    so many questions can share one event loop. The answer cache and
+    the trace file are read and written in worker threads.
+
+    Args:
+        graph (Any): The compiled graph.
+        question (str): The user's question.
+        cache (AnswerCache, optional): The shared answer cache.
+
+    Yields:
+        Dict[str, Any]: The stream events, in order.
+    """
+    start = time.perf_counter()
+    cached = (await asyncio.to_thread(cache.get, question)
+              if cache is not None else None)
+    if cached is not None:
+        events = cached_events(cached, start)
+        await asyncio.to_thread(
+            record_trace, question, events[1]["data"], events[2]["data"])
+        for event in events:
+            yield event
+        return
+
+    ttft = None
+    state: Dict[str, Any] = {}
+    async for mode, chunk in graph.astream(
+            {"question": question}, stream_mode=["values", "custom"]):
+        if mode == "custom":
+            if "token" not in chunk:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            yield {"event": "token", "data": chunk["token"]}
+        else:
+            state = chunk
+            yield {"event": "values", "data": chunk}
+    if cache is not None:
+        await asyncio.to_thread(cache.put, question, state)
+    done = {"ttft": ttft, "cached": False,
+            "latency": time.perf_counter() - start}
+    await asyncio.to_thread(record_trace, question, state, done)
+    yield {"event": "done", "data": done}
@@ -0,0 +1,38 @@
+import pytest
+from ..answer_cache import get_answer_cache
+from ..corpus import get_corpus
+from ..domain_health import get_domain_health
+from ..llm import get_provider_limit
+from ..page_cache import get_page_cache
+from ..parse_pool import close_parse_pool
+from ..search import get_search_service
+from ..settings import get_settings
+from ..warmup import get_host_hints
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path: str, monkeypatch: pytest.MonkeyPatch):
+    """
+    Point every on-disk cache at a temporary directory for each test,
+    and parse pages in threads unless a test starts a parse pool.
+    """
+    monkeypatch.setenv("ASK_WEB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("ASK_WEB_PARSE_WORKERS", "0")
+    get_settings.cache_clear()
+    get_page_cache.cache_clear()
+    get_answer_cache.cache_clear()
+    get_domain_health.cache_clear()
+    get_corpus.cache_clear()
+    get_host_hints.cache_clear()
+    get_provider_limit.cache_clear()
+    get_search_service.cache_clear()
+    yield
+    close_parse_pool()
+    get_settings.cache_clear()
+    get_page_cache.cache_clear()
+    get_answer_cache.cache_clear()
+    get_domain_health.cache_clear()
+    get_corpus.cache_clear()
+    get_host_hints.cache_clear()
+    get_provider_limit.cache_clear()
+    get_search_service.cache_clear()
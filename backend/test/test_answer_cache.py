@@ -0,0 +1,109 @@
+import asyncio
+import os
+import threading
+import pytest
+from langchain_core.messages import AIMessage
+from .. import streaming
+from ..answer_cache import AnswerCache
+from ..disk_cache import DiskCache
+from ..fetcher import FetchResult
+from ..instrumentation import record_trace
+from ..page_cache import PageCache
+from ..streaming import astream_events, stream_events
+
+URL = "https://a.example/page"
+STATE = {
+    "answer": AIMessage(content="Paris [1].", usage_metadata={
+        "input_tokens": 10, "output_tokens": 2, "total_tokens": 12}),
+    "sources": [{"number": 1, "title": "A", "url": URL}],
+    "status": "PASS",
+    "citation_report": [],
+}
+
+
+def make_cache(tmp_path: str) -> tuple:
+    pages = PageCache(DiskCache(os.path.join(tmp_path, "p.sqlite3"),
+                                1 << 20), ttl=60)
+    pages.put_page(URL, FetchResult(URL, 200, body=b"<p>Paris</p>"))
+    store = DiskCache(os.path.join(tmp_path, "a.sqlite3"), 1 << 20)
+    return AnswerCache(store, ttl=60, pages=pages), pages
+
+
+def test_answer_cache_hits_on_normalized_question(tmp_path: str) -> None:
+    """
+    Test that a stored answer is found under a differently spelled
+    question, and that failed answers are not cached.
+    """
+    cache, _ = make_cache(tmp_path)
+    cache.put("What is the capital of France?", STATE)
+    cached = cache.get("  what is the capital of france ")
+    assert cached.answer == "Paris [1]."
+    assert cached.usage_metadata["total_tokens"] == 12
+    assert cached.status == "PASS"
+
+    cache.put("Bad question", {**STATE, "status": "FAIL"})
+    assert cache.get("Bad question") is None
+
+
+def test_answer_cache_invalidates_on_changed_source(tmp_path: str) -> None:
+    """
+    Test that an answer is dropped once one of its pages changes.
+    """
+    cache, pages = make_cache(tmp_path)
+    cache.put("capital of france", STATE)
+    assert cache.get("capital of france") is not None
+
+    assert pages.store.stats.hits == 0
+
+    pages.put_page(URL, FetchResult(URL, 200, body=b"<p>Lyon</p>"))
+    assert cache.get("capital of france") is None
+
+
+def test_stream_events_serves_hits_without_running_graph(
+        tmp_path: str) -> None:
+    """
+    Test that a cached answer streams back without touching the graph.
+    """
+    cache, _ = make_cache(tmp_path)
+    cache.put("capital of france", STATE)
+
+    class Graph:
+        def stream(self, *args, **kwargs):
+            raise AssertionError("graph should not run")
+
+    events = list(stream_events(Graph(), "Capital of France?", cache))
+    assert [e["event"] for e in events] == ["token", "values", "done"]
+    assert events[0]["data"] == "Paris [1]."
+    assert events[1]["data"]["answer"].usage_metadata["total_tokens"] == 12
+    assert events[2]["data"]["cached"] is True
+
+
+def test_astream_events_uses_cache_off_the_event_loop(
+        tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that the async stream reads and writes the answer cache, and
+    records its trace, in worker threads rather than on the event loop.
+    """
+    cache, _ = make_cache(tmp_path)
+    threads = []
+
+    class Graph:
+        async def astream(self, *args, **kwargs):
+            yield "values", STATE
+
+    def spy(method):
+        def call(*args):
+            threads.append(threading.current_thread())
+            return method(*args)
+        return call
+
+    cache.get, cache.put = spy(cache.get), spy(cache.put)
+    monkeypatch.setattr(streaming, "record_trace", spy(record_trace))
+
+    async def collect() -> list:
+        return [e async for e in astream_events(Graph(), "capital", cache)]
+
+    asyncio.run(collect())
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+    assert cache.get("capital").answer == "Paris [1]."
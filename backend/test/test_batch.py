@@ -0,0 +1,109 @@
+import asyncio
+import json
+from unittest.mock import patch
+from langchain.schema import Document
+from langchain_core.messages import AIMessage
+from ..batch import run_batch
+from ..load_scrape_website import ascrape_hedge, ascrape_link
+from ..scrape_policy import ScrapePolicy, gather_pages
+
+
+class FakeGraph:
+    """
+    A graph stand-in reporting node updates and counting runs.
+    """
+
+    def __init__(self) -> None:
+        self.questions = []
+
+    async def astream(self, inputs: dict, stream_mode: list):
+        self.questions.append(inputs["question"])
+        for node in ("get_links", "scrape_web_data", "generate_answer"):
+            await asyncio.sleep(0.01)
+            yield "updates", {node: {}}
+        if "boom" in inputs["question"]:
+            raise RuntimeError("LLM unavailable")
+        yield "values", {"answer": AIMessage(content="42 [1]."),
+                         "status": "PASS"}
+
+
+def write_questions(path, rows: list) -> None:
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+
+def test_batch_dedupes_questions_and_resumes(tmp_path) -> None:
+    """
+    Test that repeated questions are answered once, failures are
+    recorded, and a rerun only retries what is missing, replacing the
+    failed rows.
+    """
+    questions = tmp_path / "questions.jsonl"
+    output = tmp_path / "answers.jsonl"
+    write_questions(questions, [
+        {"id": "a", "question": "What is the answer?"},
+        {"id": "b", "question": "what is the answer"},
+        {"id": "c", "question": "boom"},
+    ])
+    graph = FakeGraph()
+    stats = asyncio.run(run_batch(str(questions), str(output), 2, graph))
+
+    rows = {row["id"]: row for row in map(
+        json.loads, output.read_text().splitlines())}
+    assert rows["a"]["answer"] == rows["b"]["answer"] == "42 [1]."
+    assert rows["c"]["error"] == "LLM unavailable"
+    assert len(graph.questions) == 2
+    assert (stats.answered, stats.failed, stats.unique) == (2, 1, 2)
+    assert stats.stage_runs["get_links"] == 1
+
+    graph = FakeGraph()
+    stats = asyncio.run(run_batch(str(questions), str(output), 2, graph))
+    assert graph.questions == ["boom"]
+    assert stats.skipped == 2
+    ids = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+    assert sorted(ids) == ["a", "b", "c"]
+
+
+def test_concurrent_scrapes_of_one_url_share_a_download() -> None:
+    """
+    Test that questions scraping the same page at once download it
+    only once.
+    """
+    calls = []
+
+    async def scrape(link: str) -> list:
+        calls.append(link)
+        await asyncio.sleep(0.01)
+        return [Document(page_content="text", metadata={"source": link})]
+
+    async def main() -> list:
+        return await asyncio.gather(
+            ascrape_link("https://a.example/page"),
+            ascrape_link("https://A.example/page#top"),
+            ascrape_link("https://b.example/"))
+
+    with patch("backend.load_scrape_website._ascrape_once", scrape):
+        results = asyncio.run(main())
+    assert len(calls) == 2
+    assert results[0] == results[1]
+
+
+def test_hedged_scrape_sends_a_second_download() -> None:
+    """
+    Test that the hedge of a slow page is not merged into the download
+    it is meant to race.
+    """
+    calls = []
+
+    async def scrape(link: str) -> list:
+        calls.append(link)
+        await asyncio.sleep(5 if len(calls) == 1 else 0.01)
+        return [Document(page_content="text", metadata={"source": link})]
+
+    policy = ScrapePolicy(budget=2, target_pages=1, overfetch=1,
+                          hedge_after=0.05)
+    with patch("backend.load_scrape_website._ascrape_once", scrape):
+        pages, stats = asyncio.run(gather_pages(
+            ["https://a.example/slow"], ascrape_link, policy,
+            hedge=ascrape_hedge))
+    assert len(calls) == 2
+    assert stats["hedged"] == 1 and len(pages) == 1
@@ -0,0 +1,46 @@
+import pytest
+from benchmarks.fakes import (FakeChatModel, FakeSearch, FixtureServer,
+                              SearchClient, make_page)
+from ..citations import check_citations
+from ..context_format import format_context
+from ..extract import html_to_document
+from ..load_scrape_website import split_content
+from ..search import is_rate_limited
+
+
+def test_fake_llm_answers_with_verifiable_citations() -> None:
+    """
+    Test that the benchmark fakes drive the real pipeline code paths:
+    fixture pages split into chunks and the fake answer cites them
+    well enough to pass the local citation check.
+    """
+    links = [f"http://fixture/page/{i}" for i in range(3)]
+    assert make_page(1, 20) == make_page(1, 20)
+    chunks = split_content([html_to_document(make_page(0, 20), links[0])])
+    assert len(chunks) > 10
+
+    context = format_context(chunks[:3])
+    answer = FakeChatModel().invoke(
+        f"Question: what?\nContext:\n{context.text}")
+    status, _ = check_citations(answer.content, chunks, context.sources)
+    assert status == "PASS"
+    assert answer.usage_metadata["total_tokens"] > 0
+
+    results = FakeSearch(links, per_query=2)("What?")
+    assert len(results) == 2 and results[0]["link"] in links
+
+
+def test_stub_server_answers_searches_over_http() -> None:
+    """
+    Test that the stub search endpoint returns the fake's links and
+    that its 429s read as rate limits to the search service.
+    """
+    with FixtureServer([make_page(0, 1)]) as server:
+        links = [server.url(0)]
+        client = SearchClient(server.search_url)
+        server.search = FakeSearch(links, per_query=1)
+        assert client("What?") == FakeSearch(links, per_query=1)("What?")
+        server.search = FakeSearch(links, throttle_rate=1.0)
+        with pytest.raises(RuntimeError) as error:
+            client("What?")
+    assert is_rate_limited(error.value)
@@ -0,0 +1,68 @@
+from operator import add
+from typing import Annotated
+from langchain.schema import Document
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, StateGraph
+from typing_extensions import TypedDict
+from ..chunk_store import Chunk, ChunkList
+
+
+def make_pages() -> tuple:
+    """
+    Two pages of chunks with overlapping spans.
+    """
+    a = ChunkList.from_spans("alpha beta gamma", {"source": "a"},
+                             [(0, 10), (6, 16)])
+    b = ChunkList.from_spans("delta epsilon", {"source": "b"}, [(0, 13)])
+    return a, b
+
+
+def test_chunks_read_like_documents_and_share_page_text() -> None:
+    """
+    Test that chunks are views into one text per page, that joining
+    and slicing keep sharing it, and that plain documents mix in.
+    """
+    a, b = make_pages()
+    chunks = [] + a + b + [Document(page_content="zeta",
+                                    metadata={"source": "c"})]
+    assert isinstance(chunks, ChunkList)
+    assert [c.page_content for c in chunks] == [
+        "alpha beta", "beta gamma", "delta epsilon", "zeta"]
+    assert [c.metadata["source"] for c in chunks] == ["a", "a", "b", "c"]
+    assert chunks[0].source is chunks[1].source is a.sources[0]
+
+    selected = ChunkList.from_documents([chunks[3], chunks[1]])
+    assert [c.page_content for c in selected] == ["zeta", "beta gamma"]
+    assert len(chunks[1:3].sources) == 2
+    assert chunks[2].to_document() == Document(
+        page_content="delta epsilon", metadata={"source": "b"})
+
+
+def test_chunk_list_survives_checkpoints() -> None:
+    """
+    Test that chunks accumulated by the state reducer are restored
+    from a LangGraph checkpoint.
+    """
+    class State(TypedDict):
+        context: Annotated[ChunkList, add]
+        first: Chunk
+
+    a, b = make_pages()
+    builder = StateGraph(State)
+    builder.add_node("one", lambda state: {"context": a})
+    builder.add_node("two", lambda state: {"context": b,
+                                           "first": state["context"][0]})
+    builder.add_edge(START, "one")
+    builder.add_edge("one", "two")
+    graph = builder.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "1"}}
+    graph.invoke({}, config)
+
+    # The in-memory saver stores channel values serialized.
+    context = graph.checkpointer.get(config)["channel_values"]["context"]
+    assert isinstance(context, ChunkList)
+    assert [c.page_content for c in context] == [
+        "alpha beta", "beta gamma", "delta epsilon"]
+    assert context.to_dict() == (a + b).to_dict()
+    assert graph.get_state(config).values["first"].page_content == (
+        "alpha beta")
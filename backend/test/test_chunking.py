@@ -0,0 +1,63 @@
+import random
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from benchmarks.fakes import make_page
+from ..chunking import split_offsets
+from ..clean_data import (clean_text, fix_newlines, merge_hyphenated_words,
+                          remove_multiple_newlines)
+from ..extract import html_to_document
+
+PIECES = ["ab", "c", "é", "_", "1", "-", " ", "  ", "\t", ".", "\n",
+          "\n\n", "word ", "x" * 30]
+
+
+def random_texts(count: int, seed: int = 0) -> list[str]:
+    """
+    Short random texts mixing words, hyphens, spaces and newlines.
+    """
+    rng = random.Random(seed)
+    return ["".join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+            for _ in range(count)]
+
+
+def page_text(index: int) -> str:
+    """
+    The extracted text of a benchmark fixture page.
+    """
+    page = html_to_document(make_page(index, 30), "http://fixture/")
+    return page.page_content
+
+
+def test_clean_text_matches_the_separate_passes() -> None:
+    """
+    Test that the single-pass cleaner returns exactly what the three
+    regex passes return, including chains of hyphenated line breaks.
+    """
+    texts = random_texts(5000) + [page_text(i) for i in range(3)] + [
+        "a-\nb-\nc", "ab-\ncd-\nef", "-\nx", "x-\n\ny", "\n", "\n\n", ""]
+    for text in texts:
+        expected = remove_multiple_newlines(
+            fix_newlines(merge_hyphenated_words(text)))
+        assert clean_text(text) == expected
+
+
+def test_split_offsets_match_the_langchain_splitter() -> None:
+    """
+    Test that the offset splitter yields the same chunks as
+    `RecursiveCharacterTextSplitter`, for the pipeline's parameters on
+    real pages and for small sizes that force every separator level.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500,
+                                              chunk_overlap=50)
+    for index in range(3):
+        text = clean_text(page_text(index))
+        spans = split_offsets(text, 500, 50)
+        assert [text[a:b] for a, b in spans] == splitter.split_text(text)
+
+    rng = random.Random(1)
+    for text in random_texts(2000, seed=2):
+        size = rng.randint(1, 40)
+        overlap = rng.randint(0, size)
+        splitter = RecursiveCharacterTextSplitter(chunk_size=size,
+                                                  chunk_overlap=overlap)
+        spans = split_offsets(text, size, overlap)
+        assert [text[a:b] for a, b in spans] == splitter.split_text(text)
@@ -0,0 +1,103 @@
+from unittest.mock import MagicMock, patch
+from langchain.schema import Document
+from langchain_core.messages import AIMessage
+from ..citations import check_citations, cited_sentences, split_answer
+from ..nodes import verify_citations
+
+CONTEXT = [
+    Document(page_content="LangGraph is a library for building stateful "
+             "multi-actor applications with LLMs.",
+             metadata={"source": "https://langchain.dev/langgraph"}),
+    Document(page_content="Bananas are rich in potassium.",
+             metadata={"source": "https://fruit.example/"}),
+]
+
+ANSWER = """LangGraph is a library for building stateful applications \
+with LLMs [1].
+Bananas were invented by LangGraph engineers in 2020. [2]
+
+Sources:
+[1] LangGraph, https://langchain.dev/langgraph
+[2] Fruit facts, https://fruit.example
+"""
+
+
+def test_split_answer_reads_sources_section() -> None:
+    """
+    Test that the Sources section is separated and parsed into URLs.
+    """
+    body, urls = split_answer(ANSWER)
+    assert "Sources" not in body
+    assert urls == {1: "https://langchain.dev/langgraph",
+                    2: "https://fruit.example"}
+
+
+def test_cited_sentences_attach_trailing_markers() -> None:
+    """
+    Test that markers after the full stop cite the preceding sentence.
+    """
+    body, _ = split_answer(ANSWER)
+    sentences = cited_sentences(body)
+    assert sentences[0][1] == [1]
+    assert sentences[1] == (
+        "Bananas were invented by LangGraph engineers in 2020.", [2])
+
+
+def test_check_citations_scores_support() -> None:
+    """
+    Test that a supported claim passes and an unsupported one fails.
+    """
+    status, checks = check_citations(ANSWER, CONTEXT)
+    assert [c.verdict for c in checks] == ["PASS", "FAIL"]
+    assert checks[0].score > checks[1].score
+    assert status == "FAIL"
+
+
+def test_check_citations_falls_back_to_prompt_numbering() -> None:
+    """
+    Test that numbers resolve through the prompt's sources when the
+    answer has no Sources section.
+    """
+    answer = "LangGraph builds stateful multi-actor applications [1]."
+    sources = [{"number": 1, "title": "LG",
+                "url": "https://langchain.dev/langgraph"}]
+    status, checks = check_citations(answer, CONTEXT, sources)
+    assert status == "PASS"
+    assert checks[0].url == "https://langchain.dev/langgraph"
+
+
+def test_check_citations_without_citations() -> None:
+    """
+    Test that an answer without citations reports 'None'.
+    """
+    status, checks = check_citations("I don't know.", CONTEXT)
+    assert status == "None" and checks == []
+
+
+@patch("backend.nodes.get_llm")
+def test_verify_citations_only_asks_llm_when_unsure(
+        mock_get_llm: MagicMock) -> None:
+    """
+    Test that confident local verdicts skip the LLM round-trip and
+    unsure ones fall back to it.
+    """
+    verifier = mock_get_llm.return_value.with_structured_output.return_value
+    verifier.invoke.return_value = {
+        "raw": AIMessage(content="", usage_metadata={
+            "input_tokens": 40, "output_tokens": 3, "total_tokens": 43}),
+        "parsed": {"status": "PASS"}}
+
+    state = {"answer": AIMessage(content=ANSWER), "context": CONTEXT}
+    result = verify_citations(state)
+    assert result["status"] == "FAIL"
+    assert len(result["citation_report"]) == 2
+    verifier.invoke.assert_not_called()
+
+    unsure = AIMessage(content="Bananas are rich in iron and zinc [1].\n\n"
+                       "Sources:\n[1] Fruit, https://fruit.example/")
+    result = verify_citations({"answer": unsure, "context": CONTEXT})
+    assert result["status"] == "PASS"
+    assert result["metrics"]["verify_citations"]["llm_fallback"]
+    assert result["metrics"]["verify_citations"]["usage"][
+        "total_tokens"] == 43
+    verifier.invoke.assert_called_once()
@@ -0,0 +1,42 @@
+from langchain.schema import Document
+from ..context_format import format_context
+from ..ranking import estimate_tokens
+
+
+def test_format_context_groups_chunks_by_source() -> None:
+    """
+    Test that each source header appears once, numbered from 1 in
+    order of first appearance, followed by its chunks.
+    """
+    a = {"source": "https://a.example", "title": " Page\nA ",
+         "description": "long description", "language": "en"}
+    b = {"source": "https://b.example", "title": "Page B"}
+    docs = [Document(page_content="first a", metadata=a),
+            Document(page_content="only b", metadata=b),
+            Document(page_content="second a", metadata=a)]
+
+    context = format_context(docs)
+
+    assert context.text == (
+        "[1] Page A, https://a.example\nfirst a\nsecond a\n\n"
+        "[2] Page B, https://b.example\nonly b")
+    assert [s["number"] for s in context.sources] == [1, 2]
+    assert context.sources[1]["url"] == "https://b.example"
+    assert "description" not in context.text
+    assert context.tokens == estimate_tokens(context.text)
+
+
+def test_format_context_handles_missing_title() -> None:
+    """
+    Test that a source without a title still gets a header.
+    """
+    docs = [Document(page_content="text", metadata={"source": "u"})]
+    assert format_context(docs).text.startswith("[1] Untitled, u\n")
+
+
+def test_format_context_empty() -> None:
+    """
+    Test that no chunks produce empty context.
+    """
+    context = format_context([])
+    assert context.text == "" and context.sources == []
@@ -0,0 +1,116 @@
+import pytest
+from ..chunk_store import ChunkList
+from ..corpus import LocalCorpus, get_corpus, window_coverage
+from ..load_scrape_website import chunking_key
+from ..nodes import get_links, route_links
+
+PAGES = {
+    "https://a.com/rust": "Rust ownership rules keep memory safe. "
+                          "The borrow checker enforces them.",
+    "https://b.com/rust": "Every value has one owner. Ownership is how "
+                          "Rust keeps memory safe.",
+    "https://c.com/rust": "No garbage collector. Memory stays safe thanks "
+                          "to Rust ownership.",
+    "https://d.com/cake": "Bake the cake at 180 degrees. Wait 40 minutes.",
+}
+
+
+def page_chunks(link: str) -> ChunkList:
+    """
+    Two chunks per page, split after the first sentence.
+    """
+    text = PAGES[link]
+    middle = text.index(". ") + 2
+    return ChunkList.from_spans(text, {"source": link, "title": link},
+                                [(0, middle), (middle, len(text))])
+
+
+def make_corpus(tmp_path, **kwargs) -> LocalCorpus:
+    options = {"max_age": 3600, "min_pages": 2, "min_coverage": 0.6,
+               "max_pages": 100, **kwargs}
+    corpus = LocalCorpus(str(tmp_path / "corpus.sqlite3"), **options)
+    for link in PAGES:
+        corpus.add_page(link, page_chunks(link), "k1")
+    return corpus
+
+
+def test_lookup_returns_fresh_covering_pages(tmp_path) -> None:
+    """
+    Test that pages covering the question come back with all their
+    chunks, and that unrelated, stale or differently chunked pages
+    do not.
+    """
+    corpus = make_corpus(tmp_path)
+    hits = corpus.lookup("How does Rust ownership keep memory safe?", "k1")
+    assert sorted(hit.link for hit in hits) == [
+        "https://a.com/rust", "https://b.com/rust", "https://c.com/rust"]
+    hit = next(hit for hit in hits if hit.link == "https://a.com/rust")
+    assert [c.page_content for c in hit.chunks] == [
+        c.page_content for c in page_chunks("https://a.com/rust")]
+    assert hit.title == "https://a.com/rust"
+
+    assert corpus.lookup("cake baking temperature", "k1") is None
+    assert corpus.lookup("Rust ownership memory", "k2") is None
+    corpus.max_age = -1
+    assert corpus.lookup("Rust ownership memory", "k1") is None
+
+
+def test_vague_or_scattered_matches_do_not_count(tmp_path) -> None:
+    """
+    Test that one-term questions and pages mentioning the question's
+    terms far apart do not skip web search.
+    """
+    corpus = make_corpus(tmp_path, min_pages=1, min_coverage=1.0)
+    assert corpus.lookup("Rust?", "k1") is None
+    filler = " ".join(["word"] * 20)
+    text = f"Cake {filler} borrow {filler} checker"
+    corpus.add_page("https://e.com/", ChunkList.from_spans(
+        text, {"source": "e"}, [(0, len(text))]), "k1")
+    assert corpus.lookup("cake borrow checker", "k1") is None
+    assert window_coverage({"borrow", "checker", "cake"},
+                           "The borrow checker. " + filler) == 2 / 3
+
+
+def test_pages_are_replaced_and_evicted(tmp_path) -> None:
+    """
+    Test that a changed page replaces its indexed chunks and that the
+    oldest pages are dropped beyond `max_pages`.
+    """
+    corpus = make_corpus(tmp_path, max_pages=4)
+    corpus.add_page("https://d.com/cake", ChunkList.from_spans(
+        "Rust ownership memory", {"source": "d"}, [(0, 21)]), "k1")
+    assert len(corpus.search("bake cake", "k1")) == 0
+    assert len(corpus.search("rust ownership memory", "k1")) == 4
+
+    corpus.add_page("https://e.com/", page_chunks("https://a.com/rust"),
+                    "k1")
+    assert corpus.stats()["pages"] == 4
+    links = {hit.link for hit in corpus.search("rust ownership", "k1")}
+    assert "https://a.com/rust" not in links
+    assert "https://e.com/" in links
+
+
+def test_get_links_answers_from_corpus(monkeypatch) -> None:
+    """
+    Test that a covered question skips web search and scraping, and
+    that an uncovered one still searches.
+    """
+    monkeypatch.setenv("ASK_WEB_CORPUS_MIN_PAGES", "2")
+    corpus = get_corpus()
+    for link in PAGES:
+        corpus.add_page(link, page_chunks(link), chunking_key())
+
+    def search(query: str, max_results: int) -> list:
+        raise AssertionError("searched the web")
+
+    monkeypatch.setattr("backend.nodes.search_duckduckgo", search)
+    state = {"question": "Why is Rust ownership memory safe?"}
+    update = get_links(state)
+    assert len(update["links"]) == 3
+    assert len(update["context"]) == 6
+    assert update["metrics"]["corpus"]["pages"] == 3
+    assert route_links({**state, **update}) == "select_context"
+
+    with pytest.raises(AssertionError, match="searched the web"):
+        get_links({"question": "How long to bake a cake?"})
+    assert route_links({"question": "cake"}) == "scrape_web_data"
@@ -0,0 +1,52 @@
+from langchain.schema import Document
+from ..dedup import dedupe_chunks, hamming, simhash
+
+ARTICLE = ("The city council approved the new transit plan on Tuesday, "
+           "adding three bus routes and extending light rail service to "
+           "the airport by 2027, officials said in a statement. The plan "
+           "also sets aside money for protected bike lanes downtown and "
+           "a pilot program offering free fares to students during the "
+           "school year. Council members debated the cost for several "
+           "hours before voting seven to two in favour of the proposal, "
+           "which will be funded by a mix of state grants and bonds.")
+MIRROR = ARTICLE.replace("officials said", "officials announced")
+OTHER = ("Researchers found that regular exercise improves sleep quality "
+         "in older adults, according to a study published this week.")
+
+
+def test_simhash_is_close_for_near_duplicates() -> None:
+    """
+    Test that a lightly edited copy is near and unrelated text is far.
+    """
+    assert hamming(simhash(ARTICLE), simhash(MIRROR)) <= 6
+    assert hamming(simhash(ARTICLE), simhash(OTHER)) > 10
+
+
+def test_dedupe_keeps_chunk_from_strongest_source() -> None:
+    """
+    Test that the copy from the best-ranked source is kept.
+    """
+    docs = [
+        Document(page_content=MIRROR,
+                 metadata={"source": "https://mirror.example"}),
+        Document(page_content=OTHER,
+                 metadata={"source": "https://mirror.example"}),
+        Document(page_content=ARTICLE,
+                 metadata={"source": "https://original.example"}),
+    ]
+    rank = {"https://original.example": 0, "https://mirror.example": 1}
+    kept, stats = dedupe_chunks(docs, source_rank=rank)
+    assert [d.page_content for d in kept] == [OTHER, ARTICLE]
+    assert kept[1].metadata["source"] == "https://original.example"
+    assert stats["duplicates"] == 1
+    assert stats["dedup_ratio"] == 1 / 3
+
+
+def test_dedupe_without_duplicates() -> None:
+    """
+    Test that distinct chunks are all kept.
+    """
+    docs = [Document(page_content=t, metadata={})
+            for t in (ARTICLE, OTHER)]
+    kept, stats = dedupe_chunks(docs)
+    assert kept == docs and stats["dedup_ratio"] == 0
@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from aiohttp import web
+from langchain.schema import Document
+from ..domain_health import (DomainHealth, domain_of, failure_reason,
+                             get_domain_health)
+from ..fetcher import FetchError, run_sync
+from ..load_scrape_website import scrape_link
+from ..parse_pool import ParseBusy, ParseTimeout
+
+
+class Clock:
+    """
+    A settable stand-in for `time.monotonic`.
+    """
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr("backend.domain_health.time.monotonic", clock)
+    return clock
+
+
+def test_circuit_opens_after_threshold_and_backs_off(monkeypatch) -> None:
+    """
+    Test that repeated failures open the circuit, that the cool-down
+    doubles up to its cap, and that a success closes it.
+    """
+    clock = make_clock(monkeypatch)
+    health = DomainHealth(threshold=2, cooldown=10, max_cooldown=25)
+    health.record_failure("https://www.slow.com/a", "timeout")
+    assert health.status("https://slow.com/b") == "suspect"
+    health.record_failure("https://slow.com/c", "error")
+    assert health.status("https://slow.com/") == "open"
+
+    for cooldown in (10, 20, 25):
+        clock.now += cooldown - 1
+        assert health.status("https://slow.com/") == "open"
+        clock.now += 1
+        assert health.status("https://slow.com/") == "suspect"
+        health.record_failure("https://slow.com/", "error")
+        health.record_failure("https://slow.com/", "error")
+
+    health.record_success("https://slow.com/d")
+    assert health.status("https://slow.com/") == "ok"
+
+
+def test_blocks_and_captchas_open_at_once() -> None:
+    """
+    Test that a 403 or a captcha page opens the circuit without
+    waiting for the threshold, and that real content does not.
+    """
+    health = DomainHealth(threshold=5, cooldown=60)
+    health.record_failure("https://shop.com/", failure_reason(
+        FetchError("https://shop.com/: HTTP 403", status=403)))
+    assert health.status("https://shop.com/x") == "open"
+
+    captcha = [Document(page_content="Please complete the CAPTCHA to "
+                                     "continue")]
+    assert not health.check_page("https://bot.com/", captcha)
+    assert health.status("https://bot.com/") == "open"
+
+    content = [Document(page_content="Solving a captcha is a chore.")] * 5
+    assert health.check_page("https://blog.com/post", content)
+    assert not health.check_page("https://blank.com/", [])
+    assert health.status("https://blog.com/") == "ok"
+    assert health.status("https://blank.com/") == "suspect"
+
+
+def test_failure_reasons() -> None:
+    """
+    Test how scrape errors are classified.
+    """
+    timeout = FetchError("slow")
+    timeout.__cause__ = asyncio.TimeoutError()
+    assert failure_reason(timeout) == "timeout"
+    assert failure_reason(ParseTimeout("huge")) == "timeout"
+    assert failure_reason(FetchError("HTTP 429", status=429)) == "blocked"
+    assert failure_reason(FetchError("HTTP 500", status=500)) == "error"
+    assert failure_reason(ValueError("bad")) == "error"
+    assert failure_reason(ParseBusy("queue full")) is None
+    health = DomainHealth(threshold=1)
+    health.record_error("https://busy.com/", ParseBusy("queue full"))
+    assert health.status("https://busy.com/") == "ok"
+    assert domain_of("HTTPS://WWW.Example.com:8443/a") == "example.com"
+
+
+def test_prioritize_skips_open_and_demotes_suspect() -> None:
+    """
+    Test that links to open domains are dropped and links to suspect
+    ones move behind the healthy links.
+    """
+    health = DomainHealth(threshold=2)
+    health.record_failure("https://blocked.com/", "blocked")
+    health.record_failure("https://flaky.com/", "error")
+    links, decisions = health.prioritize([
+        "https://flaky.com/1", "https://blocked.com/2", "https://ok.com/3",
+        "https://other.com/4"])
+    assert links == ["https://ok.com/3", "https://other.com/4",
+                     "https://flaky.com/1"]
+    assert decisions == {"skipped": ["blocked.com"], "deprioritized": 1}
+
+
+async def _start_forbidding_server() -> web.AppRunner:
+    """
+    Start a server that answers every page with a 403.
+    """
+    async def page(request: web.Request) -> web.Response:
+        return web.Response(status=403, text="<p>Forbidden</p>",
+                            content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+def test_scrape_link_records_http_errors() -> None:
+    """
+    Test that an HTTP error page raises instead of becoming context
+    and opens the circuit of its domain.
+    """
+    runner = run_sync(_start_forbidding_server())
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/page"
+    try:
+        with pytest.raises(FetchError) as error:
+            scrape_link(url)
+        assert error.value.status == 403
+        assert get_domain_health().status(url) == "open"
+    finally:
+        run_sync(runner.cleanup())
@@ -0,0 +1,59 @@
+from ..extract import TextExtractor, extract_document, sniff_charset
+
+PAGE = (
+    "<html lang='fr'><head><title>Le titre</title>"
+    "<meta name='description' content='Résumé'>"
+    "<style>body { color: red }</style>"
+    "<script>var hidden = '<p>not text</p>';</script></head>"
+    "<body><nav><a href='/'>Home</a><nav>Inner</nav></nav>"
+    "<p>Visible &amp; useful.</p></body></html>"
+)
+
+
+def test_extractor_skips_script_style_and_nav() -> None:
+    """
+    Test that only visible content text is kept, with metadata.
+    """
+    doc = extract_document(PAGE.encode("utf-8"), "https://x.example")
+    assert "Visible & useful." in doc.page_content
+    for hidden in ("color: red", "not text", "Home", "Inner"):
+        assert hidden not in doc.page_content
+    assert doc.metadata == {"source": "https://x.example",
+                            "title": "Le titre",
+                            "description": "Résumé",
+                            "language": "fr"}
+
+
+def test_extractor_stops_after_max_chars() -> None:
+    """
+    Test that the extractor reports done once the budget is reached
+    and ignores the rest of the page.
+    """
+    extractor = TextExtractor(max_chars=50)
+    chunk = ("<p>" + "word " * 20 + "</p>").encode()
+    assert extractor.feed_bytes(b"<html><body>" + chunk)
+    extractor.feed_bytes(b"<p>MORE TEXT</p>")
+    doc = extractor.document("u")
+    assert len(doc.page_content) == 50
+    assert "MORE" not in doc.page_content
+
+
+def test_extractor_uses_declared_charset() -> None:
+    """
+    Test that a meta charset is honoured when the server sent none.
+    """
+    body = "<meta charset='latin-1'><p>café</p>".encode("latin-1")
+    assert sniff_charset(body) == "latin-1"
+    assert "café" in extract_document(body, "u").page_content
+
+
+def test_extractor_handles_split_multibyte_characters() -> None:
+    """
+    Test that a UTF-8 character split across chunks is decoded intact.
+    """
+    body = "<p>naïve</p>".encode("utf-8")
+    split = body.index("ï".encode()) + 1
+    extractor = TextExtractor(encoding="utf-8")
+    extractor.feed_bytes(body[:split])
+    extractor.feed_bytes(body[split:])
+    assert extractor.document("u").page_content == "naïve"
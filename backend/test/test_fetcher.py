@@ -0,0 +1,168 @@
+import asyncio
+from dataclasses import replace
+import pytest
+from aiohttp import web
+from ..extract import TextExtractor
+from ..fetcher import AsyncFetcher, FetchError, run_sync
+from ..load_scrape_website import afetch_page, load_website_content
+from ..settings import get_settings
+
+PAGE = ("<html lang='en'><head><title>Example</title>"
+        "<meta name='description' content='A test page'></head>"
+        "<body><p>Hello from the test server.</p></body></html>")
+
+
+async def _start_server() -> web.AppRunner:
+    """
+    Start a local server with a normal page and a slow page.
+    """
+    async def page(request: web.Request) -> web.Response:
+        return web.Response(text=PAGE, content_type="text/html")
+
+    async def slow(request: web.Request) -> web.Response:
+        await asyncio.sleep(1)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    async def huge(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        await response.write(b"<html><body>")
+        for _ in range(200):
+            await response.write(b"<p>" + b"text " * 2000 + b"</p>")
+        await response.write_eof()
+        return response
+
+    async def exact(request: web.Request) -> web.Response:
+        return web.Response(body=b"x" * 1000, content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/exact", exact)
+    app.router.add_get("/page", page)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/huge", huge)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner
+
+
+@pytest.fixture
+def base_url() -> str:
+    """
+    Fixture serving test pages from the fetcher's background loop.
+    """
+    runner = run_sync(_start_server())
+    port = runner.addresses[0][1]
+    yield f"http://127.0.0.1:{port}"
+    run_sync(runner.cleanup())
+
+
+def test_load_website_content_builds_document(base_url: str) -> None:
+    """
+    Test that the sync loader returns one Document with page metadata.
+    """
+    docs = load_website_content(f"{base_url}/page")
+    assert len(docs) == 1
+    assert "Hello from the test server." in docs[0].page_content
+    assert docs[0].metadata["title"] == "Example"
+    assert docs[0].metadata["description"] == "A test page"
+    assert docs[0].metadata["language"] == "en"
+
+
+def test_fetcher_enforces_read_timeout(base_url: str) -> None:
+    """
+    Test that a slow page raises FetchError instead of hanging.
+    """
+    async def fetch() -> None:
+        fetcher = AsyncFetcher(
+            replace(get_settings(), fetch_read_timeout=0.2))
+        try:
+            await fetcher.fetch(f"{base_url}/slow")
+        finally:
+            await fetcher.close()
+
+    with pytest.raises(FetchError):
+        run_sync(fetch())
+
+
+def test_fetcher_reuses_session(base_url: str) -> None:
+    """
+    Test that repeated fetches share one pooled session.
+    """
+    async def fetch_twice() -> bool:
+        fetcher = AsyncFetcher()
+        await fetcher.fetch(f"{base_url}/page")
+        first = fetcher._session
+        await fetcher.fetch(f"{base_url}/page")
+        same = fetcher._session is first
+        await fetcher.close()
+        return same
+
+    assert run_sync(fetch_twice())
+
+
+def test_fetcher_stops_reading_once_sink_has_enough(base_url: str) -> None:
+    """
+    Test that a multi-megabyte page is abandoned after the extractor
+    has collected its character budget.
+    """
+    async def fetch() -> tuple:
+        fetcher = AsyncFetcher()
+        extractor = TextExtractor(max_chars=5000)
+        result = await fetcher.fetch(f"{base_url}/huge", sink=extractor)
+        await fetcher.close()
+        return result, extractor
+
+    result, extractor = run_sync(fetch())
+    assert result.truncated
+    assert len(result.body) < 200_000
+    assert len(extractor.document("u").page_content) == 5000
+
+
+def test_default_settings_stop_reading_early(
+        base_url: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that, out of the box, page downloads are streamed through the
+    extractor and abandoned once the character budget is reached.
+    """
+    monkeypatch.delenv("ASK_WEB_PARSE_WORKERS")
+    get_settings.cache_clear()
+    assert get_settings().parse_workers == 0
+    page = run_sync(afetch_page(f"{base_url}/huge"))
+    assert len(page.body) < 200_000
+    assert page.document is not None
+    assert len(page.document.page_content) == get_settings().page_max_chars
+
+
+def test_fetcher_enforces_byte_cap(base_url: str) -> None:
+    """
+    Test that max_bytes bounds the download without a sink.
+    """
+    async def fetch():
+        fetcher = AsyncFetcher()
+        result = await fetcher.fetch(f"{base_url}/huge", max_bytes=100_000)
+        await fetcher.close()
+        return result
+
+    result = run_sync(fetch())
+    assert result.truncated and len(result.body) == 100_000
+
+
+def test_fetcher_byte_cap_boundary(base_url: str) -> None:
+    """
+    Test that a body of exactly max_bytes is complete and one byte
+    more is truncated.
+    """
+    async def fetch(max_bytes: int):
+        fetcher = AsyncFetcher()
+        result = await fetcher.fetch(f"{base_url}/exact",
+                                     max_bytes=max_bytes)
+        await fetcher.close()
+        return result
+
+    result = run_sync(fetch(1000))
+    assert not result.truncated and len(result.body) == 1000
+    result = run_sync(fetch(999))
+    assert result.truncated and len(result.body) == 999
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import pytest
+from ..instrumentation import (MetricsRegistry, NODE_SECONDS, note_page,
+                               record_trace, timed)
+from ..nodes import merge_metrics
+from ..scrape_policy import ScrapePolicy, gather_pages
+from ..settings import get_settings
+
+
+def test_registry_renders_prometheus_text() -> None:
+    """
+    Test the exposition format of counters and cumulative buckets.
+    """
+    registry = MetricsRegistry()
+    hits = registry.counter("hits_total", "Cache hits.")
+    latency = registry.histogram("latency_seconds", "Latency.", (0.1, 1.0))
+    hits.inc(cache="page")
+    hits.inc(2, cache="page")
+    latency.observe(0.05, node="a")
+    latency.observe(0.5, node="a")
+
+    text = registry.render()
+    assert "# TYPE hits_total counter" in text
+    assert 'hits_total{cache="page"} 3' in text
+    assert 'latency_seconds_bucket{node="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{node="a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{node="a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{node="a"} 2' in text
+
+
+def test_timed_nodes_report_durations() -> None:
+    """
+    Test that sync and async nodes get their duration added to the
+    state, and that the metrics reducer keeps every node's timing.
+    """
+    @timed("first")
+    def first(state: dict) -> dict:
+        return {"metrics": {"first": {"items": 1}}}
+
+    @timed("second")
+    async def second(state: dict) -> dict:
+        await asyncio.sleep(0.01)
+        return {"answer": "done"}
+
+    before = NODE_SECONDS.render().count('node="second"')
+    metrics = merge_metrics(first({})["metrics"],
+                            asyncio.run(second({}))["metrics"])
+    assert set(metrics["timings"]) == {"first", "second"}
+    assert metrics["timings"]["second"] >= 0.01
+    assert metrics["first"] == {"items": 1}
+    assert NODE_SECONDS.render().count('node="second"') > before
+
+
+def test_gather_pages_records_each_branch() -> None:
+    """
+    Test that what the scraper notes about a page lands in that
+    page's record of the scrape stats.
+    """
+    async def scrape(link: str) -> list:
+        note_page(bytes=len(link), cache="miss")
+        return ["chunk"]
+
+    _, stats = asyncio.run(gather_pages(
+        ["https://a.example", "https://bb.example"], scrape,
+        ScrapePolicy(budget=1, target_pages=2, hedge_after=0)))
+    pages = {page["link"]: page for page in stats["pages"]}
+    assert pages["https://a.example"]["bytes"] == 17
+    assert pages["https://bb.example"]["bytes"] == 18
+    assert all(page["cache"] == "miss" and "duration" in page
+               for page in pages.values())
+
+
+def test_record_trace_appends_jsonl(
+        tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that finished requests are traced when a path is configured.
+    """
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("ASK_WEB_TRACE_PATH", str(path))
+    get_settings.cache_clear()
+    state = {"status": "PASS", "metrics": {"timings": {"get_links": 0.2}}}
+    record_trace("What?", state, {"latency": 1.5, "cached": False})
+    record_trace("Why?", state, {"latency": 0.1, "cached": True})
+
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [row["question"] for row in rows] == ["What?", "Why?"]
+    assert rows[0]["metrics"]["timings"]["get_links"] == 0.2
+    assert rows[0]["latency"] == 1.5
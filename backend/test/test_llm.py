@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableLambda
+from .. import registry
+from ..fake_llm import FakeChatModel
+from ..llm import LLMBackend, LLMTimeout, get_provider_limit
+from ..load_llm import load_llm
+from ..settings import get_settings
+
+
+class ScriptedModel:
+    """
+    A model whose n-th call waits `delays[n]` seconds before answering
+    `call n`.
+    """
+    def __init__(self, delays: list) -> None:
+        self.delays = delays
+        self.calls = 0
+
+    def _next(self) -> tuple:
+        call = self.calls
+        self.calls += 1
+        return call, self.delays[min(call, len(self.delays) - 1)]
+
+    def stream(self, prompt: str):
+        call, delay = self._next()
+        time.sleep(delay)
+        yield AIMessageChunk(content=f"call {call}")
+
+    async def astream(self, prompt: str):
+        call, delay = self._next()
+        await asyncio.sleep(delay)
+        yield AIMessageChunk(content=f"call {call}")
+
+    def with_structured_output(self, schema, include_raw=False):
+        def invoke(prompt: str) -> dict:
+            call, delay = self._next()
+            time.sleep(delay)
+            return {"call": call}
+
+        async def ainvoke(prompt: str) -> dict:
+            call, delay = self._next()
+            await asyncio.sleep(delay)
+            return {"call": call}
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+
+class LoopBoundModel(ScriptedModel):
+    """
+    A model whose async client, like grpc.aio's, only works on the
+    event loop that first used it.
+    """
+    def __init__(self, delays: list) -> None:
+        super().__init__(delays)
+        self.loop = None
+
+    def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        if self.loop is not loop:
+            raise RuntimeError("client bound to another event loop")
+
+    async def astream(self, prompt: str):
+        self._bind()
+        async for chunk in super().astream(prompt):
+            yield chunk
+
+    def with_structured_output(self, schema, include_raw=False):
+        runnable = super().with_structured_output(schema, include_raw)
+
+        async def ainvoke(prompt: str) -> dict:
+            self._bind()
+            return await runnable.ainvoke(prompt)
+        return RunnableLambda(runnable.invoke, afunc=ainvoke)
+
+
+def make_backend(model: ScriptedModel, timeout: float = 5.0,
+                 hedge_quantile: float = 0.95) -> LLMBackend:
+    backend = LLMBackend(model, "fake", "fake", timeout, hedge_quantile)
+    for tracker in backend.trackers.values():
+        for _ in range(20):
+            tracker.observe(0.05)
+    return backend
+
+
+def setup_function() -> None:
+    registry.reset()
+
+
+def test_hedge_wins_when_first_attempt_is_slow() -> None:
+    """
+    Test that a call slower than the model's usual latency is hedged
+    and that the faster duplicate's answer is used.
+    """
+    start = time.perf_counter()
+    chunks = list(make_backend(ScriptedModel([2.0, 0.0])).stream("q"))
+    assert [c.content for c in chunks] == ["call 1"]
+    assert time.perf_counter() - start < 1.0
+
+    async def collect(backend: LLMBackend) -> list:
+        return [c.content async for c in backend.astream("q")]
+
+    start = time.perf_counter()
+    assert asyncio.run(collect(make_backend(
+        ScriptedModel([2.0, 0.0])))) == ["call 1"]
+    verify = make_backend(ScriptedModel([2.0, 0.0])).with_structured_output(
+        dict)
+    assert verify.invoke("q") == {"call": 1}
+    assert time.perf_counter() - start < 2.0
+
+    unhedged = make_backend(ScriptedModel([0.2, 0.0]), hedge_quantile=0)
+    assert [c.content for c in unhedged.stream("q")] == ["call 0"]
+
+
+def test_sync_calls_leave_the_async_client_alone() -> None:
+    """
+    Test that sync calls use the model's blocking methods, so a model
+    whose async client is bound to one event loop can be called from
+    both sync code and that loop.
+    """
+    backend = make_backend(LoopBoundModel([0.0]))
+    verify = backend.with_structured_output(dict)
+
+    async def ask() -> list:
+        return ([c.content async for c in backend.astream("q")]
+                + [await verify.ainvoke("q")])
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(ask()) == ["call 0", {"call": 1}]
+        assert [c.content for c in backend.stream("q")] == ["call 2"]
+        assert verify.invoke("q") == {"call": 3}
+        assert loop.run_until_complete(ask()) == ["call 4", {"call": 5}]
+    finally:
+        loop.close()
+
+
+def test_deadline_raises_timeout() -> None:
+    """
+    Test that a call which outlives its deadline raises `LLMTimeout`,
+    hedge or not.
+    """
+    backend = make_backend(ScriptedModel([1.0]), timeout=0.2)
+    with pytest.raises(LLMTimeout):
+        list(backend.stream("q"))
+    verify = backend.with_structured_output(dict)
+    with pytest.raises(LLMTimeout):
+        asyncio.run(verify.ainvoke("q"))
+
+
+def test_provider_cap_queues_calls(monkeypatch) -> None:
+    """
+    Test that calls wait for a provider slot and time out if none
+    frees up.
+    """
+    monkeypatch.setenv("ASK_WEB_LLM_MAX_CONCURRENCY", "1")
+    backend = make_backend(ScriptedModel([0.0]), timeout=0.2)
+    slots = get_provider_limit("fake")
+    assert slots.try_acquire()
+    try:
+        with pytest.raises(LLMTimeout):
+            list(backend.stream("q"))
+        with pytest.raises(LLMTimeout):
+            asyncio.run(backend.with_structured_output(dict).ainvoke("q"))
+    finally:
+        slots.release()
+    assert [c.content for c in backend.stream("q")] == ["call 0"]
+    assert slots.used == 0
+
+    assert slots.try_acquire()
+    threading.Timer(0.1, slots.release).start()
+    assert [c.content for c in backend.stream("q")] == ["call 1"]
+
+    async def queued() -> list:
+        assert slots.try_acquire()
+        asyncio.get_running_loop().call_later(0.1, slots.release)
+        return [c.content async for c in make_backend(
+            ScriptedModel([0.0]), timeout=1.0).astream("q")]
+
+    assert asyncio.run(queued()) == ["call 0"]
+    assert slots.used == 0
+
+
+def test_losing_attempt_frees_its_slot_at_once() -> None:
+    """
+    Test that a sync call's losing attempt gives its provider slot
+    back when it is cancelled, and to the semaphore it was taken from
+    even after the shared one has been replaced.
+    """
+    backend = make_backend(ScriptedModel([2.0, 0.0]))
+    slots = get_provider_limit("fake")
+    chunks = backend.stream("q")
+    assert next(chunks).content == "call 1"
+    get_provider_limit.cache_clear()
+    assert list(chunks) == []
+    deadline = time.monotonic() + 0.5
+    while slots.used and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slots.used == 0
+    assert get_provider_limit("fake").used == 0
+
+
+def test_routing_by_task_and_question(monkeypatch) -> None:
+    """
+    Test that verification and short questions use the fast model.
+    """
+    monkeypatch.setenv("ASK_WEB_LLM_MODEL", "fake")
+    monkeypatch.setenv("ASK_WEB_LLM_FAST_MODEL", "fake:0")
+    assert registry.get_llm("verify").name == "fake:0"
+    assert registry.get_llm("generate", "What is Rust?").name == "fake:0"
+    assert registry.get_llm(
+        "generate", "How does Rust's borrow checker keep memory safe?"
+    ).name == "fake"
+    assert registry.get_llm() is registry.get_llm("generate", "x" * 100)
+
+    monkeypatch.setenv("ASK_WEB_LLM_FAST_MODEL", "")
+    get_settings.cache_clear()
+    assert registry.get_llm("verify").name == "fake"
+
+
+def test_fake_model_runs_offline() -> None:
+    """
+    Test that a `fake` spec loads the offline model with its latencies
+    and answers citing the prompt's first source.
+    """
+    model = load_llm("fake:0.05:0")
+    assert isinstance(model, FakeChatModel)
+    assert model.first_token_latency == 0.05
+    backend = LLMBackend(model, "fake", "fake", 5.0, 0.95)
+    prompt = ("[1] Rust, https://rust.example/book\n"
+              "Ownership keeps memory safe.")
+    text = "".join(c.content for c in backend.stream(prompt))
+    assert text.startswith("Ownership keeps memory safe [1].")
+    assert "[1] Rust, https://rust.example/book" in text
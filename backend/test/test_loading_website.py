@@ -1,6 +1,7 @@
 import pytest
 from langchain.schema import Document
 from unittest.mock import patch
+from ..chunk_store import Chunk, ChunkList
 from ..load_scrape_website import (
     search_duckduckgo,
     get_reduced_text,
@@ -8,7 +9,7 @@ from ..load_scrape_website import (
 )
 
 
-@patch("backend.load_scrape_website.DuckDuckGoSearchResults")
+@patch("langchain_community.tools.DuckDuckGoSearchResults")
 def test_search_duckduckgo_returns_links(mock_search: patch) -> None:
     """
     Test that search_duckduckgo returns a list of up to 3 string URLs.
@@ -61,12 +62,12 @@ def test_split_content_returns_chunks(
         mock_reduce: patch,
         dummy_doc: Document) -> None:
     """
-    Test that split_content returns chunked Documents with proper metadata.
+    Test that split_content returns chunk views with proper metadata.
     """
     mock_reduce.return_value = "This is a test document. " * 20  # ~500 chars
     chunks = split_content([dummy_doc])
-    assert isinstance(chunks, list)
-    assert all(isinstance(c, Document) for c in chunks)
+    assert isinstance(chunks, ChunkList)
+    assert all(isinstance(c, Chunk) for c in chunks)
     assert all("test document" in c.page_content for c in chunks)
     assert all("source" in c.metadata for c in chunks)
 
@@ -80,7 +81,7 @@ def test_split_content_handles_empty_text(mock_reduce: patch) -> None:
     mock_reduce.return_value = ""
     empty_doc = Document(page_content="", metadata={})
     chunks = split_content([empty_doc])
-    assert chunks == []
+    assert len(chunks) == 0
 
 
 @patch("backend.load_scrape_website.get_reduced_text",
@@ -93,6 +94,6 @@ def test_split_content_handles_exceptions(
     Test that split_content catches and logs exceptions during text splitting.
     """
     chunks = split_content([dummy_doc])
-    assert chunks == []
+    assert len(chunks) == 0
     captured = capsys.readouterr()
     assert "Error splitting document" in captured.out
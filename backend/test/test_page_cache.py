@@ -0,0 +1,155 @@
+import time
+import pytest
+from aiohttp import web
+from ..chunk_store import Chunk
+from ..disk_cache import DiskCache
+from ..fetcher import run_sync
+from ..load_scrape_website import afetch_page, scrape_link
+from ..page_cache import get_page_cache, normalize_url
+from ..settings import get_settings
+
+PAGE = ("<html><head><title>Cached</title></head><body>"
+        + "<p>Popular page content. </p>" * 20 + "</body></html>")
+
+
+def test_normalize_url_drops_noise() -> None:
+    """
+    Test that case, default ports, fragments and tracking params
+    do not produce distinct cache keys.
+    """
+    assert normalize_url(
+        "HTTPS://Example.com:443/a?b=2&utm_source=x&a=1#frag"
+    ) == normalize_url("https://example.com/a?a=1&b=2")
+
+
+def test_disk_cache_roundtrip_and_ttl(tmp_path: str) -> None:
+    """
+    Test that values round-trip and expire into stale entries.
+    """
+    cache = DiskCache(str(tmp_path / "c.sqlite3"), max_bytes=10_000)
+    cache.put("k", b"value" * 10, ttl=0.05, meta={"etag": '"1"'})
+    entry = cache.get("k")
+    assert entry.value == b"value" * 10
+    assert entry.meta["etag"] == '"1"'
+    assert entry.fresh
+    time.sleep(0.06)
+    assert not cache.get("k").fresh
+    assert cache.get("missing") is None
+    assert cache.stats.hits == 2 and cache.stats.misses == 1
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: str) -> None:
+    """
+    Test that the size cap evicts the least recently used entry.
+    """
+    cache = DiskCache(str(tmp_path / "c.sqlite3"), max_bytes=120,
+                      compression_level=1)
+    payload = bytes(range(50))
+    cache.put("a", payload, ttl=60)
+    cache.put("b", payload, ttl=60)
+    cache.get("a")
+    cache.put("c", payload, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats.evictions >= 1
+
+
+def test_disk_cache_keeps_running_total(tmp_path: str) -> None:
+    """
+    Test that the stored size total follows replacements and deletes,
+    and survives reopening the file.
+    """
+    path = str(tmp_path / "c.sqlite3")
+    cache = DiskCache(path, max_bytes=10_000)
+    cache.put("a", b"a" * 500, ttl=60)
+    cache.put("b", bytes(range(200)), ttl=60)
+    cache.put("a", bytes(range(100)), ttl=60)
+    cache.delete("b")
+    cache.delete("missing")
+    (size,) = cache._connect().execute(
+        "SELECT SUM(size) FROM entries").fetchone()
+    assert cache.total_bytes() == size
+    assert DiskCache(path, max_bytes=10_000).total_bytes() == size
+
+
+async def _start_server(counter: dict) -> web.AppRunner:
+    """
+    Start a server that honours If-None-Match and counts requests.
+    """
+    async def page(request: web.Request) -> web.Response:
+        counter[request.headers.get("If-None-Match", "plain")] = (
+            counter.get(request.headers.get("If-None-Match", "plain"), 0)
+            + 1)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html",
+                            headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+@pytest.fixture
+def server() -> tuple:
+    """
+    Fixture yielding the page URL and the request counter.
+    """
+    counter = {}
+    runner = run_sync(_start_server(counter))
+    port = runner.addresses[0][1]
+    yield f"http://127.0.0.1:{port}/page", counter
+    run_sync(runner.cleanup())
+
+
+def test_scrape_link_serves_and_revalidates_from_cache(server: tuple) -> None:
+    """
+    Test that a fresh hit skips the network and a stale hit is
+    revalidated with the stored ETag.
+    """
+    url, counter = server
+    first = scrape_link(url)
+    assert first and all(isinstance(c, Chunk) for c in first)
+
+    second = scrape_link(url)
+    assert [c.page_content for c in second] == [
+        c.page_content for c in first]
+    assert counter == {"plain": 1}
+
+    cache = get_page_cache()
+    cache.ttl = 0
+    cache.store.refresh(cache._page_key(url), ttl=-1)
+    third = scrape_link(url)
+    assert [c.page_content for c in third] == [
+        c.page_content for c in first]
+    assert counter == {"plain": 1, '"v1"': 1}
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_pages_cut_at_the_byte_cap_are_not_cached(
+        server: tuple, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that a body cut at `page_max_bytes` is neither cached nor
+    chunk-cached, while one the extractor stopped early still is.
+    """
+    url, counter = server
+    monkeypatch.setenv("ASK_WEB_PAGE_MAX_BYTES", "200")
+    get_settings.cache_clear()
+    get_page_cache.cache_clear()
+    page = run_sync(afetch_page(url))
+    assert page.partial
+    assert get_page_cache().get_page(url) is None
+    scrape_link(url)
+    assert counter == {"plain": 2}
+    assert get_page_cache().stats()["stores"] == 0
+
+    monkeypatch.delenv("ASK_WEB_PAGE_MAX_BYTES")
+    monkeypatch.setenv("ASK_WEB_PAGE_MAX_CHARS", "50")
+    get_settings.cache_clear()
+    get_page_cache.cache_clear()
+    page = run_sync(afetch_page(url))
+    assert not page.partial
+    assert get_page_cache().get_page(url) is not None
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from benchmarks.fakes import make_page
+from ..extract import extract_document
+from ..load_scrape_website import CHUNK_OVERLAP, CHUNK_SIZE
+from ..parse_pool import (ParseBusy, ParseTimeout, aparse_chunks,
+                          get_parse_pool, lxml_extract, parse_bounded,
+                          parse_chunks, parse_page)
+from ..settings import get_settings
+
+
+def test_lxml_extract_matches_the_streaming_extractor() -> None:
+    """
+    Test that the lxml fast path keeps the same text and metadata as
+    `TextExtractor`, without scripts or navigation.
+    """
+    body = make_page(3, 40).encode("utf-8")
+    text, metadata = lxml_extract(body, "http://fixture/page/3")
+    document = extract_document(body, "http://fixture/page/3")
+    assert text == document.page_content
+    assert "analytics" not in text and "Fixture page 3" in text
+    assert metadata == document.metadata
+    assert lxml_extract(body, "u", max_chars=100)[0] == text[:100]
+    assert lxml_extract(b"", "u") == ("", {"source": "u"})
+
+
+def test_pool_parses_pages_into_chunk_offsets(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that chunks parsed in the process pool are the chunks the
+    same parse gives in this process.
+    """
+    monkeypatch.setenv("ASK_WEB_PARSE_WORKERS", "1")
+    get_settings.cache_clear()
+    assert get_parse_pool() is not None
+    body = make_page(0, 40).encode("utf-8")
+
+    chunks, extracted = parse_chunks(body, "http://fixture/page/0", None,
+                                     CHUNK_SIZE, CHUNK_OVERLAP)
+    text, metadata, starts, ends, length = parse_page(
+        body, "http://fixture/page/0", None,
+        get_settings().page_max_chars, CHUNK_SIZE, CHUNK_OVERLAP)
+    assert extracted == length
+    assert [c.page_content for c in chunks] == [
+        text[a:b] for a, b in zip(starts, ends)]
+    assert len(chunks) > 5 and chunks[0].metadata == metadata
+
+
+def test_slow_parse_is_stopped_in_the_worker(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that a parse running past the timeout is interrupted where it
+    runs, instead of only being abandoned by the caller.
+    """
+    monkeypatch.setattr("backend.parse_pool.parse_page",
+                        lambda *args: time.sleep(5))
+    start = time.perf_counter()
+    with pytest.raises(ParseTimeout):
+        parse_bounded(0.05, b"<p>slow</p>", "u")
+    assert time.perf_counter() - start < 1
+
+
+def test_busy_pool_is_not_a_parse_timeout(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that a page which cannot get a worker in time fails as busy,
+    and that the queue wait is not counted as parse time.
+    """
+    monkeypatch.setenv("ASK_WEB_PARSE_WORKERS", "1")
+    monkeypatch.setenv("ASK_WEB_PARSE_TIMEOUT", "0.25")
+    get_settings.cache_clear()
+    pool = get_parse_pool()
+    pool.submit(time.sleep, 0).result()
+    small = make_page(0, 40).encode("utf-8")
+
+    busy = pool.submit(time.sleep, 0.8)
+    with pytest.raises(ParseBusy):
+        parse_chunks(small, "u", None, CHUNK_SIZE, CHUNK_OVERLAP)
+    busy.result()
+    pool.submit(time.sleep, 0.35)
+    chunks, _ = parse_chunks(small, "u", None, CHUNK_SIZE, CHUNK_OVERLAP)
+    assert len(chunks) > 5
+
+
+def test_async_parse_leaves_worker_threads_free(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that pages waiting on the pool from async code do not hold
+    the default executor's threads, and still fail as busy in time.
+    """
+    monkeypatch.setenv("ASK_WEB_PARSE_WORKERS", "1")
+    monkeypatch.setenv("ASK_WEB_PARSE_TIMEOUT", "0.25")
+    get_settings.cache_clear()
+    pool = get_parse_pool()
+    pool.submit(time.sleep, 0).result()
+    small = make_page(0, 40).encode("utf-8")
+
+    async def main() -> tuple:
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=1))
+        pool.submit(time.sleep, 0.3)
+        parse = asyncio.ensure_future(
+            aparse_chunks(small, "u", None, CHUNK_SIZE, CHUNK_OVERLAP))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await asyncio.to_thread(time.sleep, 0)
+        waited = time.perf_counter() - start
+        chunks, _ = await parse
+        pool.submit(time.sleep, 0.8)
+        with pytest.raises(ParseBusy):
+            await aparse_chunks(small, "u", None, CHUNK_SIZE, CHUNK_OVERLAP)
+        return waited, chunks
+
+    waited, chunks = asyncio.run(main())
+    assert waited < 0.1
+    assert len(chunks) > 5
+
+
+def test_broken_pool_is_shut_down_and_replaced(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that a pool whose worker died is shut down and replaced.
+    """
+    monkeypatch.setenv("ASK_WEB_PARSE_WORKERS", "1")
+    get_settings.cache_clear()
+    pool = get_parse_pool()
+    pool.submit(os._exit, 1)
+    small = make_page(0, 40).encode("utf-8")
+    with pytest.raises(BrokenProcessPool):
+        parse_chunks(small, "u", None, CHUNK_SIZE, CHUNK_OVERLAP)
+    assert pool._shutdown_thread
+    assert get_parse_pool() is not pool
+    chunks, _ = parse_chunks(small, "u", None, CHUNK_SIZE, CHUNK_OVERLAP)
+    assert len(chunks) > 5
@@ -0,0 +1,74 @@
+import asyncio
+from aiohttp import web
+from ..fetcher import run_sync
+from ..graph import generate_graph
+from ..nodes import search_and_scrape
+from ..warmup import get_host_hints, origin_of
+
+PAGE = ("<html><head><title>Page</title></head><body>"
+        + "<p>Pipelined page content. </p>" * 20 + "</body></html>")
+
+
+async def _start_server(counter: dict) -> web.AppRunner:
+    """
+    Start a server with a few pages that counts HEAD requests.
+    """
+    async def page(request: web.Request) -> web.Response:
+        return web.Response(text=PAGE, content_type="text/html")
+
+    async def root(request: web.Request) -> web.Response:
+        counter[request.method] = counter.get(request.method, 0) + 1
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/page/{n}", page)
+    app.router.add_route("HEAD", "/", root)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+def test_search_and_scrape_overlaps_search(monkeypatch) -> None:
+    """
+    Test that pages are scraped while the search is still streaming,
+    and that known sites are warmed up while searching.
+    """
+    monkeypatch.setenv("ASK_WEB_CORPUS", "0")
+    monkeypatch.setenv("ASK_WEB_SCRAPE_TARGET_PAGES", "2")
+    counter = {}
+    runner = run_sync(_start_server(counter))
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    links = [f"{base}/page/{n}" for n in range(3)]
+
+    async def search(question: str):
+        for link in links:
+            yield {"title": "Page", "link": link, "snippet": ""}
+            await asyncio.sleep(0.3)
+
+    monkeypatch.setattr("backend.nodes.astream_duckduckgo", search)
+    get_host_hints().observe(links)
+    try:
+        update = search_and_scrape({"question": "pipelined pages"})
+    finally:
+        run_sync(runner.cleanup())
+
+    assert update["links"] == links[:2]
+    assert len(update["context"]) > 0
+    pipeline = update["metrics"]["pipeline"]
+    assert pipeline["warmed"] == [origin_of(base)]
+    assert pipeline["warm_hits"] == 2
+    assert pipeline["overlap"] > 0.2
+    assert counter == {"HEAD": 1}
+    assert update["metrics"]["scrape_web_data"]["pages"][0][
+        "duration"] < 0.3
+
+
+def test_pipelined_graph_replaces_search_and_scrape(monkeypatch) -> None:
+    """
+    Test that the pipelined graph runs one stage instead of two.
+    """
+    monkeypatch.setenv("ASK_WEB_PIPELINE", "1")
+    nodes = set(generate_graph().get_graph().nodes)
+    assert "search_and_scrape" in nodes
+    assert not nodes & {"get_links", "scrape_web_data"}
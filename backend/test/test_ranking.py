@@ -0,0 +1,55 @@
+from langchain.schema import Document
+from ..ranking import bm25_scores, estimate_tokens, select_context, tokenize
+
+
+def make_docs() -> list[Document]:
+    """
+    Build chunks where only one is about the question.
+    """
+    texts = [
+        "Bananas are yellow fruit grown in tropical regions.",
+        "LangGraph builds stateful agent workflows as graphs of nodes.",
+        "The weather today is sunny with a light breeze.",
+    ]
+    return [Document(page_content=t, metadata={"source": str(i)})
+            for i, t in enumerate(texts)]
+
+
+def test_tokenize_drops_stopwords() -> None:
+    """
+    Test that tokenize lowercases and removes stopwords.
+    """
+    assert tokenize("What is the LangGraph API?") == ["langgraph", "api"]
+
+
+def test_bm25_ranks_relevant_chunk_first() -> None:
+    """
+    Test that the chunk sharing terms with the query scores highest.
+    """
+    docs = [tokenize(d.page_content) for d in make_docs()]
+    scores = bm25_scores(tokenize("langgraph workflows"), docs)
+    assert scores.argmax() == 1
+    assert scores[0] == scores[2] == 0
+
+
+def test_select_context_respects_budget() -> None:
+    """
+    Test that selection keeps the best chunk within the budget and
+    reports the tokens saved.
+    """
+    docs = make_docs()
+    budget = estimate_tokens(docs[1].page_content)
+    selected, stats = select_context("How do LangGraph workflows work?",
+                                     docs, budget)
+    assert selected == [docs[1]]
+    assert stats["chunks_in"] == 3 and stats["chunks_out"] == 1
+    assert stats["tokens_saved"] == stats["tokens_in"] - budget
+
+
+def test_select_context_handles_no_chunks() -> None:
+    """
+    Test that an empty context yields an empty selection.
+    """
+    selected, stats = select_context("anything", [], 100)
+    assert selected == []
+    assert stats["tokens_saved"] == 0
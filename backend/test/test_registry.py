@@ -0,0 +1,48 @@
+import threading
+from unittest.mock import patch
+from .. import registry
+
+
+def setup_function() -> None:
+    """
+    Start every test with an empty registry.
+    """
+    registry.reset()
+
+
+@patch("backend.graph.generate_graph")
+def test_get_graph_builds_once(mock_generate: patch) -> None:
+    """
+    Test that get_graph compiles the graph once and reuses it.
+    """
+    first = registry.get_graph()
+    second = registry.get_graph()
+    assert first is second
+    mock_generate.assert_called_once()
+
+
+@patch("backend.load_llm.load_llm")
+def test_get_llm_is_shared_across_threads(mock_load: patch) -> None:
+    """
+    Test that concurrent callers all receive the same LLM instance.
+    """
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        registry.get_llm())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, results))) == 1
+    mock_load.assert_called_once()
+
+
+@patch("backend.graph.generate_graph")
+def test_reset_forces_rebuild(mock_generate: patch) -> None:
+    """
+    Test that reset drops cached instances.
+    """
+    registry.get_graph()
+    registry.reset()
+    registry.get_graph()
+    assert mock_generate.call_count == 2
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import pytest
+from ..scrape_policy import ScrapePolicy, gather_pages
+
+
+def make_scraper(delays: dict, calls: list = None):
+    """
+    Build a fake scraper where each link takes a set time; a delay of
+    None raises an error and a negative delay returns no chunks.
+    """
+    async def scrape(link: str) -> list:
+        if calls is not None:
+            calls.append(link)
+        delay = delays[link]
+        if delay is None:
+            raise RuntimeError(f"{link} failed")
+        await asyncio.sleep(abs(delay))
+        return [] if delay < 0 else [f"chunk from {link}"]
+    return scrape
+
+
+def test_candidates_follow_overfetch() -> None:
+    """
+    Test that the policy tries target * overfetch links.
+    """
+    assert ScrapePolicy(target_pages=3, overfetch=2).candidates == 6
+    assert ScrapePolicy(target_pages=3, overfetch=0.5).candidates == 3
+
+
+def test_gather_pages_keeps_first_successes() -> None:
+    """
+    Test that failures are replaced by later links and stragglers are
+    cancelled once enough pages arrive.
+    """
+    delays = {"a": 0.01, "b": None, "c": 5, "d": 0.02, "e": -0.01}
+    policy = ScrapePolicy(budget=2, target_pages=2, overfetch=3,
+                          hedge_after=0)
+    start = time.perf_counter()
+    pages, stats = asyncio.run(
+        gather_pages(list(delays), make_scraper(delays), policy))
+    assert time.perf_counter() - start < 1
+    assert pages == [["chunk from a"], ["chunk from d"]]
+    assert stats["failed"] == 1 and stats["empty"] == 1
+    assert stats["cancelled"] == 1 and not stats["timed_out"]
+
+
+def test_gather_pages_answers_with_what_arrived_by_deadline() -> None:
+    """
+    Test that the budget bounds the stage even if too few pages arrive.
+    """
+    delays = {"fast": 0.01, "slow": 5, "slower": 10}
+    policy = ScrapePolicy(budget=0.2, target_pages=3, overfetch=1,
+                          hedge_after=0)
+    start = time.perf_counter()
+    pages, stats = asyncio.run(
+        gather_pages(list(delays), make_scraper(delays), policy))
+    assert time.perf_counter() - start < 1
+    assert pages == [["chunk from fast"]]
+    assert stats["timed_out"] and stats["cancelled"] == 2
+
+
+def test_gather_pages_hedges_slow_requests() -> None:
+    """
+    Test that a slow first attempt is raced by a duplicate request.
+    """
+    calls = []
+    attempts = {"count": 0}
+
+    async def scrape(link: str) -> list:
+        calls.append(link)
+        attempts["count"] += 1
+        await asyncio.sleep(5 if attempts["count"] == 1 else 0.01)
+        return ["chunk"]
+
+    policy = ScrapePolicy(budget=2, target_pages=1, overfetch=1,
+                          hedge_after=0.05)
+    pages, stats = asyncio.run(gather_pages(["x"], scrape, policy))
+    assert pages == [["chunk"]]
+    assert calls == ["x", "x"]
+    assert stats["hedged"] == 1
+
+
+def test_budget_cancels_downloads_waiting_for_a_hedge() -> None:
+    """
+    Test that links cut off by the budget before their hedge was due
+    stop downloading instead of running on in the background.
+    """
+    outcomes = []
+
+    async def scrape(link: str) -> list:
+        try:
+            await asyncio.sleep(0.5)
+        except asyncio.CancelledError:
+            outcomes.append("cancelled")
+            raise
+        outcomes.append("finished")
+        return ["chunk"]
+
+    async def run() -> dict:
+        policy = ScrapePolicy(budget=0.05, target_pages=2, overfetch=1,
+                              hedge_after=3)
+        _, stats = await gather_pages(["a", "b"], scrape, policy)
+        await asyncio.sleep(0.6)
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["cancelled"] == 2
+    assert outcomes == ["cancelled", "cancelled"]
+
+
+def test_gather_pages_starts_links_as_they_stream_in() -> None:
+    """
+    Test that each link from a stream is scraped as soon as it
+    arrives, before the stream ends, and that the stream is not read
+    past the candidates.
+    """
+    delays = {"a": 0.01, "b": 0.01, "c": 0.01}
+    calls = []
+    read = []
+
+    async def links():
+        for link in ["a", "b", "c", "d"]:
+            read.append(link)
+            yield link
+            await asyncio.sleep(0.1)
+
+    policy = ScrapePolicy(budget=2, target_pages=3, overfetch=1,
+                          hedge_after=0)
+    pages, stats = asyncio.run(
+        gather_pages(links(), make_scraper(delays, calls), policy))
+    assert len(pages) == 3
+    assert read == ["a", "b", "c"]
+    assert stats["links"] == ["a", "b", "c"]
+    assert stats["first_link"] < 0.05
+    assert stats["pages"][0]["duration"] < 0.05
+    assert stats["elapsed"] < 0.4
+
+
+def test_gather_pages_stream_errors() -> None:
+    """
+    Test that a stream failing before any link raises, and that one
+    failing later keeps the pages already started.
+    """
+    async def links(count: int):
+        for link in ["a", "b"][:count]:
+            yield link
+        raise RuntimeError("search failed")
+
+    policy = ScrapePolicy(budget=2, target_pages=2, overfetch=1,
+                          hedge_after=0)
+    scrape = make_scraper({"a": 0.01, "b": 0.01})
+    with pytest.raises(RuntimeError, match="search failed"):
+        asyncio.run(gather_pages(links(0), scrape, policy))
+    pages, stats = asyncio.run(gather_pages(links(1), scrape, policy))
+    assert pages == [["chunk from a"]]
+    assert "search failed" in stats["stream_error"]
@@ -0,0 +1,233 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from duckduckgo_search.exceptions import RatelimitException
+from ..disk_cache import DiskCache
+from ..search import (SearchError, SearchService, TokenBucket,
+                      normalize_query)
+
+RESULTS = [{"title": "A", "link": "https://a.example", "snippet": "a"}]
+
+
+def make_service(tmp_path: str, backend, **kwargs) -> SearchService:
+    """
+    Build a search service with a fast bucket and no real backoff.
+    """
+    store = DiskCache(str(tmp_path / "search.sqlite3"), max_bytes=10**6)
+    options = {"ttl": 60, "bucket": TokenBucket(1000, 1000),
+               "max_retries": 2, "backoff": 0.001}
+    options.update(kwargs)
+    return SearchService(backend, store, **options)
+
+
+def test_normalize_query() -> None:
+    """
+    Test that case, spacing and trailing punctuation are ignored.
+    """
+    assert normalize_query("  What IS   LangGraph? ") == \
+        normalize_query("what is langgraph")
+
+
+def test_repeated_query_hits_cache(tmp_path: str) -> None:
+    """
+    Test that a repeated, differently spelled question costs no
+    upstream call.
+    """
+    calls = []
+    service = make_service(
+        tmp_path, lambda q: calls.append(q) or RESULTS)
+    assert service.search("What is LangGraph?") == RESULTS
+    assert service.search("what is langgraph") == RESULTS
+    assert len(calls) == 1
+    assert service.stats()["hits"] == 1
+
+
+def test_asearch_serves_hits_and_offloads_misses(tmp_path: str) -> None:
+    """
+    Test that the async search reaches the backend once and then
+    answers from the cache, looking it up in a worker thread.
+    """
+    calls = []
+    service = make_service(
+        tmp_path, lambda q: calls.append(q) or RESULTS)
+    lookups = []
+    cached = service._cached
+
+    def spy(key: str) -> tuple:
+        lookups.append(threading.current_thread())
+        return cached(key)
+
+    service._cached = spy
+
+    async def main() -> list:
+        first = await service.asearch("What is LangGraph?")
+        return [first, await service.asearch("what is langgraph")]
+
+    assert asyncio.run(main()) == [RESULTS, RESULTS]
+    assert len(calls) == 1
+    assert service.stats()["hits"] == 1
+    assert len(lookups) == 2
+    assert threading.main_thread() not in lookups
+
+
+def test_identical_inflight_searches_are_merged(tmp_path: str) -> None:
+    """
+    Test that concurrent identical searches share one upstream call.
+    """
+    calls = []
+    release = threading.Event()
+
+    def backend(query: str) -> list[dict]:
+        calls.append(query)
+        release.wait(2)
+        return RESULTS
+
+    service = make_service(tmp_path, backend)
+    results = []
+    threads = [threading.Thread(
+        target=lambda: results.append(service.search("same question")))
+        for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [RESULTS] * 5
+    assert len(calls) == 1
+    assert service.stats()["coalesced"] == 4
+
+
+def test_throttled_search_backs_off_and_retries(tmp_path: str) -> None:
+    """
+    Test that a rate-limit error is retried instead of failing.
+    """
+    attempts = []
+
+    def backend(query: str) -> list[dict]:
+        attempts.append(query)
+        if len(attempts) < 3:
+            raise RatelimitException("202 Ratelimit")
+        return RESULTS
+
+    service = make_service(tmp_path, backend)
+    assert service.search("busy") == RESULTS
+    assert service.stats()["throttled"] == 2
+
+
+def test_throttled_search_serves_stale_or_raises(tmp_path: str) -> None:
+    """
+    Test that exhausted retries fall back to a stale result, and raise
+    SearchError when nothing is cached.
+    """
+    def throttled(query: str) -> list[dict]:
+        raise RatelimitException("202 Ratelimit")
+
+    service = make_service(tmp_path, throttled)
+    with pytest.raises(SearchError):
+        service.search("never cached")
+
+    service.store.put(service._key("old question"),
+                      b'[{"link": "https://old.example"}]', ttl=-1)
+    assert service.search("old question") == [
+        {"link": "https://old.example"}]
+    assert service.stats()["stale_served"] == 1
+
+
+def test_stream_yields_stale_results_before_searching(tmp_path) -> None:
+    """
+    Test that a stale cached result is streamed before the upstream
+    search returns, followed only by the links it did not contain.
+    """
+    release = threading.Event()
+
+    def backend(query: str) -> list[dict]:
+        release.wait(5)
+        return [{"link": "https://old.example"},
+                {"link": "https://new.example"}]
+
+    service = make_service(tmp_path, backend)
+    service.store.put(service._key("question"),
+                      b'[{"link": "https://old.example"}]', ttl=-1)
+
+    async def collect() -> list:
+        links = []
+        async for result in service.astream("question"):
+            links.append(result["link"])
+            if len(links) == 1:
+                release.set()
+        return links
+
+    assert asyncio.run(collect()) == [
+        "https://old.example", "https://new.example"]
+    assert service.stats()["stale_streamed"] == 1
+
+
+def test_stream_refreshes_stale_results_when_closed_early(
+        tmp_path) -> None:
+    """
+    Test that a stale result is refreshed and cached even when the
+    caller stops reading after the stale links.
+    """
+    service = make_service(tmp_path, lambda q: RESULTS)
+    service.store.put(service._key("question"),
+                      b'[{"link": "https://old.example"}]', ttl=-1)
+
+    async def main() -> None:
+        stream = service.astream("question")
+        assert (await anext(stream))["link"] == "https://old.example"
+        await stream.aclose()
+        while service._refreshing:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert service.stats()["upstream_calls"] == 1
+    assert service.stats()["stale_streamed"] == 1
+    assert service.search("question") == RESULTS
+    assert service.stats()["hits"] == 1
+
+
+def test_token_bucket_paces_requests() -> None:
+    """
+    Test that requests beyond the burst wait for new tokens.
+    """
+    bucket = TokenBucket(rate=20, capacity=1)
+    bucket.acquire()
+    assert bucket.acquire() > 0
+
+
+def test_token_bucket_without_a_rate_does_not_pace() -> None:
+    """
+    Test that a rate of zero or less turns pacing off instead of
+    failing.
+    """
+    for rate in (0, -1):
+        bucket = TokenBucket(rate=rate, capacity=1)
+        assert [bucket.acquire() for _ in range(3)] == [0.0] * 3
+        assert asyncio.run(bucket.aacquire()) == 0.0
+
+
+def test_async_pacing_leaves_worker_threads_free(tmp_path: str) -> None:
+    """
+    Test that async searches waiting for the token bucket do not hold
+    the default executor's threads.
+    """
+    service = make_service(tmp_path, lambda q: RESULTS,
+                           bucket=TokenBucket(rate=2, capacity=1))
+
+    async def main() -> float:
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=1))
+        searches = [asyncio.ensure_future(service.asearch(f"question {n}"))
+                    for n in range(3)]
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await asyncio.to_thread(time.sleep, 0)
+        waited = time.perf_counter() - start
+        await asyncio.gather(*searches)
+        return waited
+
+    assert asyncio.run(main()) < 0.2
+    assert service.stats()["upstream_calls"] == 3
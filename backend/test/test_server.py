@@ -0,0 +1,94 @@
+import asyncio
+import json
+from aiohttp.test_utils import TestClient, TestServer
+from langchain_core.messages import AIMessage
+from ..server import create_app
+
+
+class FakeGraph:
+    """
+    A graph stand-in that streams two tokens slowly and counts runs.
+    """
+
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.runs = 0
+
+    async def astream(self, inputs: dict, stream_mode: list):
+        self.runs += 1
+        for token in ("Paris ", "[1]."):
+            await asyncio.sleep(self.delay)
+            yield "custom", {"token": token}
+        yield "values", {"question": inputs["question"],
+                         "answer": AIMessage(content="Paris [1]."),
+                         "status": "PASS"}
+
+
+def parse_sse(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):],
+                       json.loads(data[len("data: "):])))
+    return events
+
+
+def run_client(app, scenario) -> None:
+    async def main() -> None:
+        async with TestClient(TestServer(app)) as client:
+            await scenario(client)
+    asyncio.run(main())
+
+
+def test_identical_questions_share_one_run() -> None:
+    """
+    Test that concurrent requests for the same normalized question
+    attach to a single graph run and all receive the full stream.
+    """
+    graph = FakeGraph()
+    app = create_app(graph, max_concurrency=4, max_queue=0)
+
+    async def scenario(client: TestClient) -> None:
+        async def ask(question: str) -> list:
+            response = await client.get("/ask", params={"q": question})
+            assert response.status == 200
+            return parse_sse(await response.text())
+
+        results = await asyncio.gather(
+            ask("What is the capital of France?"),
+            ask("what is the capital of france"),
+            ask("  WHAT is the capital of France "))
+        for events in results:
+            assert [name for name, _ in events] == [
+                "token", "token", "answer", "done"]
+            assert events[2][1]["answer"] == "Paris [1]."
+            assert events[2][1]["status"] == "PASS"
+        stats = await (await client.get("/health")).json()
+        assert stats["coalesced"] == 2
+        metrics = await (await client.get("/metrics")).text()
+        assert "ask_web_request_seconds_count" in metrics
+
+    run_client(app, scenario)
+    assert graph.runs == 1
+
+
+def test_requests_beyond_admission_limit_are_rejected() -> None:
+    """
+    Test that once every slot and queue place is taken, new questions
+    get a 503 instead of piling up.
+    """
+    graph = FakeGraph(delay=0.2)
+    app = create_app(graph, max_concurrency=1, max_queue=0)
+
+    async def scenario(client: TestClient) -> None:
+        first = asyncio.ensure_future(
+            client.post("/ask", json={"question": "first"}))
+        await asyncio.sleep(0.05)
+        rejected = await client.post("/ask", json={"question": "second"})
+        assert rejected.status == 503
+        assert rejected.headers["Retry-After"] == "1"
+        response = await first
+        assert "event: done" in await response.text()
+        assert (await client.get("/ask")).status == 400
+
+    run_client(app, scenario)
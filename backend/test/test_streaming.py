@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain.schema import Document
+from langchain_core.messages import AIMessageChunk
+from .. import registry
+from ..streaming import astream_events, stream_events
+
+CHUNKS = [
+    AIMessageChunk(content="LangGraph is "),
+    AIMessageChunk(content="a library [1]."),
+    AIMessageChunk(content="", usage_metadata={
+        "input_tokens": 10, "output_tokens": 5, "total_tokens": 15}),
+]
+
+
+async def achunks():
+    for chunk in CHUNKS:
+        await asyncio.sleep(0)
+        yield chunk
+
+
+@pytest.fixture
+def graph() -> tuple:
+    """
+    Fixture building the real graph with search, scraping and the LLM
+    replaced by stand-ins.
+    """
+    llm = MagicMock()
+    llm.stream.side_effect = lambda prompt: iter(CHUNKS)
+    llm.astream.side_effect = lambda prompt: achunks()
+    llm.with_structured_output.return_value.invoke.return_value = {
+        "raw": AIMessageChunk(content=""), "parsed": {"status": "PASS"}}
+    doc = Document(page_content="LangGraph is a library for agents.",
+                   metadata={"source": "https://a.example", "title": "A"})
+    registry.reset()
+    with patch("backend.nodes.get_llm", return_value=llm), \
+            patch("backend.nodes.search_duckduckgo",
+                  return_value=[{"link": "https://a.example"}]), \
+            patch("backend.nodes.asearch_duckduckgo", AsyncMock(
+                return_value=[{"link": "https://a.example"}])), \
+            patch("backend.nodes.ascrape_link", AsyncMock(
+                return_value=[doc])):
+        yield registry.get_graph(), llm
+    registry.reset()
+
+
+def test_stream_events_yields_tokens_before_final_answer(
+        graph: tuple) -> None:
+    """
+    Test that answer tokens are streamed before the final state, and
+    that the time to first token is reported.
+    """
+    compiled, llm = graph
+    events = list(stream_events(compiled, "What is LangGraph?"))
+
+    tokens = [e["data"] for e in events if e["event"] == "token"]
+    assert tokens == ["LangGraph is ", "a library [1]."]
+
+    first_token = next(i for i, e in enumerate(events)
+                       if e["event"] == "token")
+    first_answer = next(i for i, e in enumerate(events)
+                        if e["event"] == "values" and e["data"].get("answer"))
+    assert first_token < first_answer
+
+    final = [e for e in events if e["event"] == "values"][-1]["data"]
+    assert final["answer"].content == "LangGraph is a library [1]."
+    assert final["answer"].usage_metadata["total_tokens"] == 15
+    assert final["metrics"]["generate_answer"]["ttft"] is not None
+
+    done = events[-1]
+    assert done["event"] == "done"
+    assert 0 <= done["data"]["ttft"] <= done["data"]["latency"]
+
+
+def test_astream_events_runs_many_questions_on_one_loop(
+        graph: tuple) -> None:
+    """
+    Test that the async graph streams tokens and answers several
+    questions concurrently on a single event loop.
+    """
+    compiled, llm = graph
+
+    async def ask(question: str) -> list:
+        return [event async for event in astream_events(compiled, question)]
+
+    async def main() -> list:
+        return await asyncio.gather(*(ask(f"Question {i}?")
+                                      for i in range(20)))
+
+    runs = asyncio.run(main())
+    assert len(runs) == 20
+    for events in runs:
+        tokens = [e["data"] for e in events if e["event"] == "token"]
+        assert tokens == ["LangGraph is ", "a library [1]."]
+        final = [e for e in events if e["event"] == "values"][-1]["data"]
+        assert final["answer"].usage_metadata["total_tokens"] == 15
+        assert final["status"] == "PASS"
+    assert llm.stream.call_count == 0
+    assert llm.astream.call_count == 20
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit
+from .fetcher import get_fetcher
+
+# Seconds an idle pooled connection is kept alive by aiohttp, so a
+# site warmed this recently still has an open connection.
+WARM_TTL = 15.0
+
+# Origins remembered from past search results.
+MAX_ORIGINS = 512
+
+
+def origin_of(url: str) -> str:
+    """
+    The scheme and host part of a URL, e.g. `https://example.com`.
+    """
+    parts = urlsplit(url.strip())
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class HostHints:
+    """
+    Remembers which sites search results tend to point at, so
+    connections to them can be opened while the next search is still
+    running.
+    """
+
+    def __init__(self) -> None:
+        self._seen: Counter = Counter()
+        self._warmed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, links: Iterable[str]) -> None:
+        """
+        Count the sites of a search's result links.
+
+        Args:
+            links (Iterable[str]): The result links.
+        """
+        with self._lock:
+            self._seen.update({origin_of(link) for link in links})
+            if len(self._seen) > MAX_ORIGINS:
+                self._seen = Counter(dict(
+                    self._seen.most_common(MAX_ORIGINS // 2)))
+
+    def likely(self, limit: int) -> List[str]:
+        """
+        The sites most often found in search results that have no
+        recently warmed connection.
+
+        Args:
+            limit (int): How many sites to return.
+
+        Returns:
+            List[str]: Origins, most frequent first.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [origin for origin, _ in self._seen.most_common()
+                    if now - self._warmed.get(origin, -WARM_TTL) >= WARM_TTL
+                    ][:limit]
+
+    async def warm(self, origins: List[str]) -> List[str]:
+        """
+        Open connections to sites through the current loop's fetcher.
+
+        Args:
+            origins (List[str]): The sites to connect to.
+
+        Returns:
+            List[str]: The origins a connection was opened to.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._warmed.update((origin, now) for origin in origins)
+        fetcher = get_fetcher()
+        opened = await asyncio.gather(
+            *(fetcher.warm_up(origin) for origin in origins))
+        return [origin for origin, ok in zip(origins, opened) if ok]
+
+
+@lru_cache(maxsize=None)
+def get_host_hints() -> HostHints:
+    """
+    Return the process-wide host hints.
+
+    Returns:
+        HostHints: The shared hints.
+    """
+    return HostHints()
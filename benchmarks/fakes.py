@@ -0,0 +1,245 @@
+"""
+Deterministic local stand-ins for the web, the search engine and the
+LLM, so benchmarks measure this code rather than the network. The fake
+LLM lives in `backend.fake_llm`, where `ASK_WEB_LLM_MODEL=fake` finds
+it.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Set
+from aiohttp import web
+from backend.fake_llm import FakeChatModel, fake_answer  # noqa: F401
+
+WORDS = """
+agent graph state node edge stream token model search page cache latency
+python library query answer source citation context chunk budget network
+request response server client thread event loop memory index result
+""".split()
+
+
+def make_page(index: int, size_kb: int, seed: int = 0) -> str:
+    """
+    Build a deterministic HTML page of roughly `size_kb` kilobytes,
+    with the navigation, scripts and hyphenated line breaks real pages
+    have.
+
+    Args:
+        index (int): The page number, used in its title.
+        size_kb (int): The approximate size of the page.
+        seed (int): Seed for the word generator.
+
+    Returns:
+        str: The HTML.
+    """
+    rng = random.Random(seed * 100003 + index)
+    parts = [
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'>",
+        f"<title>Fixture page {index}</title>",
+        "<meta name='description' content='A benchmark fixture.'>",
+        "<script>var analytics = {" + "x: 1, " * 200 + "};</script>",
+        "<style>body { font-family: sans-serif; }</style></head><body>",
+        "<nav>" + " | ".join(f"<a href='/{w}'>{w}</a>"
+                             for w in WORDS[:12]) + "</nav>",
+    ]
+    size = sum(map(len, parts))
+    while size < size_kb * 1024:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 120))]
+        if len(words) > 10:
+            words[5] = words[5] + "-\n" + words[6]
+            del words[6]
+        sentences = " ".join(words).replace(" model ", " model.\n")
+        paragraph = f"<h2>Section {size}</h2>\n<p>{sentences}.</p>\n"
+        parts.append(paragraph)
+        size += len(paragraph)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+class FixtureServer:
+    """
+    Serves fixture pages from a local aiohttp server running in a
+    background thread, at `/page/<n>`, with an optional delay. Chosen
+    pages can be made slow or broken to simulate bad sites. When
+    `search` is set, it also answers searches at `/search?q=...` with
+    that fake's links, latency and 429s.
+    """
+
+    def __init__(self, pages: List[str], latency: float = 0.0,
+                 slow: Optional[Dict[int, float]] = None,
+                 broken: Optional[Set[int]] = None) -> None:
+        """
+        Args:
+            pages (List[str]): The HTML of each page.
+            latency (float): Seconds to wait before each response.
+            slow (Dict[int, float], optional): Extra seconds of delay
+                for some page numbers.
+            broken (Set[int], optional): Page numbers answered with 503.
+        """
+        self.pages = [page.encode("utf-8") for page in pages]
+        self.latency = latency
+        self.slow = slow or {}
+        self.broken = broken or set()
+        self.search: Optional[FakeSearch] = None
+        self.requests = 0
+        self.base_url = ""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        index = int(request.match_info["index"])
+        delay = self.latency + self.slow.get(index, 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if index in self.broken:
+            raise web.HTTPServiceUnavailable()
+        if index >= len(self.pages):
+            raise web.HTTPNotFound()
+        return web.Response(body=self.pages[index],
+                            content_type="text/html", charset="utf-8")
+
+    async def _search(self, request: web.Request) -> web.Response:
+        if self.search is None:
+            raise web.HTTPNotFound()
+        throttled = self.search.draw()
+        if self.search.latency:
+            await asyncio.sleep(self.search.latency)
+        if throttled:
+            raise web.HTTPTooManyRequests()
+        return web.json_response(
+            self.search.results(request.query.get("q", "")))
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/page/{index}", self._handle)
+        app.router.add_get("/search", self._search)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    def start(self) -> "FixtureServer":
+        """
+        Start serving and return once the server accepts connections.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop the server and its thread.
+        """
+        asyncio.run_coroutine_threadsafe(
+            self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def url(self, index: int) -> str:
+        return f"{self.base_url}/page/{index}"
+
+    @property
+    def search_url(self) -> str:
+        return f"{self.base_url}/search"
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+class FakeSearch:
+    """
+    A search backend returning fixture links after a fixed delay, in
+    the shape `DuckDuckGoSearchResults(output_format='list')` uses.
+    A share of calls can be failed with a 429 rate-limit error.
+    """
+
+    def __init__(self, links: List[str], per_query: int = 6,
+                 latency: float = 0.0, throttle_rate: float = 0.0,
+                 seed: int = 0) -> None:
+        """
+        Args:
+            links (List[str]): The pool of links to return.
+            per_query (int): Results per search.
+            latency (float): Seconds each search takes.
+            throttle_rate (float): Share of calls failing with a 429.
+            seed (int): Seed for choosing the throttled calls.
+        """
+        self.links = links
+        self.per_query = per_query
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> bool:
+        """
+        Count a call and decide whether it is throttled.
+        """
+        with self._lock:
+            self.calls += 1
+            throttled = self._rng.random() < self.throttle_rate
+            self.throttled += throttled
+        return throttled
+
+    def results(self, query: str) -> List[Dict[str, str]]:
+        """
+        The links returned for a query, the same every time.
+        """
+        start = sum(map(ord, query)) % len(self.links)
+        picked = [self.links[(start + i) % len(self.links)]
+                  for i in range(self.per_query)]
+        return [{"title": f"Result {i}", "link": link,
+                 "snippet": "fixture"} for i, link in enumerate(picked)]
+
+    def __call__(self, query: str) -> List[Dict[str, str]]:
+        throttled = self.draw()
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            raise RuntimeError("202 Ratelimit: HTTP 429 Too Many Requests")
+        return self.results(query)
+
+
+class SearchClient:
+    """
+    A search backend querying a `FixtureServer`'s search endpoint over
+    HTTP, so searches cross a real socket like DuckDuckGo's do.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0) -> None:
+        """
+        Args:
+            url (str): The server's `search_url`.
+            timeout (float): Seconds to wait for an answer.
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, query: str) -> List[Dict[str, str]]:
+        url = f"{self.url}?{urllib.parse.urlencode({'q': query})}"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as f:
+                return json.load(f)
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                raise
+            # Worded like the DuckDuckGo error `is_rate_limited` spots.
+            raise RuntimeError(
+                "202 Ratelimit: HTTP 429 Too Many Requests") from e
@@ -0,0 +1,340 @@
+"""
+Load test for the Ask the Web backend under simulated concurrent users.
+
+Drives the real graph from `backend.graph.generate_graph` against a
+local stub server for fixture pages and search (see
+`benchmarks/fakes.py`), with injected slow sites, broken sites and
+429s from search. The LLM is the offline `fake` model behind the real
+`LLMBackend`, so deadlines, hedging and provider slots are exercised
+as in production. For each concurrency level it reports latency
+percentiles, error rates, throughput and the peak memory of every
+worker process.
+
+Usage:
+    python -m benchmarks.load [--users 10,50,200] [--duration 20]
+        [--workers 1] [--think 1.0 | --rate 20] [--hot-share 0.3]
+        [--slow-share 0.1] [--throttle-share 0.05] [--output load.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Nearest-rank p50, p95 and p99 of a list of seconds.
+    """
+    ordered = sorted(samples)
+    result = {}
+    for q in (50, 95, 99):
+        if not ordered:
+            result[f"p{q}"] = None
+            continue
+        rank = max(1, -(-q * len(ordered) // 100))
+        result[f"p{q}"] = ordered[rank - 1]
+    return result
+
+
+class QuestionMix:
+    """
+    Draws questions from a small head of popular questions and a long
+    tail of unique ones.
+    """
+
+    def __init__(self, hot_share: float, hot_questions: int,
+                 seed: int) -> None:
+        """
+        Args:
+            hot_share (float): Share of questions drawn from the head.
+            hot_questions (int): Size of the head.
+            seed (int): Seed for the draws.
+        """
+        self.hot_share = hot_share
+        self.hot_questions = hot_questions
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._unique = 0
+
+    def next(self) -> str:
+        """
+        Return the next question to ask.
+        """
+        if self._rng.random() < self.hot_share:
+            index = self._rng.randrange(self.hot_questions)
+            return f"Popular question {index}?"
+        self._unique += 1
+        return f"Question {self._unique} of worker {self.seed}?"
+
+
+async def _ask(graph: Any, question: str, samples: Dict[str, Any]) -> None:
+    """
+    Answer one question and record its latency, TTFT or error.
+    """
+    from backend.streaming import astream_events
+
+    start = time.perf_counter()
+    state: Dict[str, Any] = {}
+    try:
+        async for event in astream_events(graph, question):
+            if event["event"] == "values":
+                state = event["data"]
+            elif event["event"] == "done":
+                samples["ttft"].append(event["data"]["ttft"] or 0.0)
+    except Exception as e:
+        samples["errors"][type(e).__name__] += 1
+        return
+    samples["latency"].append(time.perf_counter() - start)
+    if not state.get("sources"):
+        samples["errors"]["NoSources"] += 1
+
+
+async def _drive(graph: Any, config: Dict[str, Any],
+                 mix: QuestionMix) -> Dict[str, Any]:
+    """
+    Run closed-loop users (or open-loop arrivals) until the deadline.
+    """
+    samples = {"latency": [], "ttft": [], "errors": Counter(),
+               "requests": 0}
+    rng = random.Random(config["seed"])
+    deadline = time.perf_counter() + config["duration"]
+    tasks = set()
+
+    async def ask(question: str) -> None:
+        samples["requests"] += 1
+        await _ask(graph, question, samples)
+
+    async def user() -> None:
+        # Stagger the start so users do not arrive in lockstep.
+        await asyncio.sleep(rng.uniform(0, config["think"]))
+        while time.perf_counter() < deadline:
+            await ask(mix.next())
+            if config["think"]:
+                await asyncio.sleep(rng.expovariate(1 / config["think"]))
+
+    if config["rate"]:
+        while time.perf_counter() < deadline:
+            task = asyncio.ensure_future(ask(mix.next()))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            await asyncio.sleep(rng.expovariate(config["rate"]))
+        await asyncio.gather(*tasks)
+    else:
+        await asyncio.gather(*(user() for _ in range(config["users"])))
+    return samples
+
+
+def run_worker(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one worker's share of a load level in a fresh process.
+
+    Args:
+        config (dict): The level, the stub search URL and fake
+            settings.
+
+    Returns:
+        dict: Raw latency samples, error counts and peak RSS.
+    """
+    os.environ["ASK_WEB_CACHE_DIR"] = tempfile.mkdtemp(prefix="ask-load-")
+    os.environ["ASK_WEB_PAGE_CACHE"] = "1" if config["page_cache"] else "0"
+    os.environ["ASK_WEB_CORPUS"] = "1" if config["page_cache"] else "0"
+    os.environ["ASK_WEB_ANSWER_CACHE"] = (
+        "1" if config["answer_cache"] else "0")
+    # Every fixture site shares one host, so the domain circuit breaker
+    # would skip them all after the first broken ones.
+    os.environ["ASK_WEB_DOMAIN_FAILURE_THRESHOLD"] = "0"
+    os.environ.setdefault("USER_AGENT", "ask-the-web-load")
+
+    # The registry wraps the fake model in `LLMBackend`, like Gemini.
+    os.environ["ASK_WEB_LLM_MODEL"] = os.environ["ASK_WEB_LLM_FAST_MODEL"] = (
+        f"fake:{config['first_token_latency']}:{config['token_latency']}")
+
+    from benchmarks.fakes import SearchClient
+    from backend.disk_cache import DiskCache
+    from backend.fetcher import close_fetcher
+    from backend.graph import generate_graph
+    from backend.search import SearchService, TokenBucket
+    from backend.settings import get_settings
+
+    settings = get_settings()
+    search = SearchService(
+        SearchClient(config["search_url"]),
+        DiskCache(os.path.join(settings.cache_dir, "search.sqlite3"),
+                  32 * 1024 * 1024),
+        settings.search_cache_ttl,
+        TokenBucket(settings.search_rate, settings.search_burst),
+        settings.search_max_retries,
+        settings.search_backoff)
+    mix = QuestionMix(config["hot_share"], config["hot_questions"],
+                      config["seed"])
+
+    async def main() -> Dict[str, Any]:
+        try:
+            return await _drive(generate_graph(), config, mix)
+        finally:
+            await close_fetcher()
+
+    start = time.perf_counter()
+    with patch("backend.load_scrape_website.get_search_service",
+               return_value=search):
+        samples = asyncio.run(main())
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    samples["errors"] = dict(samples["errors"])
+    samples["elapsed"] = time.perf_counter() - start
+    samples["rss_peak_mb"] = (peak / (1024 * 1024) if sys.platform ==
+                              "darwin" else peak / 1024)
+    samples["search"] = search.stats()
+    return samples
+
+
+def run_level(users: int, args: argparse.Namespace,
+              search_url: str) -> Dict[str, Any]:
+    """
+    Run one concurrency level across the worker processes.
+
+    Args:
+        users (int): Concurrent users for the level.
+        args (argparse.Namespace): The command line options.
+        search_url (str): The stub server's search endpoint.
+
+    Returns:
+        dict: The aggregated report for the level.
+    """
+    configs = []
+    for worker in range(args.workers):
+        share = users // args.workers + (worker < users % args.workers)
+        configs.append({
+            "users": share,
+            "rate": args.rate / args.workers if args.rate else 0.0,
+            "think": args.think,
+            "duration": args.duration,
+            "seed": args.seed * 1000 + users * 10 + worker,
+            "search_url": search_url,
+            "hot_share": args.hot_share,
+            "hot_questions": args.hot_questions,
+            "first_token_latency": args.first_token_latency,
+            "token_latency": args.token_latency,
+            "page_cache": args.page_cache,
+            "answer_cache": args.answer_cache,
+        })
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.workers) as pool:
+        results = pool.map(run_worker, configs)
+
+    latency = [s for r in results for s in r["latency"]]
+    ttft = [s for r in results for s in r["ttft"]]
+    errors = Counter()
+    for result in results:
+        errors.update(result["errors"])
+    requests = sum(r["requests"] for r in results)
+    failed = sum(n for kind, n in errors.items() if kind != "NoSources")
+    elapsed = max(r["elapsed"] for r in results)
+    return {
+        "users": users,
+        "requests": requests,
+        "completed": len(latency),
+        "throughput_rps": len(latency) / elapsed,
+        "error_rate": failed / requests if requests else 0.0,
+        "errors": dict(errors),
+        "latency_s": percentiles(latency),
+        "ttft_s": percentiles(ttft),
+        "rss_peak_mb_per_worker": [r["rss_peak_mb"] for r in results],
+        "search": [r["search"] for r in results],
+    }
+
+
+def format_row(level: Dict[str, Any]) -> str:
+    """
+    One table row summarizing a level.
+    """
+    def ms(value: Optional[float]) -> str:
+        return f"{value * 1000:7.0f}" if value is not None else "      -"
+
+    latency = level["latency_s"]
+    return (f"{level['users']:>5} {level['requests']:>8} "
+            f"{level['throughput_rps']:>8.2f} {level['error_rate']:>7.1%} "
+            f"{ms(latency['p50'])} {ms(latency['p95'])} "
+            f"{ms(latency['p99'])} "
+            f"{max(level['rss_peak_mb_per_worker']):>8.1f}")
+
+
+def main() -> None:
+    """
+    Parse arguments, start the fixture server and run every level.
+    """
+    from benchmarks.fakes import FakeSearch, FixtureServer, make_page
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", default="10,50,200",
+                        help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=20.0,
+                        help="seconds each level runs")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes sharing the users")
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="mean seconds a user waits between questions")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="open-loop arrivals per second (overrides "
+                             "users and think time)")
+    parser.add_argument("--hot-share", type=float, default=0.3,
+                        help="share of questions from the popular head")
+    parser.add_argument("--hot-questions", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--page-kb", type=int, default=60)
+    parser.add_argument("--page-latency", type=float, default=0.05)
+    parser.add_argument("--slow-share", type=float, default=0.1,
+                        help="share of sites that answer slowly")
+    parser.add_argument("--slow-latency", type=float, default=6.0)
+    parser.add_argument("--broken-share", type=float, default=0.05,
+                        help="share of sites answering 503")
+    parser.add_argument("--throttle-share", type=float, default=0.05,
+                        help="share of searches failing with a 429")
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--first-token-latency", type=float, default=0.4)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--page-cache", action="store_true",
+                        help="keep the page cache and local corpus on")
+    parser.add_argument("--answer-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    indexes = list(range(args.pages))
+    rng.shuffle(indexes)
+    slow_count = int(args.pages * args.slow_share)
+    broken_count = int(args.pages * args.broken_share)
+    slow = {i: args.slow_latency for i in indexes[:slow_count]}
+    broken = set(indexes[slow_count:slow_count + broken_count])
+    pages = [make_page(i, args.page_kb) for i in range(args.pages)]
+
+    levels = []
+    with FixtureServer(pages, args.page_latency, slow, broken) as server:
+        links = [server.url(i) for i in range(args.pages)]
+        server.search = FakeSearch(links, latency=args.search_latency,
+                                   throttle_rate=args.throttle_share,
+                                   seed=args.seed)
+        print("users requests      rps  errors  p50(ms) p95(ms) p99(ms)"
+              "  rss(MB)")
+        for users in map(int, args.users.split(",")):
+            level = run_level(users, args, server.search_url)
+            levels.append(level)
+            print(format_row(level), flush=True)
+
+    report = {"params": vars(args), "levels": levels}
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Offline pipeline benchmark for the Ask the Web backend.
+
+Serves fixture pages from a local HTTP server, replaces DuckDuckGo and
+Gemini with deterministic fakes and measures text cleaning, splitting,
+the scrape fan-out, search plus scrape back to back and pipelined,
+and end-to-end `graph.stream` latency, throughput and memory. Results
+are written as JSON so runs on different commits can be compared.
+
+Usage:
+    python -m benchmarks.pipeline [--output results.json]
+        [--baseline previous.json] [--pages 24] [--page-kb 60]
+        [--questions 20] [--search-latency 0.05] [--page-latency 0.02]
+        [--first-token-latency 0.2] [--token-latency 0.005]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    """
+    Median, p95 and mean of a list of seconds.
+    """
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return {"median": statistics.median(ordered), "p95": p95,
+            "mean": statistics.fmean(ordered), "n": len(ordered)}
+
+
+def _time_per_call(func: Callable[[], Any], repeat: int = 5) -> float:
+    """
+    Best-of-`repeat` seconds per call, auto-scaling the loop count.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def _rss_mb() -> float:
+    """
+    Peak resident set size of this process in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure_text(documents: List[Any]) -> Dict[str, Any]:
+    """
+    Measure `clean_text` and `split_content` on extracted pages.
+
+    Args:
+        documents (List[Document]): The extracted fixture pages.
+
+    Returns:
+        dict: Seconds per page and throughput in MB/s for each step.
+    """
+    from backend.clean_data import clean_text
+    from backend.load_scrape_website import get_reduced_text, split_content
+
+    texts = [doc.page_content for doc in documents]
+    megabytes = sum(len(text) for text in texts) / 1e6
+    clean = _time_per_call(lambda: [clean_text(text) for text in texts])
+    reduced = sum(len(get_reduced_text(doc)) for doc in documents) / 1e6
+    split = _time_per_call(lambda: split_content(documents))
+    return {
+        "clean_text": {"s_per_page": clean / len(texts),
+                       "mb_per_s": megabytes / clean},
+        "split_content": {"s_per_page": split / len(documents),
+                          "mb_per_s": reduced / split,
+                          "chunks": len(split_content(documents))},
+    }
+
+
+def measure_scrape(links: List[str], rounds: int) -> Dict[str, Any]:
+    """
+    Measure the scrape fan-out (`gather_pages` over `ascrape_link`)
+    against the fixture server, without the page cache.
+
+    Args:
+        links (List[str]): Fixture page URLs.
+        rounds (int): How many fan-outs to time.
+
+    Returns:
+        dict: Latency of one fan-out and pages scraped per second.
+    """
+    from backend.fetcher import close_fetcher
+    from backend.load_scrape_website import ascrape_hedge, ascrape_link
+    from backend.scrape_policy import ScrapePolicy, gather_pages
+
+    policy = ScrapePolicy.from_settings()
+
+    async def run() -> List[float]:
+        samples = []
+        for i in range(rounds):
+            start = time.perf_counter()
+            offset = (i * policy.candidates) % len(links)
+            candidates = (links[offset:] + links[:offset])
+            await gather_pages(candidates, ascrape_link, policy,
+                               hedge=ascrape_hedge)
+            samples.append(time.perf_counter() - start)
+        await close_fetcher()
+        return samples
+
+    samples = asyncio.run(run())
+    result = _summary(samples)
+    result["pages_per_s"] = policy.target_pages / result["median"]
+    return result
+
+
+def measure_search_to_scrape(links: List[str], questions: List[str],
+                             search_latency: float) -> Dict[str, Any]:
+    """
+    Time search plus scrape per question, run back to back
+    (`aget_links` then `ascrape_web_data`) and pipelined
+    (`asearch_and_scrape`), with no cached search result and with a
+    stale one, as for a repeated question past its TTL. With a stale
+    result the pipelined stage starts downloading the cached links
+    while the search is refreshed.
+
+    Args:
+        links (List[str]): Fixture page URLs.
+        questions (List[str]): Distinct questions.
+        search_latency (float): Seconds each upstream search takes.
+
+    Returns:
+        dict: Per search cache state, the latency of each mode, the
+        time saved and the overlap reported by the pipelined stage.
+    """
+    from benchmarks.fakes import FakeSearch
+    from backend.disk_cache import DiskCache
+    from backend.fetcher import close_fetcher
+    from backend.nodes import aget_links, ascrape_web_data, \
+        asearch_and_scrape
+    from backend.search import SearchService, TokenBucket
+
+    overlaps: List[float] = []
+
+    async def sequential(question: str) -> float:
+        start = time.perf_counter()
+        update = await aget_links({"question": question})
+        await ascrape_web_data({"question": question, **update})
+        return time.perf_counter() - start
+
+    async def pipelined(question: str) -> float:
+        start = time.perf_counter()
+        update = await asearch_and_scrape({"question": question})
+        overlaps.append(update["metrics"]["pipeline"]["overlap"])
+        return time.perf_counter() - start
+
+    async def run(search: SearchService) -> Dict[str, List[float]]:
+        samples = {"sequential": [], "pipelined": []}
+        for question in questions:
+            for mode, measure in (("sequential", sequential),
+                                  ("pipelined", pipelined)):
+                if search.store is not None:
+                    search.search(question)
+                samples[mode].append(await measure(question))
+        await close_fetcher()
+        return samples
+
+    report = {}
+    for cache in ("no_cache", "stale_cache"):
+        # A zero TTL leaves every stored result stale straight away.
+        store = (DiskCache(os.path.join(tempfile.mkdtemp(
+            prefix="ask-search-"), "search.sqlite3"), max_bytes=10**7)
+            if cache == "stale_cache" else None)
+        search = SearchService(FakeSearch(links, latency=search_latency),
+                               store=store, ttl=0,
+                               bucket=TokenBucket(1e6, 1e6))
+        overlaps.clear()
+        with patch("backend.load_scrape_website.get_search_service",
+                   return_value=search):
+            samples = asyncio.run(run(search))
+        result = {mode: _summary(values) for mode, values in samples.items()}
+        result["saved_s"] = (result["sequential"]["median"]
+                             - result["pipelined"]["median"])
+        result["overlap_s"] = _summary(overlaps)
+        report[cache] = result
+    return report
+
+
+def measure_end_to_end(questions: List[str]) -> Dict[str, Any]:
+    """
+    Answer questions one after another through `graph.stream`.
+
+    Args:
+        questions (List[str]): Distinct questions.
+
+    Returns:
+        dict: Latency and time to first token, throughput, and memory.
+    """
+    from backend.registry import get_graph
+    from backend.streaming import stream_events
+
+    graph = get_graph()
+    latencies, ttfts = [], []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for question in questions:
+        for event in stream_events(graph, question):
+            if event["event"] == "done":
+                latencies.append(event["data"]["latency"])
+                ttfts.append(event["data"]["ttft"] or 0.0)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "latency_s": _summary(latencies),
+        "ttft_s": _summary(ttfts),
+        "questions_per_s": len(questions) / elapsed,
+        "python_heap_peak_mb": peak / (1024 * 1024),
+        "rss_peak_mb": _rss_mb(),
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Set up the fakes and run every measurement.
+
+    Args:
+        args (argparse.Namespace): The command line options.
+
+    Returns:
+        dict: The report, with run metadata and results.
+    """
+    from benchmarks.fakes import (FakeChatModel, FakeSearch, FixtureServer,
+                                  make_page)
+    from backend import registry
+    from backend.extract import html_to_document
+    from backend.search import SearchService, TokenBucket
+
+    pages = [make_page(i, args.page_kb) for i in range(args.pages)]
+    results: Dict[str, Any] = {}
+    with FixtureServer(pages, latency=args.page_latency) as server:
+        links = [server.url(i) for i in range(args.pages)]
+        documents = [html_to_document(page, link)
+                     for page, link in zip(pages, links)]
+        results.update(measure_text(documents))
+        results["scrape_fanout"] = measure_scrape(links, args.rounds)
+
+        search = SearchService(FakeSearch(links, latency=args.search_latency),
+                               store=None, ttl=0,
+                               bucket=TokenBucket(1e6, 1e6))
+        llm = FakeChatModel(first_token_latency=args.first_token_latency,
+                            token_latency=args.token_latency)
+        questions = [f"Benchmark question {i}?"
+                     for i in range(args.questions)]
+        results["search_to_scrape"] = measure_search_to_scrape(
+            links, questions, args.search_latency)
+        registry.reset()
+        with patch("backend.load_scrape_website.get_search_service",
+                   return_value=search), \
+                patch("backend.nodes.get_llm", return_value=llm):
+            results["end_to_end"] = measure_end_to_end(questions)
+        registry.reset()
+        results["end_to_end"]["page_requests"] = server.requests
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": vars(args),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            prefix: str = "") -> List[str]:
+    """
+    List the numeric results that changed between two reports.
+
+    Args:
+        current (dict): The new results.
+        baseline (dict): The results to compare against.
+        prefix (str): The key path so far.
+
+    Returns:
+        List[str]: One line per metric: old, new and the ratio.
+    """
+    lines = []
+    for key, value in current.items():
+        old = baseline.get(key)
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and isinstance(old, dict):
+            lines.extend(compare(value, old, path + "."))
+        elif (isinstance(value, (int, float))
+              and isinstance(old, (int, float)) and old):
+            lines.append(f"{path:<45} {old:12.4g} -> {value:12.4g}"
+                         f"  ({value / old:5.2f}x)")
+    return lines
+
+
+def main() -> None:
+    """
+    Parse arguments, run the benchmarks and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--page-kb", type=int, default=60)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=10,
+                        help="scrape fan-outs to time")
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--page-latency", type=float, default=0.02)
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    parser.add_argument("--baseline", help="A previous report to compare")
+    args = parser.parse_args()
+
+    # Measure the pipeline itself: no caches from earlier runs.
+    os.environ["ASK_WEB_CACHE_DIR"] = tempfile.mkdtemp(prefix="ask-bench-")
+    os.environ["ASK_WEB_PAGE_CACHE"] = "0"
+    os.environ["ASK_WEB_ANSWER_CACHE"] = "0"
+    os.environ["ASK_WEB_CORPUS"] = "0"
+    # Fixture pages share one host; keep the domain circuit breaker out.
+    os.environ["ASK_WEB_DOMAIN_FAILURE_THRESHOLD"] = "0"
+    os.environ.setdefault("USER_AGENT", "ask-the-web-benchmark")
+
+    report = run_benchmarks(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        print("\n".join(compare(report["results"], baseline["results"])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Startup benchmark for the Ask the Web backend.
+
+Reports how long a fresh interpreter takes to import the backend and
+how much extra time the first query pays for building the LLM client
+and compiling the graph, compared to a warm process.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = '''
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+'''
+
+FIRST_QUERY_SNIPPET = '''
+import json
+import time
+start = time.perf_counter()
+from backend import registry
+imported = time.perf_counter()
+registry.get_llm()
+llm_ready = time.perf_counter()
+registry.get_graph()
+graph_ready = time.perf_counter()
+registry.get_llm()
+registry.get_graph()
+warm = time.perf_counter()
+print(json.dumps({
+    "import_registry": imported - start,
+    "build_llm": llm_ready - imported,
+    "build_graph": graph_ready - llm_ready,
+    "warm_lookup": warm - graph_ready,
+}))
+'''
+
+MODULES = ["backend.registry", "backend.nodes", "backend.graph"]
+
+
+def _run(snippet: str) -> str:
+    """
+    Run a Python snippet in a fresh interpreter rooted at the repo.
+
+    Args:
+        snippet (str): The code to execute.
+
+    Returns:
+        str: The last line the snippet printed.
+    """
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark")
+    env.setdefault("USER_AGENT", "ask-the-web-benchmark")
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def measure_imports(runs: int) -> Dict[str, float]:
+    """
+    Measure the median cold import time of each backend module.
+
+    Args:
+        runs (int): How many fresh interpreters to start per module.
+
+    Returns:
+        dict: Median seconds keyed by module name.
+    """
+    results = {}
+    for module in MODULES:
+        samples = [float(_run(IMPORT_SNIPPET.format(module=module)))
+                   for _ in range(runs)]
+        results[module] = statistics.median(samples)
+    return results
+
+
+def measure_first_query(runs: int) -> Dict[str, float]:
+    """
+    Measure the one-off cost a cold process pays before its first query.
+
+    Args:
+        runs (int): How many fresh interpreters to start.
+
+    Returns:
+        dict: Median seconds for each startup phase.
+    """
+    samples: List[Dict[str, float]] = [
+        json.loads(_run(FIRST_QUERY_SNIPPET)) for _ in range(runs)]
+    results = {key: statistics.median(s[key] for s in samples)
+               for key in samples[0]}
+    results["first_query_overhead"] = (
+        results["build_llm"] + results["build_graph"])
+    return results
+
+
+def main() -> None:
+    """
+    Parse arguments, run the measurements and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    report = {
+        "cold_import_s": measure_imports(args.runs),
+        "first_query_s": measure_first_query(args.runs),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text)
+
+
+if __name__ == "__main__":
+    main()
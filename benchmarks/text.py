@@ -0,0 +1,191 @@
+"""
+Microbenchmark of text cleaning and chunking.
+
+Compares the previous pipeline (three `re.sub` passes, then a new
+`RecursiveCharacterTextSplitter` per call) with the single-pass
+`clean_text` and the offset-based `split_offsets` on extracted fixture
+pages, after checking that both produce identical chunks. It also
+compares the memory held by the chunks as `Document` objects and as a
+`ChunkList`.
+
+Usage:
+    python -m benchmarks.text [--pages 20] [--page-kb 60]
+        [--output text.json]
+"""
+import argparse
+import json
+import os
+import tracemalloc
+from typing import Any, Dict, List
+
+os.environ.setdefault("USER_AGENT", "ask-the-web-benchmark")
+
+
+def reference_clean(text: str) -> str:
+    """
+    Clean a text with the three separate regex passes.
+    """
+    from backend.clean_data import (fix_newlines, merge_hyphenated_words,
+                                    remove_multiple_newlines)
+
+    return remove_multiple_newlines(fix_newlines(
+        merge_hyphenated_words(text)))
+
+
+def reference_chunks(text: str) -> List[str]:
+    """
+    Clean and split a text the way `split_content` used to.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from backend.load_scrape_website import CHUNK_OVERLAP, CHUNK_SIZE
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE,
+                                              chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_text(reference_clean(text))
+
+
+def fused_chunks(text: str) -> List[str]:
+    """
+    Clean and split a text with `clean_text` and `split_offsets`.
+    """
+    from backend.chunking import split_offsets
+    from backend.clean_data import clean_text
+    from backend.load_scrape_website import CHUNK_OVERLAP, CHUNK_SIZE
+
+    cleaned = clean_text(text)
+    return [cleaned[start:end] for start, end in
+            split_offsets(cleaned, CHUNK_SIZE, CHUNK_OVERLAP)]
+
+
+def measure_memory(texts: List[str]) -> Dict[str, Any]:
+    """
+    Bytes allocated to hold every page's chunks, as one `Document` per
+    chunk and as a `ChunkList`.
+
+    Args:
+        texts (List[str]): Extracted page texts, already reduced.
+
+    Returns:
+        dict: Bytes per chunk for each container and their ratio.
+    """
+    from langchain.schema import Document
+    from backend.chunk_store import ChunkList
+    from backend.chunking import split_offsets
+    from backend.clean_data import clean_text
+    from backend.load_scrape_website import CHUNK_OVERLAP, CHUNK_SIZE
+
+    def documents() -> List[Any]:
+        docs = []
+        for i, text in enumerate(texts):
+            metadata = {"source": f"http://fixture/page/{i}"}
+            docs.extend(Document(page_content=chunk, metadata=metadata)
+                        for chunk in reference_chunks(text))
+        return docs
+
+    def chunk_list() -> Any:
+        pages = []
+        for i, text in enumerate(texts):
+            cleaned = clean_text(text)
+            pages.append(ChunkList.from_spans(
+                cleaned, {"source": f"http://fixture/page/{i}"},
+                split_offsets(cleaned, CHUNK_SIZE, CHUNK_OVERLAP)))
+        return ChunkList.concat(pages)
+
+    result: Dict[str, Any] = {}
+    for name, build in (("documents", documents),
+                        ("chunk_list", chunk_list)):
+        tracemalloc.start()
+        chunks = build()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result[name] = {"bytes_per_chunk": held / len(chunks)}
+        del chunks
+    result["memory_ratio"] = (result["documents"]["bytes_per_chunk"]
+                              / result["chunk_list"]["bytes_per_chunk"])
+    return result
+
+
+def run(texts: List[str]) -> Dict[str, Any]:
+    """
+    Check that both pipelines agree and time each step.
+
+    Args:
+        texts (List[str]): Extracted page texts, already reduced.
+
+    Returns:
+        dict: Seconds per page for each step and the speedups.
+
+    Raises:
+        AssertionError: If the pipelines disagree on any page.
+    """
+    from backend.chunking import split_offsets
+    from backend.clean_data import clean_text
+    from backend.load_scrape_website import CHUNK_OVERLAP, CHUNK_SIZE
+    from benchmarks.pipeline import _time_per_call
+
+    for text in texts:
+        assert reference_clean(text) == clean_text(text)
+        assert reference_chunks(text) == fused_chunks(text)
+    cleaned = [clean_text(text) for text in texts]
+
+    def split_reference() -> None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        for text in cleaned:
+            RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP).split_text(text)
+
+    timings = {
+        "clean_reference": _time_per_call(
+            lambda: [reference_clean(text) for text in texts]),
+        "clean_fused": _time_per_call(
+            lambda: [clean_text(text) for text in texts]),
+        "split_reference": _time_per_call(split_reference),
+        "split_offsets": _time_per_call(
+            lambda: [split_offsets(text, CHUNK_SIZE, CHUNK_OVERLAP)
+                     for text in cleaned]),
+        "total_reference": _time_per_call(
+            lambda: [reference_chunks(text) for text in texts]),
+        "total_fused": _time_per_call(
+            lambda: [fused_chunks(text) for text in texts]),
+    }
+    result: Dict[str, Any] = {
+        name: {"s_per_page": seconds / len(texts)}
+        for name, seconds in timings.items()}
+    for step, new in (("clean", "clean_fused"), ("split", "split_offsets"),
+                      ("total", "total_fused")):
+        result[f"{step}_speedup"] = (timings[f"{step}_reference"]
+                                     / timings[new])
+    result["chars_per_page"] = sum(map(len, texts)) / len(texts)
+    result["memory"] = measure_memory(texts)
+    return result
+
+
+def main() -> None:
+    """
+    Parse arguments, build the fixture texts and print a JSON report.
+    """
+    from benchmarks.fakes import make_page
+    from backend.extract import html_to_document
+    from backend.settings import get_settings
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--page-kb", type=int, default=60)
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    limit = get_settings().page_max_chars
+    texts = [html_to_document(make_page(i, args.page_kb),
+                              f"http://fixture/page/{i}").page_content[:limit]
+             for i in range(args.pages)]
+    report = {"params": vars(args), "results": run(texts)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text)
+
+
+if __name__ == "__main__":
+    main()
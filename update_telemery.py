@@ -1,10 +1,12 @@
 import streamlit as st
 import time
-from typing import Dict
+from typing import Any, Dict, Optional
 
 
 def update_telemetry(
-        start_time: float, usage_metadata: Dict[str, int]) -> None:
+        start_time: float,
+        usage_metadata: Dict[str, int],
+        metrics: Optional[Dict[str, Any]] = None) -> None:
     """
     Updates the telemetry information in the Streamlit sidebar,
       including the latency and token usage.
@@ -20,6 +22,10 @@ def update_telemetry(
             - "input_tokens" (int)
             - "output_tokens" (int)
             - "total_tokens" (int)
+        metrics (Dict[str, Any], optional): Per-node metrics from the
+            graph state, e.g. node timings, per-page scrape records,
+            the context tokens saved by ranking and the time to first
+            token.
 
     Returns:
         None: This function does not return any value.
@@ -30,10 +36,42 @@ def update_telemetry(
     prompt_tokens = usage_metadata.get("input_tokens", 0)
     output_tokens = usage_metadata.get("output_tokens", 0)
     total_tokens = usage_metadata.get("total_tokens", 0)
+    metrics = metrics or {}
+    selection = metrics.get("select_context", {})
+    timings = metrics.get("timings", {})
+    pages = metrics.get("scrape_web_data", {}).get("pages", [])
+    verify_usage = metrics.get("verify_citations", {}).get("usage") or {}
+    ttft = metrics.get("stream", {}).get("ttft")
+    cached = metrics.get("stream", {}).get("cached", False)
 
     with st.sidebar:
         st.markdown("### 🔧 Telemetry")
         st.metric("⏱ Latency (s)", latency)
+        if cached:
+            st.caption("♻️ Served from the answer cache; "
+                       "token counts are from the original run.")
+        if ttft is not None:
+            st.metric("⚡ Time to First Token (s)", round(ttft, 2))
         st.metric("🧠 Input Tokens", prompt_tokens)
         st.metric("💬 Output Tokens", output_tokens)
-        st.metric("📊 Total Tokens", total_tokens)
+        st.metric("📊 Total Tokens",
+                  total_tokens + verify_usage.get("total_tokens", 0))
+        if verify_usage:
+            st.caption(f"Includes {verify_usage.get('total_tokens', 0)} "
+                       "tokens spent verifying citations.")
+        if selection:
+            st.metric("✂️ Context Tokens Saved",
+                      selection.get("tokens_saved", 0))
+        if timings:
+            st.markdown("#### ⏳ Time per step (s)")
+            for node, seconds in timings.items():
+                st.text(f"{node:<18} {seconds:6.2f}")
+        if pages:
+            st.markdown("#### 🌐 Pages scraped")
+            st.table([{
+                "page": page.get("link", ""),
+                "seconds": round(page.get("duration", 0.0), 2),
+                "cache": page.get("cache", ""),
+                "KB": round(page.get("bytes", 0) / 1024, 1),
+                "chunks": page.get("chunks_out", 0),
+            } for page in pages])